@@ -6,16 +6,18 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
 from lxml import html
-import csv
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.sink import csv_sink
 
 
 def save_to_csv(data, file_name):
     """
     Save the data to a CSV file, ensuring all fields are quoted.
     """
-    with open(file_name, mode="a", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file, quoting=csv.QUOTE_ALL)
-        writer.writerow(data)  # Write data
+    csv_sink(file_name).write(data)
 
 
 def safe_click(driver, element, max_attempts=3):
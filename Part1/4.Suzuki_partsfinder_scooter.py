@@ -1,13 +1,17 @@
-import requests
 from lxml import html
-import csv
 from datetime import datetime
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.fetch import http_get, print_stats
+from common.sink import csv_sink
 
 def fetch_html(url):
     """
     Fetch HTML content from a URL.
     """
-    response = requests.get(url)
+    response = http_get(url)
     if response.status_code == 200:
         return response.content
     else:
@@ -27,9 +31,7 @@ def save_to_csv(data, file_name):
     """
     Save the data to a CSV file, ensuring all fields are quoted.
     """
-    with open(file_name, mode="a", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file, quoting=csv.QUOTE_ALL)
-        writer.writerow(data)  # Write data
+    csv_sink(file_name).write(data)
 
 def main():
     base_url = "https://partsfinder.onlinemicrofiche.com"
@@ -69,3 +71,4 @@ def main():
 
 if __name__ == "__main__":
     main()
+    print_stats()
@@ -2,18 +2,19 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import csv
 from datetime import datetime
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.sink import csv_sink
 
 def save_to_csv(data, file_name):
     """
     Save the data to a CSV file, ensuring all fields are quoted.
     """
     os.makedirs(os.path.dirname(file_name), exist_ok=True)
-    with open(file_name, mode="a", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file, quoting=csv.QUOTE_ALL)
-        writer.writerow(data)
+    csv_sink(file_name).write(data)
 
 def scrape_models(driver, base_url, csv_file):
     try:
@@ -0,0 +1,14 @@
+"""
+Part1 crawl of any number of the configured dealer sites in one process, e.g.
+
+    python crawl_catalog.py can_am sea_doo ski_doo --per-host 4 --workers 32
+    python crawl_catalog.py --all
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.catalog import main
+
+if __name__ == "__main__":
+    main()
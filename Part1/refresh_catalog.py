@@ -0,0 +1,15 @@
+"""
+Incremental Part1 crawl that writes only the models added or removed since
+the previous snapshot, e.g.
+
+    python refresh_catalog.py yamaha --output-dir result_part1
+    python refresh_catalog.py --all --skip-years-before 2023
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.refresh import main
+
+if __name__ == "__main__":
+    main()
@@ -8,15 +8,19 @@ from selenium.webdriver.support import expected_conditions as EC
 import time
 from lxml import html
 import csv
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.parts import row_window
+from common.sink import csv_sink
 
 
 def save_to_csv(data, file_name):
     """
     Save the data to a CSV file, ensuring all fields are quoted.
     """
-    with open(file_name, mode="a", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file, quoting=csv.QUOTE_ALL)
-        writer.writerow(data)  # Write data
+    csv_sink(file_name).write(data)
 
 
 def safe_click(driver, element, max_attempts=3):
@@ -51,6 +55,7 @@ input_file = "result_part1//16_Lynx_2_input.csv"
 
 csv_file = f"csv/16_Lynx_2_output_{timestamp}.csv"
 
+start, stop = row_window()
 print("Started!")
 save_to_csv(["Brand", "Type", "Year", "Model", "Diagram Name", "Ref #", "Part description", "Part number", "OEM diagram URL", "Price", "SSPN"], csv_file)
 
@@ -64,8 +69,11 @@ try:
     with open(input_file, mode='r', encoding='utf-8') as file:
         reader = csv.reader(file)
         for row_number, row in enumerate(reader, start=1):
-            if row_number <17232:
+            if row_number == 1 or row_number < start:
                 continue
+            if stop is not None and row_number >= stop:
+                break
+            print(f"row {row_number}")
             if len(row) < 5:
                 print(f"Skipping invalid row {row_number} in input file: {row}")
                 continue
@@ -1,5 +1,4 @@
 from datetime import datetime
-import requests
 from lxml import html
 import csv
 import logging
@@ -8,68 +7,27 @@ import logging
 logging.basicConfig(filename='error_log.log', level=logging.ERROR,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 import sys
-import time
-
-def fetch_html(url):
-    max_retries = 5
-    retries = 0
-    retry_delay=5
-    while retries < max_retries:
-        try:
-            response = requests.get(url)
-            response.raise_for_status()  # Raise an HTTPError for bad responses
-            return response.content  # Return content if successful
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching URL {url}: {e}. Retrying in {retry_delay} seconds...")
-            retries += 1
-            time.sleep(retry_delay)  # Wait before retrying
-
-    print(f"Failed to fetch URL {url} after {max_retries} attempts. Exiting.")
-    sys.exit(1)
-
-def extract_by_xpath(doc, xpath):
-    """
-    Extract content from the HTML document using the provided XPath.
-    """
-    try:
-        elements = doc.xpath(xpath)
-        if elements:
-            return elements[0].text.strip()
-        else:
-            raise ValueError("Element not found. Check the XPath.")
-    except (IndexError, ValueError) as e:
-        logging.error(f"Error extracting data with XPath '{xpath}': {e}")
-        return ""
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.fetch import fetch_html, print_stats
+from common.parts import (FULL_DIAGRAMS, key_parts, load_diagram_keys, parse_diagram_page, part_rows,
+                          row_window)
+from common.sink import csv_sink
 
 def save_to_csv(data, file_name):
     """
     Save the data to a CSV file, ensuring all fields are quoted.
     """
     try:
-        with open(file_name, mode="a", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file, quoting=csv.QUOTE_ALL)
-            writer.writerow(data)  # Write data
+        csv_sink(file_name).write(data)
     except IOError as e:
         logging.error(f"Error writing to CSV file '{file_name}': {e}")
 
 def main():
-    diagram_dict = {}
-    diagram_content_dict = {}
-
-    # Load the CSV data into dictionaries
+    # Load the compiled key.csv index
     try:
-        with open('key.csv', mode='r', encoding='utf-8') as key_file:
-            reader = csv.reader(key_file)
-            for row in reader:
-                if len(row) < 3:
-                    logging.warning(f"Invalid row in 'key.csv': {row}")
-                    continue
-                brand = row[0]
-                diagram_name = row[1]
-                part_description = row[2]
-
-                diagram_dict[(brand.upper(), diagram_name.upper())] = 1
-                diagram_content_dict[(brand.upper(), diagram_name.upper(), part_description.upper())] = 1
+        diagram_dict = load_diagram_keys('key.csv')
     except FileNotFoundError:
         logging.error("The 'key.csv' file was not found.")
         return
@@ -82,6 +40,7 @@ def main():
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     csv_file = f"csv/3_Polaris_2_{timestamp}.csv"
 
+    start, stop = row_window()
     print("started!")
     save_to_csv(["Brand", "Type", "Year", "Model", "Diagram Name", "Ref #", "Part description", "Part number", "OEM diagram URL", "Price", "SSPN"], csv_file)
 
@@ -89,8 +48,11 @@ def main():
         with open(input_file, mode='r', encoding='utf-8') as file:
             reader = csv.reader(file)
             for row_number, row in enumerate(reader, start=1):
-                if row_number < 803:
+                if row_number == 1 or row_number < start:
                     continue
+                if stop is not None and row_number >= stop:
+                    break
+                print(f"row {row_number}")
 
                 if len(row) < 5:
                     logging.warning(f"Invalid row in '{input_file}': {row}")
@@ -123,28 +85,11 @@ def main():
                             continue
 
                         try:
-                            diagram_doc = html.fromstring(diagram_content)
-                            ref_elements = diagram_doc.xpath('//div[@class="partlistrow"]//form')
-                            for ref_element in ref_elements:
-                                try:
-                                    ref = ref_element.xpath('.//div[@class="c0"]/span')[0].text.strip()
-                                    part_description = ref_element.xpath('.//div[@class="c1a"]/span')[0].text.strip()
-                                    price_elements = ref_element.xpath('.//div[@class="c2"]/span')
-                                    price = price_elements[0].text.strip().replace("$", "") if price_elements else ""
-
-                                    part_numbers = ref_element.xpath('.//div[@class="c1b"]/a/span')
-                                    if len(part_numbers) >= 2:
-                                        part_number = part_numbers[0].text.strip()
-                                        sspn = part_numbers[1].text.strip()
-                                        save_to_csv([brand, type, year, model, diagram_name, ref, part_description, part_number, oem_diagram_url, price, sspn], csv_file)
-                                        save_to_csv([brand, type, year, model, diagram_name, ref, part_description, sspn, oem_diagram_url, price, part_number], csv_file)
-                                    else:
-                                        part_number = part_numbers[0].text.strip()
-                                        sspn = ""
-                                        save_to_csv([brand, type, year, model, diagram_name, ref, part_description, part_number, oem_diagram_url, price, sspn], csv_file)
-
-                                except (IndexError, AttributeError) as e:
-                                    logging.error(f"Error processing ref_element at row {row_number}: {e}")
+                            parts = parse_diagram_page(diagram_content, require_labels=True)
+                            if not FULL_DIAGRAMS:
+                                parts = key_parts(diagram_dict, brand, diagram_name, parts)
+                            for part_row in part_rows(row, diagram_name, oem_diagram_url, parts):
+                                save_to_csv(part_row, csv_file)
 
                         except Exception as e:
                             logging.error(f"Error processing diagram content from '{base_url + diagram_href}': {e}")
@@ -159,3 +104,4 @@ def main():
 
 if __name__ == "__main__":
     main()
+    print_stats()
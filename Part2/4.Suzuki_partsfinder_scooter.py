@@ -1,62 +1,36 @@
 from datetime import datetime
-import requests
 from lxml import html
 import csv
-
-def fetch_html(url):
-    """
-    Fetch HTML content from a URL with error handling.
-    """
-    try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raises HTTPError for bad responses (4xx and 5xx)
-        return response.content
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching URL {url}: {e}")
-        return None  # Return None if there is an error
-
-def extract_by_xpath(doc, xpath):
-    """
-    Extract the text from the HTML document using the provided XPath with error handling.
-    """
-    try:
-        elements = doc.xpath(xpath)
-        if elements:
-            return elements[0].text.strip()
-        else:
-            raise Exception("Element not found. Check the XPath.")
-    except Exception as e:
-        print(f"Error extracting data using XPath '{xpath}': {e}")
-        return None  # Return None if extraction fails
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.fetch import fetch_html, print_stats
+from common.extract import ExtractionPlan, first_text
+from common.parts import FULL_DIAGRAMS, load_diagram_keys, row_window
+from common.sink import csv_sink
+
+# Rows of the parts_list table: ref in the 2nd cell, description and part
+# number as the two divs of the 3rd cell, price in the 4th.
+PARTS_LIST_PLAN = ExtractionPlan(
+    '//table[@class="parts_list"]//tr',
+    ref='(.//td)[2]',
+    part_divs='(.//td)[3]/div',
+    price='(.//td)[4]',
+)
 
 def save_to_csv(data, file_name):
     """
     Save the data to a CSV file with error handling.
     """
     try:
-        with open(file_name, mode="a", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file, quoting=csv.QUOTE_ALL)
-            writer.writerow(data)  # Write data
+        csv_sink(file_name).write(data)
     except IOError as e:
         print(f"Error writing to CSV file {file_name}: {e}")
 
 def main():
-    diagram_dict = {}
-    diagram_content_dict = {}
-
     try:
-        with open('key.csv', mode='r', encoding='utf-8') as key_file:
-            reader = csv.reader(key_file)
-            for row in reader:
-                if not row:
-                    continue  # Skip empty rows
-                brand = row[0]  
-                diagram_name = row[1] 
-                complete_group = row[2] 
-                part_description = row[2] 
-
-                diagram_dict[(brand.upper(), diagram_name.upper())] = 1
-                diagram_content_dict[(brand.upper(), diagram_name.upper(), part_description.upper())] = 1
+        diagram_dict = load_diagram_keys('key.csv')
     except FileNotFoundError as e:
         print(f"Error reading key.csv: {e}")
         return  # Stop execution if the key file is missing
@@ -69,6 +43,7 @@ def main():
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     csv_file = f"csv/4_Suzuki_partsfinder_scooter_2_{timestamp}.csv"
 
+    start, stop = row_window()
     print("Started!")
     save_to_csv(["Brand", "Type", "Year", "Model", "Diagram Name", "Ref #", "Part description", "Part number", "OEM diagram URL", "Price", "SSPN"], csv_file)
 
@@ -76,8 +51,11 @@ def main():
         with open(input_file, mode='r', encoding='utf-8') as file:
             reader = csv.reader(file)
             for row_number, row in enumerate(reader, start=1):
-                if row_number < 60:
-                    continue  # Skip header row
+                if row_number == 1 or row_number < start:
+                    continue  # Skip header row and rows before --start
+                if stop is not None and row_number >= stop:
+                    break
+                print(f"row {row_number}")
 
                 if len(row) < 5:  # Ensure there are enough columns
                     print(f"Skipping row {row_number} due to insufficient columns.")
@@ -108,19 +86,17 @@ def main():
                             continue  # Skip if content cannot be fetched
 
                         diagram_doc = html.fromstring(diagram_content)
-                        ref_elements = diagram_doc.xpath('//table[@class="parts_list"]//tr')
-                        for ref_element in ref_elements:
+                        for fields in PARTS_LIST_PLAN.rows(diagram_doc):
                             try:
-                                part_element = ref_element.xpath('.//td')[2]
-                                if len(part_element) == 0:
+                                part_divs = fields["part_divs"]
+                                if not part_divs:
                                     continue
-                                ref = ref_element.xpath('.//td')[1].text.strip() if ref_element.xpath('.//td')[1].text else ""
-                                part_description = part_element.xpath('./div')[0].text.strip()
-
-                                price_element = ref_element.xpath('.//td')[3]
-                                price = price_element.text.strip() if price_element.text else ""
-
-                                part_number = part_element.xpath('./div')[1].text.strip()
+                                ref = first_text(fields["ref"])
+                                part_description = part_divs[0].text.strip()
+                                if not FULL_DIAGRAMS and not diagram_dict.matches(brand, diagram_name, part_description):
+                                    continue
+                                price = first_text(fields["price"])
+                                part_number = part_divs[1].text.strip()
                                 sspn = ""
 
                                 save_to_csv([brand, type, year, model, diagram_name, ref, part_description, part_number, oem_diagram_url, price, sspn], csv_file)
@@ -136,3 +112,4 @@ def main():
 
 if __name__ == "__main__":
     main()
+    print_stats()
@@ -0,0 +1,14 @@
+"""
+Concurrent replacement for the per-brand Part2 loops, e.g.
+
+    python crawl_async.py result_part1/3_Polaris_1.csv --per-host 8
+    python crawl_async.py result_part1/10_Can_Am_1_20241203195713.csv --base-url https://www.canampartshouse.com
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.engine import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+Part1 catalog crawl feeding the Part2 diagram crawl directly, e.g.
+
+    python crawl_pipeline.py yamaha --per-host 8
+    python crawl_pipeline.py can_am sea_doo ski_doo --queue-size 512
+
+The Part1 CSV is still written to result_part1/<brand>_1_<timestamp>.csv.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.pipeline import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+Crawl one result_part1 CSV in parallel shards and merge the results, e.g.
+
+    python crawl_sharded.py result_part1/9_Yamaha_1_20241203193828.csv --shards 8
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.shard import main
+
+if __name__ == "__main__":
+    main()
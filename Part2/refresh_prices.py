@@ -0,0 +1,15 @@
+"""
+Update the Price column of an earlier Part2 output from its diagram pages,
+without re-walking model pages or key.csv, e.g.
+
+    python refresh_prices.py csv/9_Yamaha_2_20241204101500.csv
+    python refresh_prices.py csv/parts.sqlite --per-host 4
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.prices import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Offline throughput benchmark for the page parsers, run against the saved
+pages in bench/fixtures/ instead of the live sites:
+
+    python bench/parsers.py
+    python bench/parsers.py babbitts_diagram partsfinder_parts_list --seconds 5
+    python bench/parsers.py --record babbitts_diagram https://www.babbittsonline.com/oemparts/a/...
+
+For every parser it reports pages/s and rows/s over a timed loop, the peak
+Python allocation of one parse (tracemalloc) and the peak RSS growth from
+just before the first parse to the end of the loop, which includes the libxml2 trees tracemalloc cannot see. Each
+parser is measured in its own process, so one parser's memory high-water
+mark does not hide the next one's.
+
+The shipped fixtures reproduce the markup each parser targets (page chrome,
+navigation and scripts included, so region cutting is measured fairly);
+--record swaps one for a live capture of a real page.
+
+partzilla and Lynx are scraped through Selenium, so there is no lxml parser
+for them in the tree; their entries apply the scripts' XPaths to the saved
+page source with lxml, which is what the parse would cost offline.
+"""
+import argparse
+import json
+import os
+import runpy
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from lxml import html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from common.catalog import SITES, parse_brand_page, parse_type_page, parse_year_page
+from common.extract import ExtractionPlan, first_text
+from common.parts import parse_diagram_page, parse_diagram_page_full, parse_model_page
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SITE = SITES["ktm"]
+
+PARTZILLA_LINKS = '//div[@class="catalog-table hidden-xs hidden-sm"]//td/a'
+
+LYNX_PLAN = ExtractionPlan(
+    "//tbody/tr[contains(@class, 'ariPartInfo')]",
+    ref=".//td[contains(@class, 'ariPLTag')]",
+    part_number=".//td[contains(@class, 'ariPLSku')]/span/@name",
+    part_description=".//td[contains(@class, 'ariPLDesc')]",
+    price=".//td[contains(@class, 'ariPLSku')]/@adjustedprice",
+)
+
+
+# The plan lives in the Part2 script; run_path loads it without running main().
+PARTS_LIST_PLAN = runpy.run_path(os.path.join(ROOT, "Part2", "4.Suzuki_partsfinder_scooter.py"))["PARTS_LIST_PLAN"]
+
+
+def parse_parts_list(content):
+    parts = []
+    for fields in PARTS_LIST_PLAN.rows(html.fromstring(content)):
+        part_divs = fields["part_divs"]
+        if len(part_divs) < 2:
+            continue
+        parts.append((first_text(fields["ref"]), part_divs[0].text.strip(), part_divs[1].text.strip(),
+                      first_text(fields["price"])))
+    return parts
+
+
+def parse_partzilla_catalog(content):
+    return [(element.text, element.get("href")) for element in html.fromstring(content).xpath(PARTZILLA_LINKS)]
+
+
+def parse_lynx_parts(content):
+    parts = []
+    for fields in LYNX_PLAN.rows(html.fromstring(content)):
+        parts.append((first_text(fields["ref"]), first_text(fields["part_description"]),
+                      first_text(fields["part_number"]), first_text(fields["price"])))
+    return parts
+
+
+def _year_rows(content):
+    return parse_year_page(SITE, None, None, content)[3]
+
+
+# name -> (fixture file, parser returning a list of rows)
+PARSERS = {
+    "part1_brand": ("part1_brand.html", lambda content: parse_brand_page(SITE, content)[1]),
+    "part1_type": ("part1_type.html", lambda content: parse_type_page(SITE, content)),
+    "part1_year": ("part1_year.html", _year_rows),
+    "babbitts_model": ("babbitts_model.html", parse_model_page),
+    "babbitts_diagram": ("babbitts_diagram.html", parse_diagram_page),
+    "babbitts_diagram_full": ("babbitts_diagram.html", parse_diagram_page_full),
+    "partsfinder_parts_list": ("partsfinder_parts_list.html", parse_parts_list),
+    "partzilla_catalog": ("partzilla_catalog.html", parse_partzilla_catalog),
+    "lynx_parts": ("lynx_parts.html", parse_lynx_parts),
+}
+
+
+def _max_rss_kib():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+
+
+def measure(name, fixtures=FIXTURES, seconds=2.0):
+    """
+    Benchmark one parser in this process; returns a dict of its numbers.
+    """
+    fixture, parser = PARSERS[name]
+    with open(os.path.join(fixtures, fixture), mode="rb") as file:
+        content = file.read()
+
+    rss_before = _max_rss_kib()
+    rows = len(parser(content))  # warm-up, and the row count of one page
+    tracemalloc.start()
+    parser(content)
+    python_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    pages = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        parser(content)
+        pages += 1
+        if pages % 10 == 0 and time.perf_counter() >= deadline:
+            break
+    elapsed = time.perf_counter() - started
+    rss_after = _max_rss_kib()
+    return {
+        "parser": name,
+        "fixture_bytes": len(content),
+        "rows_per_page": rows,
+        "pages": pages,
+        "pages_per_s": pages / elapsed,
+        "rows_per_s": pages * rows / elapsed,
+        "python_peak_kib": python_peak / 1024,
+        "rss_growth_kib": None if rss_before is None else rss_after - rss_before,
+    }
+
+
+def measure_isolated(name, fixtures=FIXTURES, seconds=2.0):
+    """
+    Run measure() in a fresh interpreter so its peak RSS is its own.
+    """
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", name, "--fixtures", fixtures,
+         "--seconds", str(seconds)],
+        capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def print_results(results):
+    print(f"{'parser':<24}{'KiB':>7}{'rows':>6}{'pages/s':>10}{'rows/s':>11}{'py peak KiB':>13}{'RSS +KiB':>10}")
+    for r in results:
+        rss = "n/a" if r["rss_growth_kib"] is None else f"{r['rss_growth_kib']:.0f}"
+        print(f"{r['parser']:<24}{r['fixture_bytes'] / 1024:>7.0f}{r['rows_per_page']:>6}{r['pages_per_s']:>10.0f}"
+              f"{r['rows_per_s']:>11.0f}{r['python_peak_kib']:>13.0f}{rss:>10}")
+
+
+def record(name, url, fixtures=FIXTURES):
+    """
+    Replace a parser's fixture with a live page, saved byte for byte.
+    """
+    from common.fetch import http_get
+
+    response = http_get(url)
+    response.raise_for_status()
+    file_name = os.path.join(fixtures, PARSERS[name][0])
+    with open(file_name, mode="wb") as file:
+        file.write(response.content)
+    print(f"{url} -> {file_name} ({len(response.content)} bytes, {len(PARSERS[name][1](response.content))} rows)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the page parsers on saved fixture pages.")
+    parser.add_argument("parsers", nargs="*", metavar="parser", help="parsers to run: " + ", ".join(PARSERS))
+    parser.add_argument("--seconds", type=float, default=2.0, help="timed loop length per parser")
+    parser.add_argument("--fixtures", default=FIXTURES, help="directory of fixture pages")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON lines")
+    parser.add_argument("--record", nargs=2, metavar=("PARSER", "URL"), help="save a live page as PARSER's fixture")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.fixtures, args.seconds)))
+        return
+    if args.record:
+        if args.record[0] not in PARSERS:
+            parser.error("unknown parser: " + args.record[0])
+        record(args.record[0], args.record[1], args.fixtures)
+        return
+
+    names = args.parsers or list(PARSERS)
+    unknown = [name for name in names if name not in PARSERS]
+    if unknown:
+        parser.error("unknown parser: " + ", ".join(unknown))
+    results = [measure_isolated(name, args.fixtures, args.seconds) for name in names]
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+    else:
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+Local stand-in for the dealer sites; see common/replay.py.
+
+    python bench/replay_server.py --root site_dump --latency 80 --error-rate 0.02 --seed 1
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.replay import main
+
+if __name__ == "__main__":
+    main()
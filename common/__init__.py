@@ -0,0 +1,3 @@
+"""
+Shared helpers for the Part1 catalog crawlers and the Part2 diagram scrapers.
+"""
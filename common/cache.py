@@ -0,0 +1,165 @@
+"""
+Persistent, URL-keyed cache of HTTP responses for reruns of the crawls.
+
+Each successful (200) response is stored as a compressed body plus a small
+JSON file with the URL, the time it was fetched and its ETag/Last-Modified
+headers. On the next request for the same URL:
+
+- if the site sent a validator, the request is made conditional
+  (If-None-Match / If-Modified-Since) and a 304 is served from disk;
+- otherwise it is fetched again, unless the caller gave the cache a `ttl`:
+  then the stored copy is served as-is until it is `ttl` seconds old. The
+  crawls only pass one when asked to (--cache-ttl), so a page without
+  validators is never served stale by default.
+
+The cache lives in <project>/http_cache unless SCRAPER_CACHE_DIR says
+otherwise; setting SCRAPER_CACHE_DIR to an empty string turns it off.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.environ.get("SCRAPER_CACHE_DIR", os.path.join(PROJECT_DIR, "http_cache"))
+
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+def _cached_response(url, meta, body):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers = CaseInsensitiveDict(meta.get("headers", {}))
+    response._content = body
+    response.from_cache = True
+    return response
+
+
+class ResponseCache:
+    """
+    Disk cache of GET responses, keyed by URL.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, digest[:2], digest)
+        return base + ".json", base + ".body"
+
+    def load(self, url):
+        """
+        Return (meta, body) for a cached URL, or (None, None).
+        """
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as file:
+                meta = json.load(file)
+            with open(body_path, "rb") as file:
+                body = zlib.decompress(file.read())
+        except (OSError, ValueError, zlib.error):
+            return None, None
+        if meta.get("url") != url:
+            return None, None
+        return meta, body
+
+    def store(self, url, response):
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {
+            "url": url,
+            "fetched_at": time.time(),
+            "headers": {name: response.headers[name] for name in STORED_HEADERS if name in response.headers},
+        }
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(body_path + suffix, "wb") as file:
+            file.write(zlib.compress(response.content, 1))
+        os.replace(body_path + suffix, body_path)
+        self._write_meta(meta_path, meta, suffix)
+
+    def _write_meta(self, meta_path, meta, suffix):
+        with open(meta_path + suffix, "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+        os.replace(meta_path + suffix, meta_path)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def fetch(self, url, send):
+        """
+        Return the response for `url`, calling send(extra_headers) only when the
+        cached copy is missing, stale or has to be revalidated.
+        """
+        meta, body = self.load(url)
+        headers = {}
+        if meta is not None:
+            validators = meta.get("headers", {})
+            if "ETag" in validators:
+                headers["If-None-Match"] = validators["ETag"]
+            if "Last-Modified" in validators:
+                headers["If-Modified-Since"] = validators["Last-Modified"]
+            if not headers and self.ttl is not None and time.time() - meta.get("fetched_at", 0) < self.ttl:
+                self._count("hits")
+                return _cached_response(url, meta, body)
+
+        response = send(headers)
+        if meta is not None and response.status_code == 304:
+            self._count("revalidated")
+            meta["fetched_at"] = time.time()
+            meta_path, _ = self._paths(url)
+            self._write_meta(meta_path, meta, f".{os.getpid()}.{threading.get_ident()}.tmp")
+            return _cached_response(url, meta, body)
+
+        self._count("misses")
+        if response.status_code == 200:
+            self.store(url, response)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
+
+
+def default_cache(ttl=None):
+    """
+    Return a ResponseCache for DEFAULT_CACHE_DIR, or None if caching is off.
+    """
+    if not DEFAULT_CACHE_DIR:
+        return None
+    return ResponseCache(DEFAULT_CACHE_DIR, ttl=ttl)
+
+
+def add_arguments(parser):
+    parser.add_argument("--cache-ttl", type=float,
+                        help="serve cached pages without ETag/Last-Modified for this many seconds "
+                             "instead of fetching them again")
+
+
+def format_cache_stats(cache):
+    """
+    Format the per-run hit/miss counters on one line.
+    """
+    if cache is None:
+        return ""
+    stats = cache.stats()
+    total = sum(stats.values())
+    if not total:
+        return ""
+    served = stats["hits"] + stats["revalidated"]
+    return (
+        f"cache: {stats['hits']} hits, {stats['revalidated']} revalidated (304), "
+        f"{stats['misses']} misses ({served / total:.0%} served from disk)"
+    )
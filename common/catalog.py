@@ -0,0 +1,332 @@
+"""
+Config-driven Part1 crawl of the ARI dealer sites (babbittsonline.com,
+canampartshouse.com, ...): brand page -> type pages -> year pages -> model
+links.
+
+The per-brand Part1 scripts were copies of one crawler that differed only in
+base_url, brand_url and a few XPaths. Each site is now a SiteConfig record in
+SITES. CatalogCrawler turns the tree into a breadth-first queue of pages
+served by a bounded pool of workers, so the type pages of a brand, and then
+all of its year pages, are fetched concurrently, for any number of sites in
+one process. Model rows are written to the site's CSV as soon as their year
+page is parsed, so they come out in completion order rather than the old
+depth-first order.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+from functools import partial
+
+from lxml import html
+
+from common.cache import add_arguments as add_cache_arguments
+from common.engine import AsyncFetcher, setup_logging
+from common.fetch import configure, print_stats
+from common.metrics import add_arguments as add_metrics_arguments, start_from_args
+from common.sink import CsvSink
+from common.throttle import AimdController
+
+PART1_HEADER = ["Brand", "Type", "Year", "Model", "URL"]
+
+SiteConfig = namedtuple("SiteConfig", [
+    "name",           # key used on the command line
+    "base_url",       # prepended to every href, exactly as the old scripts did
+    "brand_url",
+    "output_name",    # file name under the output directory; {timestamp} is filled in
+    "type_links",     # brand page -> type pages
+    "year_links",     # type page -> year pages
+    "model_links",    # year page -> model pages
+    "brand",          # fixed brand name, or None to read it from the pages
+    "brand_heading",  # brand page <h1> ("Honda Parts"), or None to use brand_path
+    "brand_path",     # breadcrumbs on the year page
+    "type_path",
+    "year_path",      # None to use the text of the year link
+    "diagram_base_url",  # what Part2 prepends to diagram hrefs, if not base_url
+], defaults=(
+    '//ul[@class="partsubselect"]//li/a',
+    '//div[@class="halfc"]//li/a',
+    '//ul[@class="partsubselect columnlist columnlist_33"]//li/a',
+    None,
+    None,
+    '//*[@id="partsselectlist"]/div[1]/ul/li[2]/a/span',
+    '//*[@id="partsselectlist"]/div[1]/ul/li[3]/a/span',
+    '//*[@id="partsselectlist"]/div[1]/ul/li[4]/a/span',
+    None,
+))
+
+BABBITTS = "https://www.babbittsonline.com"
+
+
+def _babbitts_landing(name, brand_url, output_name, wrapper_id):
+    """
+    The older babbitts brand landing pages: types are <h2> links and the
+    brand comes from the page heading; years are taken from their links.
+    """
+    return SiteConfig(name, BABBITTS, brand_url, output_name, type_links='//div[@class="grid_33"]//h2/a',
+                      brand_heading=f'//*[@id="contentWrapper_{wrapper_id}"]/div/h1', year_path=None)
+
+
+SITES = {site.name: site for site in [
+    _babbitts_landing("arctic_cat", "/arctic-cat-parts", "1_arctic_cat_1.csv", 29781),
+    _babbitts_landing("honda", "/honda-parts", "2_honda_1_{timestamp}.csv", 29705),
+    SiteConfig("honda_suzukipartshouse", "https://www.suzukipartshouse.com/", "/oemparts/c/honda/parts",
+               "2_honda_suzukipartshouse_1_{timestamp}.csv", type_links='//div[@class="grid_16 select"]//li/a',
+               year_links='//div[@class="grid_16 select"]//li/a', brand="Honda", diagram_base_url=BABBITTS),
+    _babbitts_landing("polaris", "/polaris-parts", "3_Polaris_1.csv", 29798),
+    _babbitts_landing("suzuki", "/suzuki-parts", "4_Suzuki_1.csv", 29810),
+    SiteConfig("suzuki_suzukipartshouse", "https://www.suzukipartshouse.com/", "/oemparts/c/suzuki/parts",
+               "4_Suzuki_suzukipartshouse_1_{timestamp}.csv", type_links='//div[@class="grid_16 select"]//li/a',
+               year_links='//div[@class="grid_16 select"]//li/a', brand="Honda"),
+    SiteConfig("ktm", BABBITTS, "/oemparts/c/ktm/parts", "5_KTM_1_{timestamp}.csv"),
+    SiteConfig("star", BABBITTS, "/oemparts/c/yamaha_motorcycle/parts", "6_Star_1_{timestamp}.csv"),
+    SiteConfig("textron", BABBITTS, "/oemparts/c/textron_off_road/parts", "7_Textron_1_{timestamp}.csv",
+               year_links='//ul[@class="partsubselect"]//li/a'),
+    SiteConfig("kawasaki", BABBITTS, "/oemparts/c/kawasaki/parts", "8_Kawasaki_1_{timestamp}.csv"),
+    SiteConfig("yamaha", BABBITTS, "/oemparts/c/yamaha/parts", "9_Yamaha_1_{timestamp}.csv",
+               type_links='//ul[@class="partsubselect columnlist"]//li/a'),
+    SiteConfig("can_am", "https://www.canampartshouse.com/", "oemparts/c/can_am/parts", "10_Can_Am_1_{timestamp}.csv",
+               diagram_base_url="https://www.canampartshouse.com"),
+    SiteConfig("husqvarna", "https://www.ktmpartspro.com", "/oemparts/c/husqvarna/parts",
+               "11_Husqvarna_1_{timestamp}.csv"),
+    SiteConfig("indian", "https://www.polarispartsnation.com", "/oemparts/c/indian/parts",
+               "12_Indian_1_{timestamp}.csv"),
+    SiteConfig("sea_doo", "https://www.seadoopartshouse.com/", "/oemparts/c/sea_doo/parts",
+               "13_See_Doo_1_{timestamp}.csv"),
+    SiteConfig("ski_doo", "https://www.skidoopartshouse.com", "/oemparts/c/ski_doo/parts",
+               "14_Ski_Doo_1_{timestamp}.csv"),
+    SiteConfig("victory", "https://www.partspitstop.com", "/oemparts/c/victory/parts", "15_Victory_1_{timestamp}.csv"),
+]}
+
+# Levels of the page tree; each queued page is (site, level, url, labels).
+BRAND, TYPE, YEAR = "brand", "type", "year"
+
+
+def _links(doc, xpath):
+    return [(element.text, element.get("href")) for element in doc.xpath(xpath)]
+
+
+def _heading(doc, xpath):
+    elements = doc.xpath(xpath)
+    if not elements:
+        raise ValueError(f"Heading not found: {xpath}")
+    return elements[0].text.strip()
+
+
+def parse_brand_page(site, content):
+    """
+    Return (brand, [(type, href)]) from a brand page. brand is None unless
+    the site names it on this page or in its config.
+    """
+    doc = html.fromstring(content)
+    brand = site.brand
+    if brand is None and site.brand_heading:
+        brand = _heading(doc, site.brand_heading).replace("Parts", "").strip()
+    return brand, _links(doc, site.type_links)
+
+
+def parse_type_page(site, content):
+    """
+    Return [(year, href)] from a type page.
+    """
+    return _links(html.fromstring(content), site.year_links)
+
+
+def parse_year_page(site, brand, year, content):
+    """
+    Return (brand, type, year, [(model, href)]) from a year page. Labels the
+    brand page or the year link did not provide come from the breadcrumbs.
+    """
+    doc = html.fromstring(content)
+    brand = brand or _heading(doc, site.brand_path)
+    type = _heading(doc, site.type_path)
+    if site.year_path:
+        year = _heading(doc, site.year_path)
+    return brand, type, year, _links(doc, site.model_links)
+
+
+class CatalogCrawler(AsyncFetcher):
+    """
+    Breadth-first crawl of the type -> year -> model tree of several sites,
+    with `workers` pages in progress at once and at most `per_host` requests
+    in flight per host.
+    """
+
+    def __init__(self, per_host=4, workers=16, retry_policy=None, pool=None):
+        super().__init__(per_host=per_host, retry_policy=retry_policy, pool=pool)
+        self.workers = workers
+        self.models_found = {}
+        self.pages_done = 0
+        self._queue = None
+        self._write_rows = None
+
+    async def visit(self, site, level, url, labels):
+        """
+        Fetch and parse one page; queue its child pages or write its model rows.
+        """
+        content = await self.fetch(url)
+        if content is None:
+            self.page_failed(site, level, url, labels)
+            return
+        try:
+            if level == BRAND:
+                brand, types = await self.parse(partial(parse_brand_page, site), content)
+                for _, href in types:
+                    self.follow(site, TYPE, site.base_url + href, (brand, None))
+            elif level == TYPE:
+                years = await self.parse(partial(parse_type_page, site), content)
+                for year, href in years:
+                    self.follow(site, YEAR, site.base_url + href, (labels[0], year))
+            else:
+                brand, type, year, models = await self.parse(partial(parse_year_page, site, *labels), content)
+                await self.year_done(site, url, models,
+                                     [[brand, type, year, model, site.base_url + href] for model, href in models])
+        except Exception as e:
+            logging.error(f"Skipping {level} page '{url}': {e}")
+            self.page_failed(site, level, url, labels)
+        self.pages_done += 1
+
+    def follow(self, site, level, url, labels):
+        """
+        Queue a child page of one just parsed.
+        """
+        self._queue.put_nowait((site, level, url, labels))
+
+    def page_failed(self, site, level, url, labels):
+        if level == BRAND:
+            logging.error(f"Could not read the brand page of {site.name}")
+
+    async def year_done(self, site, url, models, rows):
+        """
+        Handle the parsed (model, href) links of one year page and their rows.
+        """
+        await self.emit(site, rows)
+        self.models_found[site.name] += len(rows)
+
+    async def emit(self, site, rows):
+        """
+        Hand on the model rows of one year page.
+        """
+        started = time.perf_counter()
+        self._write_rows(site, rows)
+        self.metrics.observe("write_seconds", time.perf_counter() - started, stage="part1")
+        self.metrics.inc("rows_total", len(rows), stage="part1")
+
+    async def _worker(self):
+        while True:
+            site, level, url, labels = await self._queue.get()
+            try:
+                await self.visit(site, level, url, labels)
+            finally:
+                self._queue.task_done()
+
+    async def run(self, sites, write_rows):
+        """
+        Crawl every site, calling write_rows(site, rows) once per year page.
+        """
+        self._queue = asyncio.Queue()
+        self._write_rows = write_rows
+        for site in sites:
+            self.models_found[site.name] = 0
+            self._queue.put_nowait((site, BRAND, site.base_url + site.brand_url, (None, None)))
+        workers = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        try:
+            await self._queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.close()
+
+
+def with_base_url(site, base_url):
+    """
+    Point a site at another host, e.g. a local replay server, keeping the
+    trailing-slash convention its hrefs are joined with.
+    """
+    base_url = base_url.rstrip("/")
+    return site._replace(
+        base_url=base_url + ("/" if site.base_url.endswith("/") else ""),
+        diagram_base_url=base_url if site.diagram_base_url else None,
+    )
+
+
+def select_sites(parser, args):
+    """
+    The SiteConfigs named on the command line (or all of them with --all),
+    with --base-url applied.
+    """
+    if args.all:
+        args.sites = sorted(SITES)
+    if not args.sites:
+        parser.error("name at least one site or pass --all")
+    unknown = [name for name in args.sites if name not in SITES]
+    if unknown:
+        parser.error("unknown site: " + ", ".join(unknown))
+    sites = [SITES[name] for name in args.sites]
+    if args.base_url:
+        sites = [with_base_url(site, args.base_url) for site in sites]
+    return sites
+
+
+def output_file(site, output_dir="csv"):
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    return os.path.join(output_dir, site.output_name.format(timestamp=timestamp))
+
+
+def crawl(sites, per_host=4, workers=16, output_dir="csv", cache_ttl=None):
+    """
+    Crawl every SiteConfig in `sites` concurrently, each into its own CSV.
+    Returns {site name: output file} and the crawler for its counters.
+    """
+    configure(pool_size=per_host, controller=AimdController(maximum=per_host), cache_ttl=cache_ttl)
+    crawler = CatalogCrawler(per_host=per_host, workers=workers)
+    files = {site.name: output_file(site, output_dir) for site in sites}
+    sinks = {name: CsvSink(file_name) for name, file_name in files.items()}
+
+    def write_rows(site, rows):
+        sink = sinks[site.name]
+        sink.write_rows(rows)
+        sink.flush()
+
+    try:
+        for sink in sinks.values():
+            sink.write(PART1_HEADER)
+        asyncio.run(crawler.run(sites, write_rows))
+    finally:
+        for sink in sinks.values():
+            sink.close()
+    return files, crawler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Part1 type/year/model crawl of one or more dealer sites.")
+    parser.add_argument("sites", nargs="*", metavar="site", help="sites to crawl: " + ", ".join(sorted(SITES)))
+    parser.add_argument("--all", action="store_true", help="crawl every configured site")
+    parser.add_argument("--per-host", type=int, default=4, help="max in-flight requests per host")
+    parser.add_argument("--workers", type=int, default=16, help="pages in progress at once, over all sites")
+    parser.add_argument("--output-dir", default="csv")
+    parser.add_argument("--base-url", help="fetch from this host instead, e.g. a local replay server")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    sites = select_sites(parser, args)
+
+    setup_logging()
+    start_from_args(args)
+    print("started! " + ", ".join(args.sites))
+    started = time.monotonic()
+    files, crawler = crawl(sites, per_host=args.per_host, workers=args.workers,
+                           output_dir=args.output_dir, cache_ttl=args.cache_ttl)
+    elapsed = time.monotonic() - started
+    for name, file_name in files.items():
+        print(f"{name}: {crawler.models_found.get(name, 0)} models -> {file_name}")
+    print(f"ended! {crawler.pages_done} pages in {elapsed:.0f}s")
+    print_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Parquet output for Part2 part rows, with the same 11 columns as the CSV.
+
+The CSV repeats brand, type, year, model, diagram name and diagram URL on
+every part row. ParquetSink dictionary-encodes those columns, stores Price
+as a float (None when the page had no usable price) and writes a row group
+every `row_group_rows` rows while the crawl runs, so memory stays bounded.
+
+pyarrow is optional: it is only imported when a ParquetSink is opened.
+A Parquet file cannot be cut back to a checkpoint like the CSV can, so runs
+writing Parquet are not journaled.
+"""
+import os
+import threading
+
+from common.parts import HEADER
+from common.sink import _register, _unregister
+
+DEFAULT_ROW_GROUP_ROWS = int(os.environ.get("SCRAPER_PARQUET_ROW_GROUP", "100000"))
+
+# Columns whose values repeat on every part row of a model or diagram.
+DICTIONARY_COLUMNS = ("Brand", "Type", "Year", "Model", "Diagram Name", "OEM diagram URL")
+PRICE_COLUMN = "Price"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet output needs pyarrow (pip install pyarrow)") from e
+    return pyarrow, pyarrow.parquet
+
+
+def parse_price(text):
+    """
+    "1,234.50" -> 1234.5; empty or non-numeric -> None.
+    """
+    try:
+        return float(text.replace("$", "").replace(",", "").strip())
+    except (AttributeError, ValueError):
+        return None
+
+
+def part_schema(pa):
+    fields = []
+    for name in HEADER:
+        if name == PRICE_COLUMN:
+            fields.append(pa.field(name, pa.float64()))
+        elif name in DICTIONARY_COLUMNS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+def is_parquet(file_name):
+    return file_name.endswith(".parquet")
+
+
+class ParquetSink:
+    """
+    Collect part rows column by column and write them as Parquet row groups.
+    Offers the write/write_rows/flush/close calls of CsvSink.
+    """
+
+    def __init__(self, file_name, row_group_rows=DEFAULT_ROW_GROUP_ROWS, compression="zstd"):
+        pa, pq = _pyarrow()
+        self._pa = pa
+        self.file_name = file_name
+        self.row_group_rows = row_group_rows
+        self.schema = part_schema(pa)
+        self._writer = pq.ParquetWriter(file_name, self.schema, compression=compression)
+        self._columns = [[] for _ in HEADER]
+        self._buffered = 0
+        self.rows_written = 0
+        self._lock = threading.RLock()
+        _register(self)
+
+    def write(self, row):
+        with self._lock:
+            for column, value in zip(self._columns, row, strict=True):
+                column.append(value)
+            self._buffered += 1
+            if self._buffered >= self.row_group_rows:
+                self.flush()
+
+    def write_rows(self, rows):
+        """
+        Append a batch column by column: the batch is transposed in one pass
+        instead of appending each value of each row.
+        """
+        rows = list(rows)
+        with self._lock:
+            while rows:
+                batch = rows[:self.row_group_rows - self._buffered]
+                del rows[:len(batch)]
+                for column, values in zip(self._columns, zip(*batch, strict=True), strict=True):
+                    column.extend(values)
+                self._buffered += len(batch)
+                if self._buffered >= self.row_group_rows:
+                    self.flush()
+
+    def flush(self, fsync=False):
+        """
+        Write the buffered rows as one row group. The file only becomes
+        readable once it is closed, so there is nothing to fsync before that.
+        """
+        with self._lock:
+            if not self._buffered or self._writer is None:
+                return
+            pa = self._pa
+            arrays = []
+            for name, values in zip(HEADER, self._columns):
+                if name == PRICE_COLUMN:
+                    arrays.append(pa.array([parse_price(value) for value in values], type=pa.float64()))
+                elif name in DICTIONARY_COLUMNS:
+                    arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+                else:
+                    arrays.append(pa.array(values, type=pa.string()))
+            self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+            self.rows_written += self._buffered
+            self._columns = [[] for _ in HEADER]
+            self._buffered = 0
+
+    def close(self):
+        with self._lock:
+            if self._writer is None:
+                return
+            self.flush()
+            self._writer.close()
+            self._writer = None
+        _unregister(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,135 @@
+"""
+SQLite output for Part2 part rows: one de-duplicated, queryable dataset
+instead of a pile of overlapping csv/*_2_<timestamp>.csv files.
+
+Rows are upserted on (brand, type, year, model, diagram URL, ref, part
+number); the output rows carry the model's labels rather than its URL, so the
+labels identify the model. Rerunning a range, or crawling overlapping
+shards, updates the existing rows instead of adding copies. The database runs
+in WAL mode with a busy timeout, so several shard processes can write to the
+same file, and rows are written `batch_rows` at a time in one transaction.
+
+The primary key doubles as the index for model lookups; part_rows_part_number
+serves part-number lookups.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from common.sink import _register, _unregister
+
+DEFAULT_BATCH_ROWS = int(os.environ.get("SCRAPER_SQLITE_BATCH", "1000"))
+BUSY_TIMEOUT = float(os.environ.get("SCRAPER_SQLITE_TIMEOUT", "120"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS part_rows (
+    brand TEXT NOT NULL,
+    type TEXT NOT NULL,
+    year TEXT NOT NULL,
+    model TEXT NOT NULL,
+    diagram_name TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    part_description TEXT NOT NULL,
+    part_number TEXT NOT NULL,
+    diagram_url TEXT NOT NULL,
+    price TEXT NOT NULL,
+    sspn TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (brand, type, year, model, diagram_url, ref, part_number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS part_rows_part_number ON part_rows (part_number);
+"""
+
+UPSERT = """
+INSERT INTO part_rows (brand, type, year, model, diagram_name, ref, part_description, part_number,
+                       diagram_url, price, sspn, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (brand, type, year, model, diagram_url, ref, part_number) DO UPDATE SET
+    diagram_name = excluded.diagram_name,
+    part_description = excluded.part_description,
+    price = excluded.price,
+    sspn = excluded.sspn,
+    updated_at = excluded.updated_at
+"""
+
+
+def is_sqlite(file_name):
+    return file_name.endswith((".sqlite", ".db"))
+
+
+class SqliteSink:
+    """
+    Upsert 11-column part rows into a SQLite database in batched transactions.
+    Offers the write/write_rows/flush/tell/close calls of CsvSink.
+    """
+
+    def __init__(self, file_name, batch_rows=DEFAULT_BATCH_ROWS, timeout=BUSY_TIMEOUT):
+        self.file_name = file_name
+        self.batch_rows = batch_rows
+        self.rows_written = 0
+        self._connection = sqlite3.connect(file_name, timeout=timeout, isolation_level=None,
+                                           check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._buffer = []
+        self._lock = threading.RLock()
+        _register(self)
+
+    def write(self, row):
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_rows:
+                self.flush()
+
+    def write_rows(self, rows):
+        with self._lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.batch_rows:
+                self.flush()
+
+    def flush(self, fsync=False):
+        """
+        Upsert the buffered rows in one transaction. With fsync, also
+        checkpoint the WAL so the rows are in the main database file.
+        """
+        with self._lock:
+            if self._connection is None:
+                return
+            if self._buffer:
+                updated_at = datetime.now().isoformat(timespec="seconds")
+                rows = [tuple(row) + (updated_at,) for row in self._buffer]
+                self._connection.execute("BEGIN IMMEDIATE")
+                try:
+                    self._connection.executemany(UPSERT, rows)
+                except BaseException:
+                    self._connection.execute("ROLLBACK")
+                    raise
+                self._connection.execute("COMMIT")
+                self.rows_written += len(rows)
+                self._buffer.clear()
+            if fsync:
+                self._connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def tell(self):
+        """
+        Rows written so far; stands in for the byte offset a journal records.
+        """
+        with self._lock:
+            return self.rows_written
+
+    def close(self):
+        with self._lock:
+            if self._connection is None:
+                return
+            self.flush()
+            self._connection.close()
+            self._connection = None
+        _unregister(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
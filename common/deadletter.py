@@ -0,0 +1,136 @@
+"""
+Dead-letter store for the Part2 crawl: model and diagram URLs that failed,
+kept with the row context needed to crawl them again later.
+
+A JSON-lines file next to the output (<output>.deadletter), written like the
+RunJournal. A failure line holds the input row number, the model row
+(brand, type, year, model, model URL), for a diagram also its name, the URL,
+the reason and the time. A resolved line marks an entry done once its rows
+are in the output. Recording the same URL again only bumps its failure
+count, so an entry that fails on every pass stays a single entry.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+MODEL, DIAGRAM = "model", "diagram"
+
+
+def _key(entry):
+    return entry["kind"], entry["row"], entry["url"]
+
+
+class DeadLetterStore:
+    """
+    Append-only record of failed model/diagram URLs and which were since recovered.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pending = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._file = None  # opened on the first failure, so clean runs leave no file
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, mode="r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logging.warning(f"Skipping unreadable dead-letter line in '{self.path}'")
+                    continue
+                key = _key(entry)
+                if entry.get("resolved"):
+                    self._pending.pop(key, None)
+                else:
+                    self._pending[key] = entry
+                    self._failures[key] = entry["failures"]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _append(self, entry):
+        if self._file is None:
+            self._file = open(self.path, mode="a", encoding="utf-8")
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def record(self, kind, row_number, model_row, url, reason, diagram_name=None):
+        with self._lock:
+            key = (kind, row_number, url)
+            self._failures[key] = self._failures.get(key, 0) + 1
+            entry = {"kind": kind, "row": row_number, "model_row": list(model_row[:5]), "url": url,
+                     "diagram_name": diagram_name, "reason": reason, "failures": self._failures[key],
+                     "failed_at": time.time()}
+            self._pending[key] = entry
+            self._append(entry)
+
+    def failures(self, entry):
+        with self._lock:
+            return self._failures.get(_key(entry), 0)
+
+    def is_pending(self, entry):
+        with self._lock:
+            return _key(entry) in self._pending
+
+    def pending(self):
+        """
+        Unresolved entries, models before diagrams, in input row order.
+        """
+        with self._lock:
+            return sorted(self._pending.values(), key=lambda entry: (entry["row"], entry["kind"] != MODEL))
+
+    def row_pending(self, row_number, ignore=None):
+        """
+        Whether any entry for this input row, other than `ignore`, is unresolved.
+        """
+        skip = ignore and _key(ignore)
+        with self._lock:
+            return any(key[1] == row_number and key != skip for key in self._pending)
+
+    def resolve(self, entry):
+        self.discard(entry["kind"], entry["row"], entry["url"])
+
+    def discard(self, kind, row_number, url):
+        """
+        Mark the entry for this URL resolved, if there is one: its rows are in the output.
+        """
+        with self._lock:
+            if self._pending.pop((kind, row_number, url), None) is not None:
+                self._append({"kind": kind, "row": row_number, "url": url, "resolved": True})
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def merge_stores(paths, path):
+    """
+    Collect the pending entries of several stores (e.g. one per shard) into a
+    new one at `path`, replacing what was there. Returns the number of entries.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    with DeadLetterStore(path) as merged:
+        for source in paths:
+            if not os.path.exists(source):
+                continue
+            with DeadLetterStore(source) as store:
+                for entry in store.pending():
+                    merged.record(entry["kind"], entry["row"], entry["model_row"], entry["url"], entry["reason"],
+                                  entry["diagram_name"])
+        return len(merged)
@@ -0,0 +1,532 @@
+"""
+Asyncio engine for the Part2 model -> diagram -> partlistrow crawl.
+
+The per-brand scripts fetch one page at a time. The engine keeps a window of
+model rows in flight, fetches their diagram pages concurrently (bounded per
+host), and still writes the rows in input order so the output matches what
+the sequential loop produces. Each OEM assembly is fetched and parsed once
+per run; every model that links to it reuses the parsed parts. Progress is
+checkpointed in a RunJournal, so a restarted run picks up where it stopped.
+
+Model and diagram pages that still fail after a couple of attempts are put
+in a DeadLetterStore instead of holding up the window with long backoffs;
+`--retry-failed` later re-drives only those URLs, one request per host at
+a time with a patient retry policy, and appends their rows to the output.
+
+`per_host` is a ceiling: below it the shared pool's AIMD controller decides
+how many requests a host actually gets, based on timeouts and 429/5xx.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+from common.cache import add_arguments as add_cache_arguments
+from common.columnar import ParquetSink, is_parquet
+from common.database import SqliteSink, is_sqlite
+from common.deadletter import DIAGRAM, MODEL, DeadLetterStore
+from common.fetch import configure, get_pool, host_of, print_stats, rebase_url
+from common.journal import RunJournal
+from common.metrics import add_arguments as add_metrics_arguments, get_metrics, start_from_args
+from common.parts import (HEADER, assembly_key, key_parts, load_diagram_keys, parse_diagram_page, parse_model_page,
+                          part_rows, read_models, StringPool)
+from common.retry import FetchFailed, RetryPolicy, record_failure
+from common.sink import CsvSink
+from common.throttle import AimdController, format_snapshot
+
+
+DEFAULT_BASE_URL = "https://www.babbittsonline.com"
+MAIN_PASS_ATTEMPTS = 2
+DEFERRED_ATTEMPTS = 8
+
+
+class AsyncFetcher:
+    """
+    Fetch pages through the shared SessionPool from asyncio code, with at most
+    `per_host` requests in flight per host. Blocking work runs in a thread pool.
+    """
+
+    def __init__(self, per_host=8, retry_policy=None, pool=None):
+        self.per_host = per_host
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.pool = pool or get_pool()
+        self.metrics = get_metrics()
+        self.failures = {}  # url -> reason it was last given up on
+        self._semaphores = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(per_host * 2, 4))
+
+    def _fetch_sync(self, url):
+        try:
+            content = self.retry_policy.fetch(url, get=self.pool.get)
+        except FetchFailed as e:
+            record_failure(e)
+            self.failures[url] = e.reason
+            return None
+        self.failures.pop(url, None)
+        return content
+
+    async def fetch(self, url):
+        """
+        Fetch a URL in the thread pool, holding one of its host's slots meanwhile.
+        """
+        host = host_of(url)
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        async with semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._fetch_sync, url)
+
+    async def parse(self, parser, content):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._parse_timed, parser, content)
+
+    def _parse_timed(self, parser, content):
+        started = time.perf_counter()
+        try:
+            return parser(content)
+        finally:
+            page = getattr(parser, "func", parser).__name__.removeprefix("parse_")
+            self.metrics.observe("parse_seconds", time.perf_counter() - started, page=page)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class DiagramCrawler(AsyncFetcher):
+    """
+    Crawl model rows concurrently with at most `per_host` requests in flight per host.
+    Diagram hrefs are fetched from `base_url`; model URLs as the input has
+    them, or from `model_base_url` if given.
+    """
+
+    def __init__(self, base_url, diagram_keys, per_host=8, window=32, retry_policy=None, pool=None,
+                 status_every=100, journal=None, full_diagrams=False, dead_letters=None, model_base_url=None):
+        super().__init__(per_host=per_host, retry_policy=retry_policy, pool=pool)
+        self.base_url = base_url
+        self.model_base_url = model_base_url
+        self.diagram_keys = diagram_keys
+        self.full_diagrams = full_diagrams
+        self.window = window
+        self.status_every = status_every
+        self.journal = journal
+        self.dead_letters = dead_letters
+        self.models_done = 0
+        self.diagrams_done = 0
+        self.assemblies_parsed = 0
+        self.recovered = 0
+        self._assemblies = {}
+        self.strings = StringPool()
+
+    async def load_assembly(self, oem_diagram_url):
+        """
+        Fetch and parse one diagram page; None if either step failed.
+        """
+        content = await self.fetch(oem_diagram_url)
+        if content is None:
+            return None
+        try:
+            parts = await self.parse(parse_diagram_page, content)
+        except Exception as e:
+            logging.error(f"Error processing diagram content from '{oem_diagram_url}': {e}")
+            self.failures[oem_diagram_url] = f"parse error: {e}"
+            return None
+        self.assemblies_parsed += 1
+        return parts
+
+    def _dead_letter(self, kind, row_number, model_row, url, diagram_name=None):
+        if self.dead_letters is not None:
+            reason = self.failures.get(url, "failed")
+            self.dead_letters.record(kind, row_number, model_row, url, reason, diagram_name)
+
+    def model_url(self, model_row):
+        if self.model_base_url:
+            return rebase_url(model_row[4], self.model_base_url)
+        return model_row[4]
+
+    def _resolve_done(self, row_number, model_row, done_urls):
+        """
+        Clear the dead letters of whatever this row's rows, now flushed, came
+        from, so a URL that failed on an earlier pass is not crawled again.
+        """
+        if self.dead_letters is None:
+            return
+        model_url = self.model_url(model_row)
+        if model_url not in self.failures:
+            self.dead_letters.discard(MODEL, row_number, model_url)
+        for url in done_urls:
+            self.dead_letters.discard(DIAGRAM, row_number, url)
+
+    async def crawl_diagram(self, model_row, diagram_name, oem_diagram_url):
+        """
+        Return the output rows for one diagram of a model, or None if it failed.
+        """
+        key = assembly_key(oem_diagram_url)
+        task = self._assemblies.get(key)
+        if task is None:
+            task = self._assemblies[key] = asyncio.ensure_future(self.load_assembly(oem_diagram_url))
+        parts = await task
+        if parts is None:
+            # Let the next model that links to this assembly try again.
+            if self._assemblies.get(key) is task:
+                del self._assemblies[key]
+            return None
+        self.diagrams_done += 1
+        if not self.full_diagrams:
+            parts = key_parts(self.diagram_keys, model_row[0], diagram_name, parts)
+        return part_rows(model_row, diagram_name, oem_diagram_url, parts, self.strings)
+
+    async def crawl_model(self, row_number, model_row):
+        """
+        Crawl one [brand, type, year, model, model_url] row and return
+        (rows, diagram URLs that succeeded, whether nothing failed).
+        Diagrams the journal already has for this row are skipped.
+        """
+        brand, model_url = model_row[0], self.model_url(model_row)
+        content = await self.fetch(model_url)
+        if content is None:
+            self._dead_letter(MODEL, row_number, model_row, model_url)
+            return [], [], False
+        try:
+            diagrams = await self.parse(parse_model_page, content)
+        except Exception as e:
+            logging.error(f"Error processing model page '{model_url}': {e}")
+            self.failures[model_url] = f"parse error: {e}"
+            self._dead_letter(MODEL, row_number, model_row, model_url)
+            return [], [], False
+
+        diagram_urls = []
+        tasks = []
+        for diagram_name, diagram_href in diagrams:
+            if (brand, diagram_name) not in self.diagram_keys:
+                continue
+            oem_diagram_url = self.base_url + diagram_href
+            if self.journal is not None and self.journal.diagram_done(row_number, oem_diagram_url):
+                continue
+            diagram_urls.append((diagram_name, oem_diagram_url))
+            tasks.append(self.crawl_diagram(model_row, diagram_name, oem_diagram_url))
+
+        rows = []
+        done_urls = []
+        for (diagram_name, oem_diagram_url), diagram_rows in zip(diagram_urls, await asyncio.gather(*tasks)):
+            if diagram_rows is not None:
+                rows.extend(diagram_rows)
+                done_urls.append(oem_diagram_url)
+            else:
+                self._dead_letter(DIAGRAM, row_number, model_row, oem_diagram_url, diagram_name)
+        self.models_done += 1
+        return rows, done_urls, len(done_urls) == len(diagram_urls)
+
+    async def run(self, models, write_rows, output=None):
+        """
+        Crawl (row_number, model_row) pairs from a plain or async iterable,
+        passing each model's output rows to write_rows in the same order the
+        sequential scripts would have written them. With a journal, every finished row is
+        checkpointed against the `output` sink.
+        """
+        pending = deque()
+        try:
+            async for row_number, model_row in _as_async(models):
+                if self.journal is not None and self.journal.model_done(row_number):
+                    continue
+                pending.append((row_number, model_row,
+                                asyncio.ensure_future(self.crawl_model(row_number, model_row))))
+                if len(pending) >= self.window:
+                    await self._drain_one(pending, write_rows, output)
+            while pending:
+                await self._drain_one(pending, write_rows, output)
+        finally:
+            for _, _, task in pending:
+                task.cancel()
+            self.close()
+
+    async def _drain_one(self, pending, write_rows, output):
+        row_number, model_row, task = pending.popleft()
+        rows, done_urls, complete = await task
+        self._write(rows, write_rows)
+        if self.journal is not None:
+            self.journal.commit(row_number, done_urls, complete, output)
+            self._resolve_done(row_number, model_row, done_urls)
+        print(row_number)
+        if self.status_every and row_number % self.status_every == 0:
+            print(format_snapshot(self.pool.controller))
+
+    def _write(self, rows, write_rows):
+        if rows:
+            started = time.perf_counter()
+            write_rows(rows)
+            self.metrics.observe("write_seconds", time.perf_counter() - started, stage="part2")
+            self.metrics.inc("rows_total", len(rows), stage="part2")
+
+    def _already_done(self, entry):
+        if self.journal is None:
+            return False
+        if entry["kind"] == MODEL:
+            return self.journal.model_done(entry["row"])
+        return self.journal.diagram_done(entry["row"], entry["url"])
+
+    async def redrive(self, entries, write_rows, output, pace=0.0):
+        """
+        Crawl dead-letter entries again one at a time, `pace` seconds apart,
+        and write whatever they now yield. An entry is resolved once its rows
+        are flushed (and journaled); one that fails again stays pending with
+        its failure count bumped. A model entry whose page now loads is
+        resolved even if some of its diagrams fail; those get entries of their own.
+        Entries the journal already has rows for, or that an earlier entry of
+        this pass recovered, are resolved without being fetched.
+        """
+        try:
+            fetched = False
+            for entry in entries:
+                row_number, model_row = entry["row"], entry["model_row"]
+                if not self.dead_letters.is_pending(entry) or self._already_done(entry):
+                    self.dead_letters.resolve(entry)
+                    print(f"{row_number} {entry['kind']} already done: {entry['url']}")
+                    continue
+                if fetched and pace:
+                    await asyncio.sleep(pace)
+                fetched = True
+                failures = self.dead_letters.failures(entry)
+                if entry["kind"] == MODEL:
+                    rows, done_urls, _ = await self.crawl_model(row_number, model_row)
+                else:
+                    rows = await self.crawl_diagram(model_row, entry["diagram_name"], entry["url"])
+                    done_urls = [entry["url"]]
+                    if rows is None:
+                        rows, done_urls = [], []
+                        self._dead_letter(DIAGRAM, row_number, model_row, entry["url"], entry["diagram_name"])
+                self._write(rows, write_rows)
+                recovered = self.dead_letters.failures(entry) == failures
+                if self.journal is not None:
+                    complete = recovered and not self.dead_letters.row_pending(row_number, ignore=entry)
+                    self.journal.commit(row_number, done_urls, complete, output)
+                else:
+                    output.flush(fsync=True)
+                if recovered:
+                    self.dead_letters.resolve(entry)
+                    self.recovered += 1
+                self._resolve_done(row_number, model_row, done_urls)
+                print(f"{row_number} {entry['kind']} {'recovered' if recovered else 'failed again'}: {entry['url']}")
+        finally:
+            self.close()
+
+
+async def _as_async(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def default_output_file(input_file, extension=".csv"):
+    """
+    Map result_part1/9_Yamaha_1_<ts>.csv to csv/9_Yamaha_2_<now>.csv.
+    """
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    stem = re.sub(r"_1(_\d{14})?$", "", stem)
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    return os.path.join("csv", f"{stem}_2_{timestamp}{extension}")
+
+
+def open_output(file_name):
+    """
+    Open the Part2 output sink: Parquet for a .parquet name, SQLite for .sqlite
+    or .db, CSV (with its header, unless the file already has rows) otherwise.
+    """
+    if is_parquet(file_name):
+        return ParquetSink(file_name)
+    if is_sqlite(file_name):
+        return SqliteSink(file_name)
+    sink = CsvSink(file_name)
+    if sink.tell() == 0:
+        sink.write(HEADER)
+    return sink
+
+
+def retry_output_file(csv_file):
+    """
+    Where a retry pass writes: the output itself, except for Parquet, which
+    cannot be appended to. Each Parquet pass gets a new
+    <name>.retry-<timestamp>.parquet next to it, so the rows of earlier
+    passes, whose dead letters are already resolved, are kept.
+    """
+    if not is_parquet(csv_file):
+        return csv_file
+    stem = os.path.splitext(csv_file)[0]
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    file_name = f"{stem}.retry-{timestamp}.parquet"
+    number = 1
+    while os.path.exists(file_name):
+        number += 1
+        file_name = f"{stem}.retry-{timestamp}-{number}.parquet"
+    return file_name
+
+
+def crawl(input_file, csv_file, base_url, key_file="key.csv", per_host=8, window=32, start=1, stop=None,
+          journal_file=None, full_diagrams=False, dead_letter_file=None, main_attempts=MAIN_PASS_ATTEMPTS,
+          model_base_url=None, cache_ttl=None):
+    """
+    Crawl input rows [start, stop) of a Part1 CSV into csv_file, resuming from
+    the journal if an earlier run left one; a CSV with rows but no journal
+    raises ValueError rather than being cut back. Only the key.csv parts of each
+    diagram are written unless full_diagrams is set. A .parquet csv_file is
+    written as Parquet, without a journal, and must not exist yet (nor its
+    dead-letter store); a .sqlite one is upserted into, so
+    rows redone after the last checkpoint replace themselves. Pages still
+    failing after `main_attempts` tries go to the dead-letter store
+    (<csv_file>.deadletter) for retry_failed(). Model pages are fetched from
+    model_base_url instead of the input's host if given. Returns the crawler for its counters.
+    """
+    dead_letter_file = dead_letter_file or csv_file + ".deadletter"
+    if is_parquet(csv_file):
+        for file_name in (csv_file, dead_letter_file):
+            if os.path.exists(file_name):
+                raise ValueError(f"'{file_name}' already exists; a Parquet run cannot be resumed, "
+                                 f"so write it to a new --output")
+    configure(pool_size=per_host, controller=AimdController(maximum=per_host), cache_ttl=cache_ttl)
+    diagram_keys = load_diagram_keys(key_file)
+    journal = None
+    if not is_parquet(csv_file):
+        journal = RunJournal(journal_file or csv_file + ".journal")
+        if not is_sqlite(csv_file):
+            journal.restore_output(csv_file)
+        if len(journal):
+            print(f"resuming: {len(journal)} input rows already done")
+    dead_letters = DeadLetterStore(dead_letter_file)
+    crawler = DiagramCrawler(base_url, diagram_keys, per_host=per_host, window=window, journal=journal,
+                             full_diagrams=full_diagrams, dead_letters=dead_letters, model_base_url=model_base_url,
+                             retry_policy=RetryPolicy(max_attempts=main_attempts))
+
+    with open_output(csv_file) as sink:
+        models = read_models(input_file, start=start, stop=stop)
+        try:
+            asyncio.run(crawler.run(models, sink.write_rows, sink))
+        finally:
+            if journal is not None:
+                journal.close()
+            dead_letters.close()
+    return crawler
+
+
+def retry_failed(csv_file, base_url, key_file="key.csv", per_host=1, pace=1.0, journal_file=None,
+                 full_diagrams=False, dead_letter_file=None, retry_policy=None, model_base_url=None):
+    """
+    Deferred pass over the dead letters of an earlier crawl into csv_file:
+    only the failed model and diagram URLs are fetched, gently, and their
+    rows are appended to the output (upserted for SQLite, written to a
+    retry_output_file() of their own for Parquet). The journal is
+    used only if the main pass kept one, so pipeline and merged sharded
+    outputs are never cut back. Returns the crawler, or None if nothing was pending.
+    """
+    dead_letters = DeadLetterStore(dead_letter_file or csv_file + ".deadletter")
+    entries = dead_letters.pending()
+    if not entries:
+        print(f"nothing to retry in {dead_letters.path}")
+        return None
+    output_file = retry_output_file(csv_file)
+    print(f"retrying {len(entries)} failed URLs from {dead_letters.path} into {output_file}")
+    configure(pool_size=per_host, controller=AimdController(maximum=per_host))
+    journal_file = journal_file or csv_file + ".journal"
+    journal = None
+    if not is_parquet(csv_file) and os.path.exists(journal_file):
+        journal = RunJournal(journal_file)
+        if not is_sqlite(csv_file):
+            journal.restore_output(csv_file)
+    crawler = DiagramCrawler(base_url, load_diagram_keys(key_file), per_host=per_host, window=1, journal=journal,
+                             full_diagrams=full_diagrams, dead_letters=dead_letters, model_base_url=model_base_url,
+                             retry_policy=retry_policy or RetryPolicy(max_attempts=DEFERRED_ATTEMPTS,
+                                                                      max_delay=120, budget=900))
+
+    with open_output(output_file) as sink:
+        try:
+            asyncio.run(crawler.redrive(entries, sink.write_rows, sink, pace=pace))
+        finally:
+            if journal is not None:
+                journal.close()
+            dead_letters.close()
+    return crawler
+
+
+def setup_logging():
+    logging.basicConfig(filename="error_log.log", level=logging.ERROR,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent Part2 diagram crawl for one result_part1 CSV.")
+    parser.add_argument("input_file", nargs="?",
+                        help="Part1 CSV, e.g. result_part1/3_Polaris_1.csv; not needed with --retry-failed")
+    parser.add_argument("--base-url", help=f"fetch diagrams, and the input's model pages, from this host "
+                                           f"instead, e.g. a local replay server (default: diagrams from "
+                                           f"{DEFAULT_BASE_URL})")
+    parser.add_argument("--key-file", default="key.csv")
+    parser.add_argument("--output", help="output CSV (default: csv/<brand>_2_<timestamp>.csv); "
+                                         "pass an earlier run's file to resume it, or a .parquet/.sqlite name")
+    parser.add_argument("--format", choices=["csv", "parquet", "sqlite"], default="csv",
+                        help="format of the default output file; parquet needs pyarrow")
+    parser.add_argument("--journal", help="checkpoint journal (default: <output>.journal)")
+    parser.add_argument("--per-host", type=int, default=8, help="max in-flight requests per host")
+    parser.add_argument("--window", type=int, default=32, help="model rows crawled concurrently")
+    parser.add_argument("--start", type=int, default=1, help="first input row number to crawl")
+    parser.add_argument("--stop", type=int, help="input row number to stop before")
+    parser.add_argument("--full-diagrams", action="store_true",
+                        help="write every part of a matched diagram, not only the parts key.csv lists")
+    parser.add_argument("--dead-letters", help="failed-URL store (default: <output>.deadletter)")
+    parser.add_argument("--main-attempts", type=int, default=MAIN_PASS_ATTEMPTS,
+                        help="fetch attempts per page before it is deferred to the dead-letter store")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="only re-crawl the dead letters of --output and add their rows to it")
+    parser.add_argument("--retry-per-host", type=int, default=1, help="in-flight requests per host when retrying")
+    parser.add_argument("--retry-pace", type=float, default=1.0, help="seconds between retried URLs")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.retry_failed and not args.output:
+        parser.error("--retry-failed needs the --output of the run to retry")
+    if not args.retry_failed and not args.input_file:
+        parser.error("the input_file argument is required")
+
+    setup_logging()
+    start_from_args(args)
+    csv_file = args.output or default_output_file(args.input_file, "." + args.format)
+    base_url = args.base_url or DEFAULT_BASE_URL
+
+    print("started!")
+    started = time.monotonic()
+    if args.retry_failed:
+        try:
+            crawler = retry_failed(csv_file, base_url, key_file=args.key_file, per_host=args.retry_per_host,
+                                   pace=args.retry_pace, journal_file=args.journal,
+                                   full_diagrams=args.full_diagrams, dead_letter_file=args.dead_letters,
+                                   model_base_url=args.base_url)
+        except ValueError as e:
+            parser.error(str(e))
+        if crawler is not None:
+            print(f"ended! {crawler.recovered} recovered, {len(crawler.dead_letters)} still failing "
+                  f"in {time.monotonic() - started:.0f}s")
+            print_stats()
+        return
+    try:
+        crawler = crawl(args.input_file, csv_file, base_url, key_file=args.key_file, per_host=args.per_host,
+                        window=args.window, start=args.start, stop=args.stop, journal_file=args.journal,
+                        full_diagrams=args.full_diagrams, dead_letter_file=args.dead_letters,
+                        main_attempts=args.main_attempts, model_base_url=args.base_url, cache_ttl=args.cache_ttl)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.monotonic() - started
+    print(f"ended! {crawler.models_done} models, {crawler.diagrams_done} diagrams "
+          f"({crawler.assemblies_parsed} unique assemblies fetched) in {elapsed:.0f}s")
+    if len(crawler.dead_letters):
+        print(f"{len(crawler.dead_letters)} failed URLs deferred to {crawler.dead_letters.path}; "
+              f"run crawl_async.py --output {csv_file} --retry-failed to fetch them again")
+    print_stats()
+
+
+if __name__ == "__main__":
+    main()
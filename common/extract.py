@@ -0,0 +1,46 @@
+"""
+Precompiled extraction plans for repeated rows on scraped pages.
+
+Calling element.xpath("...") compiles the expression again on every call,
+and the Part2 part-row loops did that four or more times per part. A plan
+compiles its row and field expressions once, when the site parser declares
+them, and returns every field of a row in one call.
+"""
+from lxml import etree
+
+
+class ExtractionPlan:
+    """
+    A row XPath plus named field XPaths relative to each row, compiled once.
+
+        plan = ExtractionPlan('//div[@class="partlistrow"]//form',
+                              ref='.//div[@class="c0"]/span', ...)
+        for fields in plan.rows(doc):
+            fields["ref"]  # list of matched elements, in document order
+    """
+
+    def __init__(self, rows, **fields):
+        self.row_path = etree.XPath(rows)
+        self.names = tuple(fields)
+        self.field_paths = tuple(etree.XPath(path) for path in fields.values())
+
+    def rows(self, doc):
+        """
+        Yield {field name: [matched nodes]} for every row element in `doc`.
+        """
+        names = self.names
+        paths = self.field_paths
+        for row in self.row_path(doc):
+            yield dict(zip(names, [path(row) for path in paths]))
+
+
+def first_text(nodes, default=""):
+    """
+    Stripped text of the first node, or `default` if there is none.
+    """
+    if nodes:
+        node = nodes[0]
+        text = node if isinstance(node, str) else node.text
+        if text:
+            return text.strip()
+    return default
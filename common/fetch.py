@@ -0,0 +1,251 @@
+"""
+Pooled HTTP fetching shared by every Part1 and Part2 script.
+
+Each host gets one long-lived requests.Session whose adapter keeps up to
+`pool_size` keep-alive connections open, so consecutive model and diagram
+pages reuse the same TCP+TLS connection instead of opening a new one.
+Every request also passes through an AimdController (common/throttle.py),
+which adapts the number of concurrent requests allowed per host, and,
+unless it is turned off, through the on-disk ResponseCache (common/cache.py).
+"""
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from common.cache import default_cache, format_cache_stats
+from common.metrics import get_metrics
+from common.throttle import CONGESTION_ERRORS, AimdController, format_snapshot, is_congestion_status
+
+DEFAULT_POOL_SIZE = int(os.environ.get("SCRAPER_POOL_SIZE", "10"))
+DEFAULT_TIMEOUT = float(os.environ.get("SCRAPER_TIMEOUT", "60"))
+
+
+def host_of(url):
+    """
+    Return the lower-cased host part of a URL.
+    """
+    return urlsplit(url).netloc.lower()
+
+
+def rebase_url(url, base_url):
+    """
+    Move a URL's path and query onto another scheme and host, e.g. a local replay server.
+    """
+    parts = urlsplit(url)
+    return base_url.rstrip("/") + parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+class _CountingPoolMixin:
+    """
+    Count the requests that had to open a new socket (TCP, and TLS for https).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.num_handshakes = 0
+
+    def _make_request(self, conn, *args, **kwargs):
+        if conn.sock is None:
+            self.num_handshakes += 1
+        return super()._make_request(conn, *args, **kwargs)
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _CountingAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+class SessionPool:
+    """
+    One keep-alive requests.Session per host, with connection reuse counters.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, headers=None, controller=None,
+                 cache=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.controller = controller or AimdController(maximum=pool_size)
+        self.cache = cache
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url):
+        """
+        Return the session for the URL's host, creating it on first use.
+        """
+        host = host_of(url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                adapter = _CountingAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def get(self, url, **kwargs):
+        """
+        GET a URL, answering from the response cache when it can.
+        """
+        if self.cache is None:
+            return self._send(url, **kwargs)
+
+        def send(extra_headers):
+            headers = dict(kwargs.get("headers") or {})
+            headers.update(extra_headers)
+            return self._send(url, **{**kwargs, "headers": headers})
+
+        response = self.cache.fetch(url, send)
+        if getattr(response, "from_cache", False):
+            get_metrics().inc("cache_hits_total", host=host_of(url))
+        return response
+
+    def _send(self, url, **kwargs):
+        """
+        GET a URL through the pooled session for its host, waiting for a free
+        slot in the host's adaptive concurrency limit first.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session_for(url)
+        host = host_of(url)
+        metrics = get_metrics()
+        self.controller.acquire(host)
+        congested = False
+        started = time.monotonic()
+        try:
+            response = session.get(url, **kwargs)
+            congested = is_congestion_status(response.status_code)
+        except requests.exceptions.RequestException as e:
+            congested = isinstance(e, CONGESTION_ERRORS)
+            metrics.inc("fetch_errors_total", host=host, error=type(e).__name__)
+            raise
+        finally:
+            self.controller.release(host, congested)
+        metrics.observe("fetch_seconds", time.monotonic() - started, host=host)
+        metrics.inc("responses_total", host=host, status=response.status_code)
+        metrics.inc("response_bytes_total", len(response.content), host=host)
+        return response
+
+    def stats(self):
+        """
+        Return {host: {"requests", "connections", "reused"}} for every session.
+        """
+        result = {}
+        with self._lock:
+            sessions = list(self._sessions.items())
+        for host, session in sessions:
+            adapter = session.get_adapter("https://")
+            pools = adapter.poolmanager.pools
+            requests_made = 0
+            connections = 0
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_made += pool.num_requests
+                connections += getattr(pool, "num_handshakes", pool.num_connections)
+            result[host] = {
+                "requests": requests_made,
+                "connections": connections,
+                "reused": max(requests_made - connections, 0),
+            }
+        return result
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def configure(**kwargs):
+    """
+    Replace the process-wide pool, e.g. configure(pool_size=20). Unless a
+    `cache` is passed, it uses the default cache with `cache_ttl`, if given.
+    """
+    global _default_pool
+    cache_ttl = kwargs.pop("cache_ttl", None)
+    if "cache" not in kwargs:
+        kwargs["cache"] = default_cache(ttl=cache_ttl)
+    with _default_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+        _default_pool = SessionPool(**kwargs)
+        return _default_pool
+
+
+def get_pool():
+    """
+    Return the process-wide pool, creating it with the defaults on first use.
+    """
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = SessionPool(cache=default_cache())
+        return _default_pool
+
+
+def http_get(url, **kwargs):
+    """
+    Drop-in replacement for requests.get(url) that reuses pooled connections.
+    """
+    return get_pool().get(url, **kwargs)
+
+
+def fetch_html(url):
+    """
+    The per-brand scripts' page fetch: the body of `url`, retrying transient
+    errors with backoff, or None if it could not be fetched.
+    """
+    from common.retry import fetch_content  # common.retry itself builds on this module
+    return fetch_content(url)
+
+
+def format_stats(pool=None):
+    """
+    Format the connection reuse counters as one line per host.
+    """
+    pool = pool or get_pool()
+    lines = []
+    for host, stats in sorted(pool.stats().items()):
+        ratio = stats["reused"] / stats["requests"] if stats["requests"] else 0.0
+        lines.append(
+            f"{host}: {stats['requests']} requests over {stats['connections']} connections "
+            f"({stats['reused']} reused, {ratio:.0%})"
+        )
+    return "\n".join(lines)
+
+
+def print_stats(pool=None):
+    """
+    Print the connection reuse counters, the per-host concurrency limits and
+    the cache hit/miss counters, if any request was made.
+    """
+    pool = pool or get_pool()
+    for text in (format_stats(pool), format_snapshot(pool.controller), format_cache_stats(pool.cache)):
+        if text:
+            print(text)
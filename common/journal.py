@@ -0,0 +1,116 @@
+"""
+Checkpoint journal that lets an interrupted Part2 run resume where it stopped.
+
+The journal is a JSON-lines file next to the output CSV. After the rows for
+an input row have been written and fsynced, one line records the input row
+number, the diagram URLs whose rows are now in the file, whether every
+diagram of the model succeeded, and the size of the output at that point.
+
+On restart, rows marked complete are skipped without fetching anything,
+diagrams already recorded for a partial row are not fetched again, and the
+output is cut back to the last recorded size so rows written after the last
+checkpoint are not duplicated. An output that already has rows but no
+journal (a pipeline or merged shard output, a per-brand script's CSV) is
+never cut back: the run refuses to start instead.
+"""
+import json
+import logging
+import os
+
+
+class RunJournal:
+    """
+    Append-only record of the (input row, diagram URL) units already in the output.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = None
+        self._complete = set()
+        self._diagrams = {}
+        self._file = None  # opened on the first checkpoint, so a refused run leaves no journal behind
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        valid = 0
+        with open(self.path, mode="rb") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash; everything before it is intact.
+                    logging.warning(f"Dropping truncated journal line in '{self.path}'")
+                    break
+                valid += len(line)
+                row = entry["row"]
+                self._diagrams.setdefault(row, set()).update(entry["diagrams"])
+                if entry["complete"]:
+                    self._complete.add(row)
+                self.offset = entry["offset"]
+        if os.path.getsize(self.path) > valid:
+            os.truncate(self.path, valid)
+
+    def __len__(self):
+        return len(self._complete)
+
+    def model_done(self, row_number):
+        return row_number in self._complete
+
+    def diagram_done(self, row_number, diagram_url):
+        return diagram_url in self._diagrams.get(row_number, ())
+
+    def restore_output(self, file_name):
+        """
+        Cut the output file back to the last checkpoint before it is reopened.
+        Raises ValueError for an output with rows this journal never recorded.
+        """
+        if self.offset is None and _has_rows(file_name):
+            raise ValueError(f"{file_name} already has rows but no journal at {self.path} to resume from; "
+                             f"write to a new output, or pass --journal if it is kept elsewhere")
+        offset = self.offset or 0
+        if os.path.exists(file_name) and os.path.getsize(file_name) > offset:
+            os.truncate(file_name, offset)
+
+    def _append(self, entry):
+        if self._file is None:
+            self._file = open(self.path, mode="a", encoding="utf-8")
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def commit(self, row_number, diagram_urls, complete, output):
+        """
+        Make the rows written to the `output` CsvSink durable, then record them.
+        """
+        output.flush(fsync=True)
+        self.offset = output.tell()
+        self._diagrams.setdefault(row_number, set()).update(diagram_urls)
+        if complete:
+            self._complete.add(row_number)
+        self._append({"row": row_number, "diagrams": sorted(diagram_urls), "complete": complete,
+                      "offset": self.offset})
+
+    def move_offset(self, offset):
+        """
+        Record that the output, rewritten in place without adding or dropping
+        rows, now ends at `offset`.
+        """
+        self.offset = offset
+        self._append({"row": 0, "diagrams": [], "complete": False, "offset": offset})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _has_rows(file_name):
+    """
+    Whether a CSV output holds anything past its header line.
+    """
+    if not os.path.exists(file_name):
+        return False
+    with open(file_name, mode="rb") as file:
+        file.readline()
+        return file.read(1) != b""
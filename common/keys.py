@@ -0,0 +1,229 @@
+"""
+Compiled index of key.csv: which (brand, diagram) pairs and which
+(brand, diagram, part description) triples the Part2 crawl keeps.
+
+key.csv rows are brand, diagram name, part group, part description. Every
+field is normalized once: BOM removed, whitespace runs collapsed to one
+space, trimmed and casefolded, so "\\ufeffArctic Cat" and "Arctic Cat", or
+" #2" and "#2", are the same key. Part descriptions also lose the "This
+part replaces <number>." note some sites append to them.
+
+The normalized keys are written next to key.csv as key.csv.idx: two
+open-addressing tables of 64-bit key hashes plus, for each diagram, its
+part descriptions. The file is memory-mapped, so startup does not grow with
+the key list and a lookup is one hash and a probe or two. It is rebuilt
+only when key.csv's size or modification time no longer match the ones
+recorded in it.
+"""
+import csv
+import hashlib
+import logging
+import mmap
+import os
+import re
+import struct
+
+from common.match import Automaton
+
+MAGIC = b"KEYIDX2\0"
+_HEADER = struct.Struct("<8sqqII")  # magic, key.csv size, key.csv mtime_ns, diagram slots, part slots
+_DIAGRAM_SLOT = struct.Struct("<QII")  # key hash, offset and length of its descriptions
+_PART_SLOT = struct.Struct("<Q")  # key hash
+_REPLACES_NOTE = re.compile(r" ?\bthis part replaces\b.*$")
+
+
+def normalize(text):
+    """
+    Trim, casefold, drop BOMs and collapse whitespace runs to one space.
+    """
+    return " ".join(text.replace("\ufeff", "").split()).casefold()
+
+
+def normalize_description(text):
+    """
+    normalize() a part description and drop any "This part replaces ..." note.
+    """
+    return _REPLACES_NOTE.sub("", normalize(text))
+
+
+def _hash(*fields):
+    digest = hashlib.blake2b("\x1f".join(fields).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1  # 0 marks an empty slot
+
+
+def _slot_count(entries):
+    slots = 8
+    while slots < entries * 2:
+        slots *= 2
+    return slots
+
+
+def read_keys(key_file):
+    """
+    Return {(brand, diagram): [part descriptions]} from key.csv, normalized.
+    """
+    diagrams = {}
+    with open(key_file, mode="r", encoding="utf-8", newline="") as file:
+        for row in csv.reader(file):
+            if len(row) < 3:
+                logging.warning(f"Skipping incomplete row in '{key_file}': {row}")
+                continue
+            descriptions = diagrams.setdefault((normalize(row[0]), normalize(row[1])), {})
+            if len(row) > 3:
+                descriptions[normalize_description(row[3])] = None
+    return {key: [description for description in descriptions if description]
+            for key, descriptions in diagrams.items()}
+
+
+def build_index(key_file):
+    """
+    Compile key.csv into the bytes of a key index.
+    """
+    stat = os.stat(key_file)
+    diagrams = read_keys(key_file)
+    parts = [(key, description) for key, descriptions in diagrams.items() for description in descriptions]
+
+    diagram_slots = _slot_count(len(diagrams))
+    part_slots = _slot_count(len(parts))
+    diagram_table = bytearray(diagram_slots * _DIAGRAM_SLOT.size)
+    part_table = bytearray(part_slots * _PART_SLOT.size)
+    blob = bytearray()
+
+    for key, descriptions in diagrams.items():
+        text = "\n".join(descriptions).encode("utf-8")
+        key_hash = _hash(*key)
+        slot = _free_slot(diagram_table, _DIAGRAM_SLOT, diagram_slots, key_hash)
+        _DIAGRAM_SLOT.pack_into(diagram_table, slot * _DIAGRAM_SLOT.size, key_hash, len(blob), len(text))
+        blob += text
+    for (brand, diagram), description in parts:
+        key_hash = _hash(brand, diagram, description)
+        slot = _free_slot(part_table, _PART_SLOT, part_slots, key_hash)
+        _PART_SLOT.pack_into(part_table, slot * _PART_SLOT.size, key_hash)
+
+    header = _HEADER.pack(MAGIC, stat.st_size, stat.st_mtime_ns, diagram_slots, part_slots)
+    return header + bytes(diagram_table) + bytes(part_table) + bytes(blob)
+
+
+def _free_slot(table, layout, slots, key_hash):
+    slot = key_hash & (slots - 1)
+    while True:
+        existing = layout.unpack_from(table, slot * layout.size)[0]
+        if existing in (0, key_hash):
+            return slot
+        slot = (slot + 1) & (slots - 1)
+
+
+class KeyIndex:
+    """
+    Read-only view of a compiled key index held in a bytes-like buffer.
+
+        (brand, diagram) in index
+        index.has_part(brand, diagram, description)
+        index.descriptions(brand, diagram)
+        index.matches(brand, diagram, part_description)
+    """
+
+    def __init__(self, buffer):
+        magic, self.source_size, self.source_mtime_ns, self.diagram_slots, self.part_slots = \
+            _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("not a key index")
+        self._buffer = buffer
+        self._matchers = {}
+        self._diagram_table = _HEADER.size
+        self._part_table = self._diagram_table + self.diagram_slots * _DIAGRAM_SLOT.size
+        self._blob = self._part_table + self.part_slots * _PART_SLOT.size
+        if len(buffer) < self._blob:
+            raise ValueError("truncated key index")
+
+    def is_current(self, key_file):
+        stat = os.stat(key_file)
+        return (stat.st_size, stat.st_mtime_ns) == (self.source_size, self.source_mtime_ns)
+
+    def _find(self, table, layout, slots, key_hash):
+        slot = key_hash & (slots - 1)
+        while True:
+            entry = layout.unpack_from(self._buffer, table + slot * layout.size)
+            if entry[0] == key_hash:
+                return entry
+            if entry[0] == 0:
+                return None
+            slot = (slot + 1) & (slots - 1)
+
+    def _diagram(self, brand, diagram):
+        key_hash = _hash(normalize(brand), normalize(diagram))
+        return self._find(self._diagram_table, _DIAGRAM_SLOT, self.diagram_slots, key_hash)
+
+    def __contains__(self, key):
+        brand, diagram = key
+        return self._diagram(brand, diagram) is not None
+
+    def has_part(self, brand, diagram, description):
+        key_hash = _hash(normalize(brand), normalize(diagram), normalize_description(description))
+        return self._find(self._part_table, _PART_SLOT, self.part_slots, key_hash) is not None
+
+    def descriptions(self, brand, diagram):
+        """
+        The normalized part descriptions key.csv lists for a diagram.
+        """
+        entry = self._diagram(brand, diagram)
+        if entry is None or not entry[2]:
+            return []
+        start = self._blob + entry[1]
+        return bytes(self._buffer[start:start + entry[2]]).decode("utf-8").split("\n")
+
+    def matches(self, brand, diagram, description):
+        """
+        True if, once normalized, the part description contains one of the
+        descriptions key.csv lists for the diagram or is contained in one, so
+        key rows with extra text ("... [FROM 6/28/21]") still match. A
+        diagram listed without any descriptions keeps all of its parts.
+        """
+        key = (normalize(brand), normalize(diagram))
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            descriptions = self.descriptions(*key)
+            matcher = self._matchers[key] = (Automaton(descriptions or [""]), descriptions)
+        automaton, descriptions = matcher
+        text = normalize_description(description)
+        if automaton.search(text):
+            return True
+        return bool(text) and any(text in listed for listed in descriptions)
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+def _map(index_file):
+    with open(index_file, mode="rb") as file:
+        return KeyIndex(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def load_key_index(key_file="key.csv", index_file=None):
+    """
+    Map `<key_file>.idx`, rebuilding it first if key.csv changed since it was
+    compiled. If the index cannot be written, the freshly built one is used
+    from memory.
+    """
+    index_file = index_file or key_file + ".idx"
+    try:
+        index = _map(index_file)
+        if index.is_current(key_file):
+            return index
+        index.close()
+    except (OSError, ValueError, struct.error):
+        pass
+
+    data = build_index(key_file)
+    temp_file = f"{index_file}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, mode="wb") as file:
+            file.write(data)
+        os.replace(temp_file, index_file)
+        return _map(index_file)
+    except OSError as e:
+        logging.warning(f"Could not write key index '{index_file}': {e}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        return KeyIndex(data)
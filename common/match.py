@@ -0,0 +1,59 @@
+"""
+Aho-Corasick multi-pattern matcher for the part-description filter.
+
+One automaton holds every part description key.csv lists for a diagram, so
+checking a part row against all of them is a single pass over its
+description instead of one substring search per key description.
+"""
+
+
+class Automaton:
+    """
+    Answers "does `text` contain any of `patterns`?" in one pass over text.
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._final = [False]
+        for pattern in patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._final.append(False)
+            state = next_state
+        self._final[state] = True
+
+    def _link(self):
+        # Breadth-first, so a state's failure target is always linked before it.
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._final[next_state] = self._final[next_state] or self._final[self._fail[next_state]]
+                queue.append(next_state)
+
+    def search(self, text):
+        goto, fail, final = self._goto, self._fail, self._final
+        if final[0]:
+            return True  # an empty pattern matches everything
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if final[state]:
+                return True
+        return False
@@ -0,0 +1,296 @@
+"""
+Per-stage metrics for the Part1 and Part2 crawls: fetch, parse and write.
+
+The fetch layer, AsyncFetcher and the row writers record into one
+process-wide registry:
+
+    scraper_fetch_seconds{host}            histogram of request latency
+    scraper_response_bytes_total{host}     body bytes received
+    scraper_responses_total{host,status}   responses by status code
+    scraper_fetch_errors_total{host,error} timeouts, dropped connections, ...
+    scraper_retries_total{host}            fetches repeated after a failure
+    scraper_fetch_failures_total{host,reason} URLs given up on
+    scraper_cache_hits_total{host}         answered from the response cache
+    scraper_parse_seconds{page}            histogram of parse time per page type
+    scraper_rows_total{stage}              rows emitted (part1, part2)
+    scraper_write_seconds{stage}           histogram of sink write time
+
+A MetricsReporter writes them every `interval` seconds to a JSON file (with
+rows/s over the run and over the last interval) and/or a Prometheus text
+file for node_exporter's textfile collector. Both files are replaced
+atomically. The crawl commands take --metrics-json/--metrics-prom; the
+per-brand scripts pick up SCRAPER_METRICS_JSON, SCRAPER_METRICS_PROM and
+SCRAPER_METRICS_INTERVAL instead.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+WRITE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+
+# name -> (type, help, histogram buckets)
+DEFINITIONS = {
+    "fetch_seconds": ("histogram", "HTTP request latency by host.", LATENCY_BUCKETS),
+    "response_bytes_total": ("counter", "Response body bytes received by host.", None),
+    "responses_total": ("counter", "HTTP responses by host and status code.", None),
+    "fetch_errors_total": ("counter", "Requests that failed without a response, by host and error.", None),
+    "retries_total": ("counter", "Fetches retried after a failure, by host.", None),
+    "fetch_failures_total": ("counter", "URLs given up on, by host and reason.", None),
+    "cache_hits_total": ("counter", "Responses served from the on-disk cache, by host.", None),
+    "parse_seconds": ("histogram", "Time spent parsing one page, by page type.", PARSE_BUCKETS),
+    "rows_total": ("counter", "Output rows emitted, by stage.", None),
+    "write_seconds": ("histogram", "Time spent handing rows to the output sink, by stage.", WRITE_BUCKETS),
+}
+PREFIX = "scraper_"
+
+DEFAULT_INTERVAL = float(os.environ.get("SCRAPER_METRICS_INTERVAL", "15"))
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: per-bucket counts plus the sum and count.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        [(upper bound, observations <= bound)], ending with ("+Inf", count).
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metrics:
+    """
+    Thread-safe registry of labelled counters and histograms.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._values = {}  # (name, sorted label items) -> number or Histogram
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = Histogram(DEFINITIONS[name][2])
+            histogram.observe(value)
+
+    def total(self, name, **labels):
+        """
+        Sum of a counter over every label set that includes `labels`.
+        """
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(value for (metric, items), value in self._values.items()
+                       if metric == name and wanted <= set(items))
+
+    def snapshot(self):
+        """
+        {name: [(labels dict, value or Histogram copy)]}, sorted by name.
+        """
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda item: item[0])
+            result = {}
+            for (name, labels), value in items:
+                if isinstance(value, Histogram):
+                    copy = Histogram(value.buckets)
+                    copy.counts, copy.sum, copy.count = list(value.counts), value.sum, value.count
+                    value = copy
+                result.setdefault(name, []).append((dict(labels), value))
+            return result
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels, extra=None):
+    labels = {**labels, **(extra or {})}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def format_prometheus(metrics):
+    """
+    Render the registry in the Prometheus text exposition format.
+    """
+    lines = [f"# HELP {PREFIX}uptime_seconds Seconds since the crawl started.",
+             f"# TYPE {PREFIX}uptime_seconds gauge",
+             f"{PREFIX}uptime_seconds {time.time() - metrics.started:.3f}"]
+    for name, series in metrics.snapshot().items():
+        kind, help_text, _ = DEFINITIONS[name]
+        lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+        for labels, value in series:
+            if isinstance(value, Histogram):
+                for bound, count in value.cumulative():
+                    lines.append(f"{PREFIX}{name}_bucket{_label_text(labels, {'le': bound})} {count}")
+                lines.append(f"{PREFIX}{name}_sum{_label_text(labels)} {value.sum:.6f}")
+                lines.append(f"{PREFIX}{name}_count{_label_text(labels)} {value.count}")
+            else:
+                lines.append(f"{PREFIX}{name}{_label_text(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def format_json(metrics, rates=None):
+    """
+    Render the registry as a JSON-ready dict.
+    """
+    result = {"timestamp": time.time(), "uptime_seconds": time.time() - metrics.started, "metrics": {}}
+    for name, series in metrics.snapshot().items():
+        entries = []
+        for labels, value in series:
+            if isinstance(value, Histogram):
+                entries.append({"labels": labels, "count": value.count, "sum": value.sum,
+                                "buckets": {str(bound): count for bound, count in value.cumulative()}})
+            else:
+                entries.append({"labels": labels, "value": value})
+        result["metrics"][name] = entries
+    if rates is not None:
+        result["rows_per_second"] = rates
+    return result
+
+
+def _write_atomic(file_name, text):
+    temp_file = f"{file_name}.{os.getpid()}.tmp"
+    with open(temp_file, mode="w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(temp_file, file_name)
+
+
+class MetricsReporter:
+    """
+    Background thread that dumps a Metrics registry every `interval` seconds,
+    and once more when stopped.
+    """
+
+    def __init__(self, metrics, json_file=None, prom_file=None, interval=DEFAULT_INTERVAL):
+        self.metrics = metrics
+        self.json_file = json_file
+        self.prom_file = prom_file
+        self.interval = interval
+        self._last_rows = {}
+        self._last_time = metrics.started
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def _rates(self):
+        now = time.time()
+        rates = {}
+        for labels, rows in self.metrics.snapshot().get("rows_total", []):
+            stage = labels.get("stage", "")
+            previous = self._last_rows.get(stage, 0)
+            rates[stage] = {
+                "overall": rows / max(now - self.metrics.started, 1e-9),
+                "interval": (rows - previous) / max(now - self._last_time, 1e-9),
+            }
+            self._last_rows[stage] = rows
+        self._last_time = now
+        return rates
+
+    def dump(self):
+        try:
+            if self.json_file:
+                _write_atomic(self.json_file, json.dumps(format_json(self.metrics, self._rates()), indent=1))
+            if self.prom_file:
+                _write_atomic(self.prom_file, format_prometheus(self.metrics))
+        except OSError as e:
+            print(f"Could not write metrics: {e}")
+
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.dump()
+
+
+_metrics = Metrics()
+_reporter = None
+_reporter_lock = threading.Lock()
+_environment_checked = False
+
+
+def get_metrics():
+    """
+    Return the process-wide registry; the first call starts a reporter if the
+    SCRAPER_METRICS_JSON or SCRAPER_METRICS_PROM variables name a file.
+    """
+    global _environment_checked
+    if not _environment_checked:
+        _environment_checked = True
+        json_file = os.environ.get("SCRAPER_METRICS_JSON")
+        prom_file = os.environ.get("SCRAPER_METRICS_PROM")
+        if json_file or prom_file:
+            start_reporter(json_file, prom_file)
+    return _metrics
+
+
+def start_reporter(json_file=None, prom_file=None, interval=DEFAULT_INTERVAL):
+    """
+    (Re)start the process-wide reporter; it is stopped, with a final dump, at exit.
+    """
+    global _reporter
+    with _reporter_lock:
+        if _reporter is not None:
+            _reporter.stop()
+        _reporter = MetricsReporter(_metrics, json_file, prom_file, interval).start()
+        return _reporter
+
+
+def stop_reporter():
+    with _reporter_lock:
+        if _reporter is not None:
+            _reporter.stop()
+
+
+atexit.register(stop_reporter)
+
+
+def add_arguments(parser):
+    parser.add_argument("--metrics-json", help="write crawl metrics to this JSON file every --metrics-interval")
+    parser.add_argument("--metrics-prom", help="write crawl metrics to this Prometheus textfile")
+    parser.add_argument("--metrics-interval", type=float, default=DEFAULT_INTERVAL, help="seconds between dumps")
+
+
+def start_from_args(args):
+    if args.metrics_json or args.metrics_prom:
+        return start_reporter(args.metrics_json, args.metrics_prom, args.metrics_interval)
+    return None
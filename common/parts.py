@@ -0,0 +1,292 @@
+"""
+Parsing shared by the Part2 scrapers for the ARI-style dealer sites
+(babbittsonline.com, canampartshouse.com, ...): model pages list their
+diagrams under `passemname`, diagram pages list parts under `partlistrow`.
+"""
+import argparse
+import csv
+import logging
+import os
+import re
+
+from lxml import etree, html
+
+from common.extract import ExtractionPlan, first_text
+from common.keys import load_key_index
+
+ASSEMBLY_URL = re.compile(r"/oemparts/a/[^/]+/([0-9a-f]{24})(?:/|$)")
+PARTLIST_MARKER = b'class="partlistrow"'
+CHARSET = re.compile(rb'charset=["\']?([A-Za-z0-9_-]+)', re.IGNORECASE)
+DIV_TAG = re.compile(rb"<(/?)div\b[^>]*>", re.IGNORECASE)
+
+HEADER = ["Brand", "Type", "Year", "Model", "Diagram Name", "Ref #", "Part description", "Part number", "OEM diagram URL", "Price", "SSPN"]
+
+# The per-brand scripts keep every part of a key.csv diagram, not only its
+# key parts, when SCRAPER_FULL_DIAGRAMS=1 (crawl_async.py: --full-diagrams).
+FULL_DIAGRAMS = os.environ.get("SCRAPER_FULL_DIAGRAMS", "") == "1"
+
+
+def assembly_key(diagram_url):
+    """
+    Return the OEM assembly ID of a diagram URL such as
+    /oemparts/a/pol/<24-hex id>/<slug>, or the URL itself if it has none.
+    Models that share an assembly link to the same ID with their own slug.
+    """
+    match = ASSEMBLY_URL.search(diagram_url)
+    return match.group(1) if match else diagram_url
+
+
+def load_diagram_keys(file_name="key.csv"):
+    """
+    Return the compiled KeyIndex of key.csv; `(brand, diagram_name) in keys`
+    compares both names normalized, so case, BOMs and stray whitespace do not matter.
+    """
+    return load_key_index(file_name)
+
+
+def read_models(input_file, start=1, stop=None):
+    """
+    Yield (row_number, [brand, type, year, model, model_url]) from a Part1 CSV.
+    Rows before `start` and from `stop` on are skipped, like the old row_number guards.
+    """
+    with open(input_file, mode="r", encoding="utf-8") as file:
+        for row_number, row in enumerate(csv.reader(file), start=1):
+            if row_number < start:
+                continue
+            if stop is not None and row_number >= stop:
+                break
+            if len(row) < 5:
+                logging.warning(f"Skipping incomplete row at line {row_number}: {row}")
+                continue
+            if row[:5] == ["Brand", "Type", "Year", "Model", "URL"]:
+                continue
+            yield row_number, row[:5]
+
+
+def row_window(argv=None):
+    """
+    Return the (start, stop) input rows a per-brand script should crawl, from
+    its --start/--stop arguments. These scripts keep no journal: an
+    interrupted run is picked up with --start set to the last row it printed,
+    into a new timestamped output.
+    """
+    parser = argparse.ArgumentParser(description="Crawl the diagrams of input rows [start, stop).")
+    parser.add_argument("--start", type=int, default=2, help="first input row number to crawl (1 is the header)")
+    parser.add_argument("--stop", type=int, help="input row number to stop before")
+    args = parser.parse_args(argv)
+    return args.start, args.stop
+
+
+def parse_model_page(content):
+    """
+    Return [(diagram_name, diagram_href)] for every diagram linked from a model page.
+    """
+    doc = html.fromstring(content)
+    diagrams = []
+    for element in doc.xpath('//div[@class="passemname"]//a'):
+        if element.text:
+            diagrams.append((element.text, element.get("href")))
+    return diagrams
+
+
+PARTLIST_PLAN = ExtractionPlan(
+    '//div[@class="partlistrow"]//form',
+    ref='.//div[@class="c0"]/span',
+    part_description='.//div[@class="c1a"]/span',
+    part_numbers='.//div[@class="c1b"]/a/span',
+    price='.//div[@class="c2"]/span',
+)
+
+
+def _extract_parts(doc, require_labels=False, blank_part_numbers=False):
+    parts = []
+    for fields in PARTLIST_PLAN.rows(doc):
+        ref = first_text(fields["ref"])
+        part_description = first_text(fields["part_description"])
+        if require_labels and not (ref and part_description):
+            continue
+        part_number = first_text(fields["part_numbers"])
+        if not part_number and not blank_part_numbers:
+            continue
+        parts.append((
+            ref,
+            part_description,
+            part_number,
+            first_text(fields["price"]).replace("$", ""),
+            first_text(fields["part_numbers"][1:]),
+        ))
+    return parts
+
+
+def partlist_region(content):
+    """
+    Return (region, encoding) where region is the slice of a diagram page from
+    the first `partlistrow` div to the tag that closes the last one, or None
+    if the page has no part list or its divs do not balance. The encoding
+    comes from the page's <meta>, which the slice no longer contains.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    first = content.find(PARTLIST_MARKER)
+    if first < 0:
+        return None
+    start = content.rfind(b"<div", 0, first)
+    last = content.rfind(b"<div", 0, content.rfind(PARTLIST_MARKER))
+    if start < 0 or last < 0:
+        return None
+    depth = 0
+    for tag in DIV_TAG.finditer(content, last):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            end = tag.end()
+            break
+    else:
+        return None
+    match = CHARSET.search(content, 0, start)
+    encoding = match.group(1).decode("ascii") if match else "utf-8"
+    return content[start:end], encoding
+
+
+def parse_diagram_page_full(content, require_labels=False, blank_part_numbers=False):
+    """
+    Parse the whole diagram page; the reference path and the fallback.
+    """
+    return _extract_parts(html.fromstring(content), require_labels, blank_part_numbers)
+
+
+def parse_diagram_page(content, require_labels=False, blank_part_numbers=False):
+    """
+    Return [(ref, part_description, part_number, price, sspn)] from a diagram page.
+
+    A missing ref, description or price is "". Rows with no part number are
+    skipped. The per-brand scripts keep their own rules for incomplete rows:
+    require_labels skips rows without a ref or description, and
+    blank_part_numbers keeps rows with no part number, with "" for it.
+
+    Only the part-list region is handed to lxml, so navigation, scripts and
+    footers are never built into a tree. Pages where the region cannot be
+    cut out cleanly fall back to parsing the whole page.
+    """
+    region = partlist_region(content)
+    if region is not None:
+        region, encoding = region
+        try:
+            parser = html.HTMLParser(encoding=encoding, remove_comments=True)
+            parts = _extract_parts(html.document_fromstring(region, parser=parser), require_labels,
+                                   blank_part_numbers)
+        except (LookupError, etree.ParserError):
+            parts = None
+        if parts:
+            return parts
+    return parse_diagram_page_full(content, require_labels, blank_part_numbers)
+
+
+def key_parts(keys, brand, diagram_name, parts):
+    """
+    Keep the parsed parts whose description matches one that key.csv lists
+    for this diagram; see KeyIndex.matches.
+    """
+    return [part for part in parts if keys.matches(brand, diagram_name, part[1])]
+
+
+class StringPool:
+    """
+    Per-run intern pool: returns one shared copy of each distinct value, so
+    the labels repeated on thousands of part rows are stored once.
+    """
+
+    def __init__(self):
+        self._values = {}
+
+    def __call__(self, value):
+        return self._values.setdefault(value, value)
+
+    def __len__(self):
+        return len(self._values)
+
+
+class PartRow:
+    """
+    One output row. The brand, type, year, model, diagram name and diagram URL
+    are one tuple shared by every row of the diagram; only the five part
+    fields are per row. Iterating yields the HEADER columns in order, so the
+    sinks write a PartRow like the 11-item list it replaces.
+    """
+
+    __slots__ = ("dimensions", "ref", "part_description", "part_number", "price", "sspn")
+
+    def __init__(self, dimensions, ref, part_description, part_number, price, sspn):
+        self.dimensions = dimensions
+        self.ref = ref
+        self.part_description = part_description
+        self.part_number = part_number
+        self.price = price
+        self.sspn = sspn
+
+    @property
+    def brand(self):
+        return self.dimensions[0]
+
+    @property
+    def type(self):
+        return self.dimensions[1]
+
+    @property
+    def year(self):
+        return self.dimensions[2]
+
+    @property
+    def model(self):
+        return self.dimensions[3]
+
+    @property
+    def diagram_name(self):
+        return self.dimensions[4]
+
+    @property
+    def oem_diagram_url(self):
+        return self.dimensions[5]
+
+    def as_tuple(self):
+        brand, type, year, model, diagram_name, oem_diagram_url = self.dimensions
+        return (brand, type, year, model, diagram_name, self.ref, self.part_description, self.part_number,
+                oem_diagram_url, self.price, self.sspn)
+
+    def as_list(self):
+        return list(self.as_tuple())
+
+    def __iter__(self):
+        return iter(self.as_tuple())
+
+    def __len__(self):
+        return len(HEADER)
+
+    def __getitem__(self, index):
+        return self.as_tuple()[index]
+
+    def __eq__(self, other):
+        return self.as_tuple() == tuple(other)
+
+    def __repr__(self):
+        return f"PartRow{self.as_tuple()!r}"
+
+
+
+def part_rows(model_row, diagram_name, oem_diagram_url, parts, strings=None):
+    """
+    Expand parsed parts into PartRows; a part with an SSPN is written twice,
+    once per part number, exactly as save_to_csv did in the per-brand scripts.
+    With a StringPool, the labels, refs, descriptions and prices are interned
+    in it.
+    """
+    dimensions = tuple(model_row[:4]) + (diagram_name, oem_diagram_url)
+    intern = strings if strings is not None else (lambda value: value)
+    if strings is not None:
+        dimensions = strings(tuple(strings(value) for value in dimensions))
+    rows = []
+    for ref, part_description, part_number, price, sspn in parts:
+        ref, part_description, price = intern(ref), intern(part_description), intern(price)
+        rows.append(PartRow(dimensions, ref, part_description, part_number, price, sspn))
+        if sspn:
+            rows.append(PartRow(dimensions, ref, part_description, sspn, price, part_number))
+    return rows
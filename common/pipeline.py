@@ -0,0 +1,163 @@
+"""
+Fused Part1 -> Part2 run: model rows found by the catalog crawl go straight
+to the diagram crawl through a bounded queue, instead of waiting for the
+Part1 CSV to be finished and copied into result_part1/.
+
+The Part1 CSV is still written, under result_part1/ with the usual
+timestamped name, and its row numbers are the ones the Part2 stage uses, so
+the same file can later be fed to crawl_async.py or crawl_sharded.py. When
+the queue is full the catalog workers wait, so discovery never runs far
+ahead of the diagram crawl.
+
+Pipeline runs are not journaled: the Part1 rows come out in completion
+order, which differs between runs, so there is nothing stable to resume
+against. Resume a broken run with crawl_async.py on its Part1 side output.
+Failed model and diagram pages are deferred to <Part2 file>.deadletter, as
+in crawl_async.py, and can be fetched again with its --retry-failed.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from common.cache import add_arguments as add_cache_arguments
+from common.catalog import PART1_HEADER, SITES, CatalogCrawler, output_file, select_sites
+from common.deadletter import DeadLetterStore
+from common.engine import MAIN_PASS_ATTEMPTS, DiagramCrawler, default_output_file, open_output, setup_logging
+from common.fetch import configure, print_stats
+from common.metrics import add_arguments as add_metrics_arguments, start_from_args
+from common.parts import load_diagram_keys
+from common.retry import RetryPolicy
+from common.sink import CsvSink
+from common.throttle import AimdController
+
+_END = None
+
+
+class FeedingCatalogCrawler(CatalogCrawler):
+    """
+    Catalog crawl that also numbers each site's model rows as they would be
+    numbered in its Part1 CSV and puts them on that site's queue.
+    """
+
+    def __init__(self, queues, **kwargs):
+        super().__init__(**kwargs)
+        self.queues = queues
+        self.row_numbers = {name: 1 for name in queues}  # row 1 is the header
+
+    async def emit(self, site, rows):
+        await super().emit(site, rows)
+        queue = self.queues[site.name]
+        for row in rows:
+            self.row_numbers[site.name] += 1
+            await queue.put((self.row_numbers[site.name], row))
+
+
+async def _drain(queue):
+    while True:
+        item = await queue.get()
+        if item is _END:
+            return
+        yield item
+
+
+async def _run(feeder, sites, part1_sinks, crawlers, part2_sinks):
+    async def discover():
+        try:
+            await feeder.run(sites, lambda site, rows: _write_flushed(part1_sinks[site.name], rows))
+        finally:
+            for queue in feeder.queues.values():
+                await queue.put(_END)
+
+    await asyncio.gather(discover(), *(
+        crawlers[site.name].run(_drain(feeder.queues[site.name]), part2_sinks[site.name].write_rows)
+        for site in sites
+    ))
+
+
+def _write_flushed(sink, rows):
+    sink.write_rows(rows)
+    sink.flush()
+
+
+def run_pipeline(sites, key_file="key.csv", per_host=8, workers=16, window=32, queue_size=256,
+                 part1_dir="result_part1", output_dir="csv", full_diagrams=False, output_format="csv",
+                 cache_ttl=None):
+    """
+    Crawl the catalog of every SiteConfig in `sites` and, concurrently, the
+    diagrams of every model found. Returns {site name: (Part1 file, Part2 file)},
+    the catalog crawler and {site name: diagram crawler} for their counters.
+    """
+    configure(pool_size=per_host, controller=AimdController(maximum=per_host), cache_ttl=cache_ttl)
+    diagram_keys = load_diagram_keys(key_file)
+    queues = {site.name: asyncio.Queue(maxsize=queue_size) for site in sites}
+    feeder = FeedingCatalogCrawler(queues, per_host=per_host, workers=workers)
+
+    files = {}
+    for site in sites:
+        part1_file = output_file(site, part1_dir)
+        part2_file = os.path.join(output_dir, os.path.basename(default_output_file(part1_file, "." + output_format)))
+        files[site.name] = (part1_file, part2_file)
+    crawlers = {
+        site.name: DiagramCrawler(site.diagram_base_url or site.base_url, diagram_keys, per_host=per_host,
+                                  window=window, status_every=0, full_diagrams=full_diagrams,
+                                  retry_policy=RetryPolicy(max_attempts=MAIN_PASS_ATTEMPTS),
+                                  dead_letters=DeadLetterStore(files[site.name][1] + ".deadletter"))
+        for site in sites
+    }
+    part1_sinks = {name: CsvSink(part1_file) for name, (part1_file, _) in files.items()}
+    part2_sinks = {name: open_output(part2_file) for name, (_, part2_file) in files.items()}
+    try:
+        for sink in part1_sinks.values():
+            sink.write(PART1_HEADER)
+        asyncio.run(_run(feeder, sites, part1_sinks, crawlers, part2_sinks))
+    finally:
+        for sink in list(part1_sinks.values()) + list(part2_sinks.values()):
+            sink.close()
+        for crawler in crawlers.values():
+            crawler.dead_letters.close()
+    return files, feeder, crawlers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Part1 catalog crawl feeding the Part2 diagram crawl directly.")
+    parser.add_argument("sites", nargs="*", metavar="site", help="sites to crawl: " + ", ".join(sorted(SITES)))
+    parser.add_argument("--all", action="store_true", help="crawl every configured site")
+    parser.add_argument("--key-file", default="key.csv")
+    parser.add_argument("--per-host", type=int, default=8, help="max in-flight requests per host, per stage")
+    parser.add_argument("--workers", type=int, default=16, help="catalog pages in progress at once")
+    parser.add_argument("--window", type=int, default=32, help="model rows crawled concurrently, per site")
+    parser.add_argument("--queue-size", type=int, default=256, help="model rows buffered between the stages")
+    parser.add_argument("--part1-dir", default="result_part1", help="where the Part1 CSV is written")
+    parser.add_argument("--output-dir", default="csv")
+    parser.add_argument("--format", choices=["csv", "parquet", "sqlite"], default="csv",
+                        help="Part2 output format; parquet needs pyarrow")
+    parser.add_argument("--full-diagrams", action="store_true",
+                        help="write every part of a matched diagram, not only the parts key.csv lists")
+    parser.add_argument("--base-url", help="fetch both stages from this host instead, e.g. a local replay server")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    sites = select_sites(parser, args)
+
+    setup_logging()
+    start_from_args(args)
+    print("started! " + ", ".join(site.name for site in sites))
+    started = time.monotonic()
+    files, feeder, crawlers = run_pipeline(
+        sites, key_file=args.key_file, per_host=args.per_host, workers=args.workers,
+        window=args.window, queue_size=args.queue_size, part1_dir=args.part1_dir, output_dir=args.output_dir,
+        full_diagrams=args.full_diagrams, output_format=args.format, cache_ttl=args.cache_ttl)
+    elapsed = time.monotonic() - started
+    for name, (part1_file, part2_file) in files.items():
+        crawler = crawlers[name]
+        print(f"{name}: {feeder.models_found.get(name, 0)} models -> {part1_file}, "
+              f"{crawler.diagrams_done} diagrams -> {part2_file}")
+        if len(crawler.dead_letters):
+            print(f"{name}: {len(crawler.dead_letters)} failed URLs deferred to {crawler.dead_letters.path}")
+    print(f"ended! in {elapsed:.0f}s")
+    print_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Price refresh for an existing Part2 output: fetch each diagram it already
+lists once and rewrite the Price column, without walking the model pages or
+matching key.csv again.
+
+    python refresh_prices.py csv/9_Yamaha_2_20241204101500.csv
+    python refresh_prices.py csv/parts.sqlite --per-host 4
+
+Diagram URLs are grouped by OEM assembly, so an assembly shared by hundreds
+of models is fetched and parsed once. A row's new price is the one the page
+lists for its ref # and part number. Rows whose diagram could not be fetched,
+or whose part is no longer on the page, keep their old price and are counted.
+
+A CSV is rewritten next to itself and swapped in atomically. Its journal, if
+the crawl that wrote it kept one, is moved to the new file size, so the run
+can still be resumed. A SQLite output is updated row by row (with
+updated_at); a Parquet one gets a new Price column. Pages are always fetched
+from the site, never from the response cache.
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import os
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime
+
+from common.columnar import _pyarrow, is_parquet, parse_price
+from common.database import BUSY_TIMEOUT, is_sqlite
+from common.engine import AsyncFetcher, setup_logging
+from common.fetch import configure, print_stats, rebase_url
+from common.journal import RunJournal
+from common.metrics import add_arguments as add_metrics_arguments, start_from_args
+from common.parts import HEADER, assembly_key, parse_diagram_page
+from common.throttle import AimdController
+
+REF, PART_NUMBER, DIAGRAM_URL, PRICE = (HEADER.index(name) for name in
+                                        ("Ref #", "Part number", "OEM diagram URL", "Price"))
+
+
+class PriceRefresher(AsyncFetcher):
+    """
+    Fetch the diagrams of a Part2 output, one page per assembly, and look up
+    the current price of its rows. `counts` tallies what happened to each row.
+    """
+
+    def __init__(self, per_host=8, base_url=None, retry_policy=None, pool=None):
+        super().__init__(per_host=per_host, retry_policy=retry_policy, pool=pool)
+        self.base_url = base_url
+        self.prices = {}  # assembly key -> {(ref, part number): price}, or None if it failed
+        self.counts = Counter()
+
+    def fetch_url(self, diagram_url):
+        """
+        The URL to fetch a diagram from: as stored, or on `base_url` if given.
+        """
+        return rebase_url(diagram_url, self.base_url) if self.base_url else diagram_url
+
+    async def load(self, diagram_url):
+        content = await self.fetch(self.fetch_url(diagram_url))
+        if content is None:
+            return None
+        try:
+            parts = await self.parse(parse_diagram_page, content)
+        except Exception as e:
+            logging.error(f"Error processing diagram content from '{diagram_url}': {e}")
+            return None
+        prices = {}
+        for ref, _, part_number, price, sspn in parts:
+            prices[ref, part_number] = price
+            if sspn:
+                # part_rows writes such a part a second time under its SSPN.
+                prices[ref, sspn] = price
+        return prices
+
+    async def run(self, diagram_urls):
+        """
+        Fetch one URL of every assembly among `diagram_urls`.
+        """
+        urls = {}
+        for url in diagram_urls:
+            urls.setdefault(assembly_key(url), url)
+        try:
+            keys = list(urls)
+            for key, prices in zip(keys, await asyncio.gather(*(self.load(urls[key]) for key in keys))):
+                self.prices[key] = prices
+                self.counts["diagrams" if prices is not None else "failed diagrams"] += 1
+        finally:
+            self.close()
+
+    def price(self, diagram_url, ref, part_number, old_price, convert=None):
+        """
+        The price a row should now have, passed through `convert` if the
+        output stores prices as something other than the page's text.
+        Counts the outcome.
+        """
+        prices = self.prices.get(assembly_key(diagram_url))
+        if prices is None:
+            self.counts["diagram failed"] += 1
+            return old_price
+        price = prices.get((ref, part_number))
+        if price is None:
+            self.counts["part not found"] += 1
+            return old_price
+        if convert is not None:
+            price = convert(price)
+        self.counts["changed" if price != old_price else "unchanged"] += 1
+        return price
+
+
+def _is_part_row(row):
+    return len(row) == len(HEADER) and row != HEADER
+
+
+def refresh_csv(file_name, refresher, journal_file=None):
+    journal_file = journal_file or file_name + ".journal"
+    journal = None
+    if os.path.exists(journal_file):
+        journal = RunJournal(journal_file)
+        if journal.offset != os.path.getsize(file_name):
+            journal.close()
+            raise ValueError(f"{file_name} has rows past its last checkpoint; finish or resume the crawl first")
+    try:
+        with open(file_name, mode="r", newline="", encoding="utf-8") as file:
+            urls = {row[DIAGRAM_URL] for row in csv.reader(file) if _is_part_row(row)}
+        asyncio.run(refresher.run(urls))
+        temp_file = f"{file_name}.{os.getpid()}.tmp"
+        with open(file_name, mode="r", newline="", encoding="utf-8") as source, \
+                open(temp_file, mode="w", newline="", encoding="utf-8") as target:
+            writer = csv.writer(target, quoting=csv.QUOTE_ALL)
+            for row in csv.reader(source):
+                if _is_part_row(row):
+                    row[PRICE] = refresher.price(row[DIAGRAM_URL], row[REF], row[PART_NUMBER], row[PRICE])
+                writer.writerow(row)
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(temp_file, file_name)
+        if journal is not None:
+            journal.move_offset(os.path.getsize(file_name))
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+def refresh_sqlite(file_name, refresher):
+    connection = sqlite3.connect(file_name, timeout=BUSY_TIMEOUT, isolation_level=None)
+    try:
+        urls = [url for (url,) in connection.execute("SELECT DISTINCT diagram_url FROM part_rows")]
+        asyncio.run(refresher.run(urls))
+        updated_at = datetime.now().isoformat(timespec="seconds")
+        updates = []
+        rows = connection.execute("SELECT brand, type, year, model, diagram_url, ref, part_number, price "
+                                  "FROM part_rows")
+        for brand, type, year, model, url, ref, part_number, price in rows:
+            new_price = refresher.price(url, ref, part_number, price)
+            if new_price != price:
+                updates.append((new_price, updated_at, brand, type, year, model, url, ref, part_number))
+        connection.execute("BEGIN IMMEDIATE")
+        connection.executemany("UPDATE part_rows SET price = ?, updated_at = ? WHERE brand = ? AND type = ? "
+                               "AND year = ? AND model = ? AND diagram_url = ? AND ref = ? AND part_number = ?",
+                               updates)
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+
+def refresh_parquet(file_name, refresher):
+    pa, pq = _pyarrow()
+    table = pq.read_table(file_name)
+    urls = table.column("OEM diagram URL").to_pylist()
+    asyncio.run(refresher.run(set(urls)))
+    refs = table.column("Ref #").to_pylist()
+    part_numbers = table.column("Part number").to_pylist()
+    old_prices = table.column("Price").to_pylist()
+    prices = [refresher.price(url, ref, part_number, old_price, convert=parse_price)
+              for url, ref, part_number, old_price in zip(urls, refs, part_numbers, old_prices)]
+    index = table.schema.get_field_index("Price")
+    table = table.set_column(index, table.schema.field(index), pa.array(prices, pa.float64()))
+    temp_file = f"{file_name}.{os.getpid()}.tmp"
+    pq.write_table(table, temp_file, compression="zstd")
+    os.replace(temp_file, file_name)
+
+
+def refresh_prices(file_name, per_host=8, base_url=None, journal_file=None):
+    """
+    Update the prices of a Part2 output in place; returns the refresher for its counts.
+    """
+    # No response cache: a cached diagram page would hand back the prices being refreshed.
+    configure(pool_size=per_host, controller=AimdController(maximum=per_host), cache=None)
+    refresher = PriceRefresher(per_host=per_host, base_url=base_url)
+    if is_parquet(file_name):
+        refresh_parquet(file_name, refresher)
+    elif is_sqlite(file_name):
+        refresh_sqlite(file_name, refresher)
+    else:
+        refresh_csv(file_name, refresher, journal_file)
+    return refresher
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update the Price column of a Part2 output from its diagram pages.")
+    parser.add_argument("output", help="Part2 output to update: .csv, .sqlite/.db or .parquet")
+    parser.add_argument("--per-host", type=int, default=8, help="max in-flight requests per host")
+    parser.add_argument("--base-url", help="fetch the diagrams from this host instead, e.g. a local replay server")
+    parser.add_argument("--journal", help="the CSV's checkpoint journal (default: <output>.journal)")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    start_from_args(args)
+    print("started!")
+    started = time.monotonic()
+    try:
+        refresher = refresh_prices(args.output, per_host=args.per_host, base_url=args.base_url,
+                                   journal_file=args.journal)
+    except ValueError as e:
+        parser.error(str(e))
+    counts = refresher.counts
+    print(f"ended! {counts['diagrams']} diagrams fetched ({counts['failed diagrams']} failed); rows: "
+          f"{counts['changed']} changed, {counts['unchanged']} unchanged, {counts['part not found']} part not found, "
+          f"{counts['diagram failed']} diagram failed, in {time.monotonic() - started:.0f}s")
+    print_stats()
+
+
+if __name__ == "__main__":
+    main()
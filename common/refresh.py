@@ -0,0 +1,302 @@
+"""
+Incremental Part1 refresh: crawl a site's catalog again, compare it with the
+previous Part1 snapshot and write only the model rows that were added or
+removed since, so Part2 crawls the new models instead of the whole brand.
+
+    python refresh_catalog.py yamaha --output-dir result_part1
+    python ../Part2/crawl_async.py result_part1/9_Yamaha_added_1_<ts>.csv
+
+For every site three files are written next to each other:
+
+    9_Yamaha_1_<ts>.csv          the full, current catalog: the next run's baseline
+    9_Yamaha_added_1_<ts>.csv    models not in the previous snapshot
+    9_Yamaha_removed_1_<ts>.csv  models of the previous snapshot that are gone
+
+plus 9_Yamaha_1_<ts>.csv.years.json, an index of the year pages (their URL,
+labels and a digest of the model links they list). Every year page is still
+fetched, as the model lists live there; with the previous run's index, one
+whose links are unchanged is only not compared model by model. Requests are
+saved elsewhere: year pages older than --skip-years-before are not fetched
+at all, their models being carried over from the snapshot, and the response
+cache turns the rest into conditional requests (or, with --cache-ttl, serves
+pages without validators from disk while they are fresh). The first refresh
+after a plain crawl has no index yet and diffs every year page.
+
+Removed rows are only reported when every page was read; a type or year
+page that failed would otherwise make its models look removed. Such a run's
+catalog is kept as 9_Yamaha_incomplete_1_<ts>.csv so it does not become the
+next run's baseline.
+"""
+import argparse
+import asyncio
+import csv
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+
+from common.cache import add_arguments as add_cache_arguments
+from common.catalog import PART1_HEADER, SITES, YEAR, CatalogCrawler, output_file, select_sites
+from common.engine import setup_logging
+from common.fetch import configure, print_stats
+from common.metrics import add_arguments as add_metrics_arguments, start_from_args
+from common.sink import CsvSink
+from common.throttle import AimdController
+
+# Queued instead of a year page whose models come from the snapshot.
+CARRIED = "carried"
+
+
+def year_digest(models):
+    """
+    Digest of the (model, href) links of one year page, in page order.
+    """
+    text = "\n".join(f"{model}\t{href}" for model, href in models)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def index_file(snapshot_file):
+    return snapshot_file + ".years.json"
+
+
+def delta_file(snapshot_file, kind):
+    """
+    Map csv/9_Yamaha_1_<ts>.csv to csv/9_Yamaha_<kind>_1_<ts>.csv, a name
+    Part2's default output naming still understands.
+    """
+    base, ext = os.path.splitext(snapshot_file)
+    match = re.search(r"_1(_\d{14})?$", base)
+    if match is None:
+        return f"{base}_{kind}{ext}"
+    return f"{base[:match.start()]}_{kind}{base[match.start():]}{ext}"
+
+
+def latest_snapshot(site, directory):
+    """
+    The newest Part1 CSV of `site` in `directory`, or None.
+    """
+    names = glob.glob(os.path.join(directory, site.output_name.format(timestamp="[0-9]*")))
+    return max(names) if names else None
+
+
+class Snapshot:
+    """
+    A previous Part1 CSV and, if the run that wrote it kept one, its year-page index.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.rows = []
+        self.by_labels = {}  # (brand, type, year) -> rows
+        with open(file_name, mode="r", newline="", encoding="utf-8") as file:
+            for row in csv.reader(file):
+                if row == PART1_HEADER or len(row) < 5:
+                    continue
+                self.rows.append(row)
+                self.by_labels.setdefault(tuple(row[:3]), []).append(row)
+        self.urls = {row[4] for row in self.rows}
+        self.years = {}  # year page URL -> {"labels": [brand, type, year], "digest": ...}
+        if os.path.exists(index_file(file_name)):
+            with open(index_file(file_name), mode="r", encoding="utf-8") as file:
+                self.years = json.load(file)
+
+    def year_rows(self, year_url):
+        entry = self.years.get(year_url)
+        if entry is None:
+            return None
+        return self.by_labels.get(tuple(entry["labels"]), [])
+
+
+def _year_number(label):
+    try:
+        return int(str(label).strip())
+    except ValueError:
+        return None
+
+
+class RefreshCrawler(CatalogCrawler):
+    """
+    Catalog crawl that diffs each year page against a previous snapshot.
+    write_rows(site, rows) still receives the full catalog; the rows that
+    are new end up in `added`, the year-page index in `years`.
+    """
+
+    def __init__(self, snapshots, skip_years_before=None, **kwargs):
+        super().__init__(**kwargs)
+        self.snapshots = snapshots  # site name -> Snapshot or None
+        self.skip_years_before = skip_years_before
+        self.added = {name: [] for name in snapshots}
+        self.seen = {name: set() for name in snapshots}
+        self.years = {name: {} for name in snapshots}
+        self.unchanged = dict.fromkeys(snapshots, 0)
+        self.skipped = dict.fromkeys(snapshots, 0)
+        self.incomplete = dict.fromkeys(snapshots, False)
+
+    async def visit(self, site, level, url, labels):
+        if level == CARRIED:
+            await self.carry_over(site, url)
+        else:
+            await super().visit(site, level, url, labels)
+
+    async def carry_over(self, site, year_url):
+        """
+        Copy a year page's rows and index entry from the snapshot; without
+        them the site's removed rows can no longer be trusted.
+        """
+        snapshot = self.snapshots[site.name]
+        rows = None if snapshot is None else snapshot.year_rows(year_url)
+        if rows is None:
+            self.incomplete[site.name] = True
+            return
+        self.years[site.name][year_url] = snapshot.years[year_url]
+        self.seen[site.name].update(row[4] for row in rows)
+        await self.emit(site, rows)
+        self.models_found[site.name] += len(rows)
+
+    def follow(self, site, level, url, labels):
+        year = _year_number(labels[1]) if level == YEAR else None
+        if year is not None and self.skip_years_before and year < self.skip_years_before:
+            snapshot = self.snapshots[site.name]
+            if snapshot is not None and url in snapshot.years:
+                self.skipped[site.name] += 1
+                level = CARRIED
+        super().follow(site, level, url, labels)
+
+    def page_failed(self, site, level, url, labels):
+        super().page_failed(site, level, url, labels)
+        if level == YEAR:
+            super().follow(site, CARRIED, url, labels)
+        else:
+            self.incomplete[site.name] = True
+
+    async def year_done(self, site, url, models, rows):
+        digest = year_digest(models)
+        snapshot = self.snapshots[site.name]
+        previous = None if snapshot is None else snapshot.years.get(url)
+        self.years[site.name][url] = {"labels": rows[0][:3] if rows else [None, None, None], "digest": digest}
+        self.seen[site.name].update(row[4] for row in rows)
+        if previous is not None and previous["digest"] == digest:
+            self.unchanged[site.name] += 1
+        elif snapshot is None:
+            self.added[site.name].extend(rows)
+        else:
+            self.added[site.name].extend(row for row in rows if row[4] not in snapshot.urls)
+        await super().year_done(site, url, models, rows)
+
+    def removed(self, site):
+        """
+        Snapshot rows no longer in the catalog, or None if a failed page
+        makes that impossible to tell.
+        """
+        snapshot = self.snapshots[site.name]
+        if snapshot is None:
+            return []
+        if self.incomplete[site.name]:
+            return None
+        return [row for row in snapshot.rows if row[4] not in self.seen[site.name]]
+
+
+def _write_csv(file_name, rows):
+    with CsvSink(file_name) as sink:
+        sink.write(PART1_HEADER)
+        sink.write_rows(rows)
+
+
+def refresh(sites, per_host=4, workers=16, output_dir="csv", previous_dir=None, previous=None,
+            skip_years_before=None, cache_ttl=None):
+    """
+    Crawl every SiteConfig in `sites` and diff it against its latest snapshot
+    in previous_dir (default: output_dir), or against `previous` for a
+    single site. Returns {site name: (snapshot, added, removed file or None)},
+    the snapshots compared against and the crawler for its counters.
+    """
+    configure(pool_size=per_host, controller=AimdController(maximum=per_host), cache_ttl=cache_ttl)
+    snapshots = {}
+    for site in sites:
+        file_name = previous or latest_snapshot(site, previous_dir or output_dir)
+        snapshots[site.name] = Snapshot(file_name) if file_name else None
+    crawler = RefreshCrawler(snapshots, skip_years_before=skip_years_before, per_host=per_host, workers=workers)
+    files = {site.name: output_file(site, output_dir) for site in sites}
+    # Written under a temporary name: a site whose output_name has no
+    # timestamp would otherwise overwrite its own baseline mid-crawl.
+    sinks = {name: CsvSink(file_name + ".part") for name, file_name in files.items()}
+
+    def write_rows(site, rows):
+        sink = sinks[site.name]
+        sink.write_rows(rows)
+        sink.flush()
+
+    try:
+        for sink in sinks.values():
+            sink.write(PART1_HEADER)
+        asyncio.run(crawler.run(sites, write_rows))
+    finally:
+        for sink in sinks.values():
+            sink.close()
+
+    results = {}
+    for site in sites:
+        file_name = files[site.name]
+        added_file = delta_file(file_name, "added")
+        removed = crawler.removed(site)
+        removed_file = None
+        if removed is None:
+            file_name = delta_file(file_name, "incomplete")
+        else:
+            removed_file = delta_file(files[site.name], "removed")
+            _write_csv(removed_file, removed)
+        os.replace(files[site.name] + ".part", file_name)
+        with open(index_file(file_name), mode="w", encoding="utf-8") as file:
+            json.dump(crawler.years[site.name], file, indent=1)
+        _write_csv(added_file, crawler.added[site.name])
+        results[site.name] = (file_name, added_file, removed_file)
+    return results, snapshots, crawler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Part1 crawl that only reports models added or removed "
+                                                 "since the previous snapshot.")
+    parser.add_argument("sites", nargs="*", metavar="site", help="sites to refresh: " + ", ".join(sorted(SITES)))
+    parser.add_argument("--all", action="store_true", help="refresh every configured site")
+    parser.add_argument("--per-host", type=int, default=4, help="max in-flight requests per host")
+    parser.add_argument("--workers", type=int, default=16, help="pages in progress at once, over all sites")
+    parser.add_argument("--output-dir", default="csv")
+    parser.add_argument("--previous-dir", help="where to look for the previous snapshot (default: --output-dir)")
+    parser.add_argument("--previous", help="previous Part1 CSV to compare against (one site only)")
+    parser.add_argument("--skip-years-before", type=int,
+                        help="do not fetch year pages older than this; carry their models over")
+    parser.add_argument("--base-url", help="fetch from this host instead, e.g. a local replay server")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    sites = select_sites(parser, args)
+    if args.previous and len(sites) != 1:
+        parser.error("--previous compares one site; use --previous-dir for several")
+
+    setup_logging()
+    start_from_args(args)
+    print("started! " + ", ".join(site.name for site in sites))
+    started = time.monotonic()
+    results, snapshots, crawler = refresh(sites, per_host=args.per_host, workers=args.workers,
+                                          output_dir=args.output_dir, previous_dir=args.previous_dir,
+                                          previous=args.previous, skip_years_before=args.skip_years_before,
+                                          cache_ttl=args.cache_ttl)
+    elapsed = time.monotonic() - started
+    for name, (file_name, added_file, removed_file) in results.items():
+        snapshot = snapshots[name]
+        against = f"against {snapshot.file_name}" if snapshot else "(no previous snapshot)"
+        if removed_file is None:
+            removed = "removed unknown, some pages failed (not kept as a baseline)"
+        else:
+            removed = f"{len(crawler.removed(SITES[name]))} removed -> {removed_file}"
+        print(f"{name}: {crawler.models_found.get(name, 0)} models -> {file_name} {against}; "
+              f"{len(crawler.added[name])} added -> {added_file}, {removed}; "
+              f"{crawler.unchanged[name]} year pages unchanged, {crawler.skipped[name]} not fetched")
+    print(f"ended! {crawler.pages_done} pages in {elapsed:.0f}s")
+    print_stats()
+
+
+if __name__ == "__main__":
+    main()
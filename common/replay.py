@@ -0,0 +1,311 @@
+"""
+Stand-in HTTP server that replays recorded dealer-site pages, for offline
+and repeatable load tests of the Part1 and Part2 crawls:
+
+    python bench/replay_server.py --root site_dump --latency 80 --jitter 40 --error-rate 0.02
+    python bench/replay_server.py --cache http_cache --origin https://www.babbittsonline.com --bandwidth 2000000
+    python Part2/crawl_async.py result_part1/5_KTM_1.csv --base-url http://127.0.0.1:8765
+
+Pages come from a directory that mirrors the site's URL paths (--root), or
+from the response cache of an earlier live crawl (--cache), looked up under
+the URL the page had on --origin. Both can be given; the directory wins.
+
+Every request can be delayed (latency plus uniform jitter) and can fail:
+a connection reset, a stall that outlasts the client's timeout, or a 5xx
+(optionally with Retry-After). Response bodies are sent through one shared
+token bucket when --bandwidth is set, so the cap applies to the whole
+"link" like a real uplink would. --seed makes the fault sequence repeatable.
+
+Point the crawl's response cache away from its usual directory
+(SCRAPER_CACHE_DIR=) while load testing, or cached copies are served
+without ever reaching the replay server.
+"""
+import argparse
+import http.server
+import os
+import random
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from urllib.parse import unquote, urlsplit
+
+from common.cache import ResponseCache
+
+Faults = namedtuple("Faults", [
+    "latency",       # seconds added to every response
+    "jitter",        # up to this many extra seconds, uniformly
+    "reset_rate",    # fraction of requests answered with a TCP reset
+    "timeout_rate",  # fraction of requests that stall for `stall` seconds, then drop
+    "stall",
+    "error_rate",    # fraction of requests answered with `error_status`
+    "error_status",
+    "retry_after",   # Retry-After seconds sent with 429/503, or None
+    "bandwidth",     # bytes/s shared by all responses, or None for unlimited
+    "seed",
+], defaults=(0.0, 0.0, 0.0, 0.0, 90.0, 0.0, 503, None, None, None))
+
+CHUNK_SIZE = 16 * 1024
+
+
+class DirectorySource:
+    """
+    Pages stored as files under `root`, one per URL path; a directory's
+    index.html answers for the directory itself.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def load(self, path):
+        relative = unquote(urlsplit(path).path).lstrip("/")
+        file_name = os.path.abspath(os.path.join(self.root, relative))
+        if file_name != self.root and not file_name.startswith(self.root + os.sep):
+            return None
+        if os.path.isdir(file_name):
+            file_name = os.path.join(file_name, "index.html")
+        try:
+            with open(file_name, mode="rb") as file:
+                return file.read(), "text/html; charset=utf-8"
+        except OSError:
+            return None
+
+
+class CacheSource:
+    """
+    Pages from a ResponseCache directory, stored under `origin` + path.
+    """
+
+    def __init__(self, directory, origin):
+        self.cache = ResponseCache(directory)
+        self.origins = [origin.rstrip("/"), origin.rstrip("/") + "/"]
+
+    def load(self, path):
+        # Some sites' base URLs end in "/" and their hrefs start with one.
+        for origin in self.origins:
+            meta, body = self.cache.load(origin + path)
+            if meta is not None:
+                return body, meta.get("headers", {}).get("Content-Type", "text/html; charset=utf-8")
+        return None
+
+
+class TokenBucket:
+    """
+    Shared byte budget refilled at `rate` bytes per second.
+    """
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, size):
+        """
+        Reserve `size` bytes and sleep until they have been earned.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._tokens + (now - self._last) * self.rate, self.rate)
+            self._last = now
+            self._tokens -= size
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "ReplayServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        replay = self.server.replay
+        outcome = replay.choose_fault()
+        delay = replay.delay()
+        if delay:
+            time.sleep(delay)
+        if outcome == "reset":
+            replay.count("reset")
+            self._reset()
+            return
+        if outcome == "timeout":
+            replay.count("timeout")
+            time.sleep(replay.faults.stall)
+            self._reset()
+            return
+        if outcome == "error":
+            replay.count(str(replay.faults.error_status))
+            headers = {}
+            if replay.faults.retry_after is not None and replay.faults.error_status in (429, 503):
+                headers["Retry-After"] = str(replay.faults.retry_after)
+            self._send(replay.faults.error_status, b"injected error\n", "text/plain", headers)
+            return
+
+        page = replay.load(self.path)
+        if page is None:
+            replay.count("404")
+            self._send(404, b"not recorded\n", "text/plain")
+            return
+        replay.count("200")
+        body, content_type = page
+        self._send(200, body, content_type)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        bucket = self.server.replay.bucket
+        if bucket is None:
+            self.wfile.write(body)
+        else:
+            for start in range(0, len(body), CHUNK_SIZE):
+                chunk = body[start:start + CHUNK_SIZE]
+                bucket.take(len(chunk))
+                self.wfile.write(chunk)
+        self.server.replay.count_bytes(len(body))
+
+    def _reset(self):
+        # SO_LINGER with a zero timeout makes close() send RST instead of FIN.
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.close_connection = True
+        self.connection.close()
+
+
+class ReplayServer:
+    """
+    Threaded HTTP server over one or more page sources, with injected faults.
+    Use start()/stop() to run it in the background, e.g. from a benchmark.
+    """
+
+    def __init__(self, sources, faults=None, host="127.0.0.1", port=8765):
+        self.sources = list(sources)
+        self.faults = faults or Faults()
+        self.bucket = TokenBucket(self.faults.bandwidth) if self.faults.bandwidth else None
+        self.counters = Counter()
+        self.bytes_sent = 0
+        self._random = random.Random(self.faults.seed)
+        self._lock = threading.Lock()
+        self._httpd = http.server.ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.replay = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def load(self, path):
+        for source in self.sources:
+            page = source.load(path)
+            if page is not None:
+                return page
+        return None
+
+    def choose_fault(self):
+        """
+        Return "reset", "timeout", "error" or None for the next request.
+        """
+        faults = self.faults
+        with self._lock:
+            roll = self._random.random()
+        for outcome, rate in (("reset", faults.reset_rate), ("timeout", faults.timeout_rate),
+                              ("error", faults.error_rate)):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return None
+
+    def delay(self):
+        if not self.faults.jitter:
+            return self.faults.latency
+        with self._lock:
+            return self.faults.latency + self._random.uniform(0, self.faults.jitter)
+
+    def count(self, outcome):
+        with self._lock:
+            self.counters[outcome] += 1
+
+    def count_bytes(self, size):
+        with self._lock:
+            self.bytes_sent += size
+
+    def stats(self):
+        with self._lock:
+            counters = ", ".join(f"{count} {outcome}" for outcome, count in sorted(self.counters.items()))
+            return f"{sum(self.counters.values())} requests ({counters or 'none'}), {self.bytes_sent} bytes sent"
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded dealer-site pages with injected latency and faults.")
+    parser.add_argument("--root", help="directory mirroring the site's URL paths")
+    parser.add_argument("--cache", help="response cache directory of an earlier crawl")
+    parser.add_argument("--origin", default="https://www.babbittsonline.com",
+                        help="site the cached pages were fetched from")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0, help="milliseconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0, help="up to this many extra milliseconds")
+    parser.add_argument("--reset-rate", type=float, default=0, help="fraction of requests reset")
+    parser.add_argument("--timeout-rate", type=float, default=0, help="fraction of requests stalled")
+    parser.add_argument("--stall", type=float, default=90, help="seconds a stalled request hangs before dropping")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=int, help="Retry-After seconds sent with injected 429/503")
+    parser.add_argument("--bandwidth", type=float, help="bytes per second shared by all responses")
+    parser.add_argument("--seed", type=int, help="seed for repeatable latency and faults")
+    args = parser.parse_args(argv)
+
+    sources = []
+    if args.root:
+        sources.append(DirectorySource(args.root))
+    if args.cache:
+        sources.append(CacheSource(args.cache, args.origin))
+    if not sources:
+        parser.error("give --root, --cache or both")
+    faults = Faults(latency=args.latency / 1000, jitter=args.jitter / 1000, reset_rate=args.reset_rate,
+                    timeout_rate=args.timeout_rate, stall=args.stall, error_rate=args.error_rate,
+                    error_status=args.error_status, retry_after=args.retry_after, bandwidth=args.bandwidth,
+                    seed=args.seed)
+    server = ReplayServer(sources, faults, host=args.host, port=args.port)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    print(f"replaying on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.stats(), flush=True)
+
+
+if __name__ == "__main__":
+    main()
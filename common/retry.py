@@ -0,0 +1,177 @@
+"""
+Retry policy shared by every fetch: exponential backoff with full jitter,
+Retry-After support, and a split between errors worth retrying and errors
+that will not go away.
+
+Retried: DNS failures, refused or reset connections, timeouts, truncated
+bodies, 408/425/429 and 5xx other than 501/505. Not retried: 404 and the
+other 4xx, malformed URLs, redirect loops. A URL that is still failing after
+`max_attempts` tries, or whose next wait would exceed its `budget` seconds,
+is given up on. fetch_content() then logs it and returns None, and the crawl
+moves on to the next URL. The old fetch_html loops slept a fixed 5 s and
+called sys.exit(1) at that point, which ended the whole run.
+
+Defaults come from SCRAPER_RETRY_ATTEMPTS, SCRAPER_RETRY_BASE_DELAY,
+SCRAPER_RETRY_MAX_DELAY and SCRAPER_RETRY_BUDGET.
+"""
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from common.fetch import host_of, http_get
+from common.metrics import get_metrics
+
+DEFAULT_ATTEMPTS = int(os.environ.get("SCRAPER_RETRY_ATTEMPTS", "5"))
+DEFAULT_BASE_DELAY = float(os.environ.get("SCRAPER_RETRY_BASE_DELAY", "2"))
+DEFAULT_MAX_DELAY = float(os.environ.get("SCRAPER_RETRY_MAX_DELAY", "60"))
+DEFAULT_BUDGET = float(os.environ.get("SCRAPER_RETRY_BUDGET", "300"))
+
+RETRYABLE_STATUSES = frozenset({408, 425, 429})
+PERMANENT_SERVER_STATUSES = frozenset({501, 505})
+RETRYABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError)
+
+
+class FetchFailed(Exception):
+    """
+    A URL could not be fetched; `reason` is e.g. "status 404" or "timeout".
+    """
+
+    def __init__(self, url, reason, attempts, permanent):
+        super().__init__(f"{url}: {reason} after {attempts} attempt(s)")
+        self.url = url
+        self.reason = reason
+        self.attempts = attempts
+        self.permanent = permanent
+
+
+def classify(error):
+    """
+    Return (retryable, reason) for an exception raised while fetching.
+    """
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        retryable = status in RETRYABLE_STATUSES or (status >= 500 and status not in PERMANENT_SERVER_STATUSES)
+        return retryable, f"status {status}"
+    if isinstance(error, requests.exceptions.Timeout):
+        return True, "timeout"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return True, "connection"
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True, "truncated"
+    return False, type(error).__name__
+
+
+def retry_after(response, now=None):
+    """
+    Seconds a 429/503 response asks us to wait, or None. Accepts both the
+    delta-seconds and the HTTP-date form of Retry-After.
+    """
+    if response is None or response.status_code not in (429, 503):
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+class RetryPolicy:
+    """
+    How often, and how long apart, a failing fetch is tried again.
+    """
+
+    def __init__(self, max_attempts=DEFAULT_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 multiplier=2.0, budget=DEFAULT_BUDGET, rng=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.budget = budget
+        self._random = rng or random.Random()
+
+    def backoff(self, attempt):
+        """
+        "Full jitter": a uniform wait up to base * multiplier^(attempt-1), capped.
+        """
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return self._random.uniform(0, ceiling)
+
+    def delay(self, attempt, error=None):
+        """
+        Wait before the next attempt: the server's Retry-After if it sent one
+        (capped at max_delay), exponential backoff otherwise.
+        """
+        requested = retry_after(getattr(error, "response", None))
+        if requested is not None:
+            return min(requested, self.max_delay) + self._random.uniform(0, self.base_delay)
+        return self.backoff(attempt)
+
+    def fetch(self, url, get=http_get, sleep=time.sleep):
+        """
+        Return the body of `url`, retrying transient failures. Raises
+        FetchFailed once the error is permanent or retries run out.
+        """
+        metrics = get_metrics()
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = get(url)
+                response.raise_for_status()
+                return response.content
+            except requests.exceptions.RequestException as e:
+                retryable, reason = classify(e)
+                if not retryable:
+                    raise FetchFailed(url, reason, attempt, permanent=True) from e
+                wait = self.delay(attempt, e)
+                if attempt >= self.max_attempts or time.monotonic() - started + wait > self.budget:
+                    raise FetchFailed(url, reason, attempt, permanent=False) from e
+                logging.warning(f"Error fetching URL {url} (attempt {attempt}/{self.max_attempts}): {e}. "
+                                f"Retrying in {wait:.1f}s")
+                metrics.inc("retries_total", host=host_of(url))
+                sleep(wait)
+
+
+_default_policy = None
+
+
+def default_policy():
+    global _default_policy
+    if _default_policy is None:
+        _default_policy = RetryPolicy()
+    return _default_policy
+
+
+def fetch_content(url, policy=None, get=http_get):
+    """
+    Drop-in body for the scripts' fetch_html(): the page content, or None
+    (logged and counted as failed) if it could not be fetched.
+    """
+    try:
+        return (policy or default_policy()).fetch(url, get=get)
+    except FetchFailed as e:
+        record_failure(e)
+        return None
+
+
+def record_failure(error):
+    """
+    Log and count a FetchFailed the caller is going to skip past.
+    """
+    logging.error(f"Failed to fetch URL {error.url}: {error.reason} after {error.attempts} attempt(s). Skipping.")
+    get_metrics().inc("fetch_failures_total", host=host_of(error.url), reason=error.reason)
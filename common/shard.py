@@ -0,0 +1,160 @@
+"""
+Sharded Part2 runs: split one result_part1 CSV into N contiguous, equally
+sized row windows, crawl each window in its own process with the async
+engine, then merge the shard outputs into one de-duplicated CSV.
+
+This replaces hand-edited script copies with overlapping row_number windows.
+Shard outputs and journals are named after the final output file, so
+rerunning with the same --output resumes every shard where it stopped.
+With a .sqlite --output every shard upserts straight into that database and
+there is nothing to merge. Parquet outputs are not supported here. Each shard defers its failed URLs to its own
+dead-letter store; they are combined into <output>.deadletter for a later
+`crawl_async.py --retry-failed` on the merged output.
+"""
+import argparse
+import csv
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from common.cache import add_arguments as add_cache_arguments
+from common.columnar import is_parquet
+from common.database import is_sqlite
+from common.deadletter import merge_stores
+from common.engine import DEFAULT_BASE_URL, crawl, default_output_file, setup_logging
+from common.fetch import print_stats
+from common.metrics import add_arguments as add_metrics_arguments, start_reporter, stop_reporter
+from common.parts import HEADER, read_models
+
+DIAGRAM_URL = HEADER.index("OEM diagram URL")
+
+
+def shard_ranges(input_file, shards, start=1, stop=None):
+    """
+    Return up to `shards` (start, stop) row-number windows that each hold about
+    the same number of model rows.
+    """
+    row_numbers = [row_number for row_number, _ in read_models(input_file, start=start, stop=stop)]
+    if not row_numbers:
+        return []
+    shards = max(1, min(shards, len(row_numbers)))
+    size, extra = divmod(len(row_numbers), shards)
+    ranges = []
+    first = 0
+    for index in range(shards):
+        last = first + size + (1 if index < extra else 0)
+        shard_stop = row_numbers[last] if last < len(row_numbers) else row_numbers[-1] + 1
+        ranges.append((row_numbers[first], shard_stop))
+        first = last
+    return ranges
+
+
+def shard_file(csv_file, index, shards):
+    base, ext = os.path.splitext(csv_file)
+    return f"{base}.shard{index + 1}of{shards}{ext}"
+
+
+def _crawl_shard(job):
+    (input_file, csv_file, journal_file, dead_letter_file, base_url, key_file, per_host, window, start, stop,
+     full_diagrams, cache_ttl, metrics) = job
+    setup_logging()
+    if metrics[0] or metrics[1]:
+        start_reporter(*metrics)
+    try:
+        crawler = crawl(input_file, csv_file, base_url or DEFAULT_BASE_URL, key_file=key_file, per_host=per_host,
+                        window=window, start=start, stop=stop, journal_file=journal_file,
+                        full_diagrams=full_diagrams, dead_letter_file=dead_letter_file, model_base_url=base_url,
+                        cache_ttl=cache_ttl)
+    finally:
+        stop_reporter()  # pool workers leave through os._exit, so atexit would not run
+    print(f"shard {start}-{stop - 1} ended: {crawler.models_done} models, {crawler.diagrams_done} diagrams")
+    print_stats()
+    return csv_file
+
+
+def merge_outputs(shard_files, csv_file):
+    """
+    Concatenate shard outputs in order into csv_file, dropping rows another
+    shard already wrote. A row is identified by its model, its diagram and
+    its position among that diagram's rows, so a part a diagram really lists
+    twice is kept twice. Returns (rows written, duplicates dropped).
+    """
+    seen = set()
+    written = 0
+    dropped = 0
+    with open(csv_file, mode="w", newline="", encoding="utf-8") as output:
+        writer = csv.writer(output, quoting=csv.QUOTE_ALL)
+        writer.writerow(HEADER)
+        for shard in shard_files:
+            positions = Counter()
+            with open(shard, mode="r", newline="", encoding="utf-8") as file:
+                for row in csv.reader(file):
+                    if row == HEADER:
+                        continue
+                    diagram = tuple(row[:4]) + (row[DIAGRAM_URL],)
+                    key = diagram + (positions[diagram],)
+                    positions[diagram] += 1
+                    if key in seen:
+                        dropped += 1
+                        continue
+                    seen.add(key)
+                    writer.writerow(row)
+                    written += 1
+    return written, dropped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl one result_part1 CSV in N parallel shards.")
+    parser.add_argument("input_file", help="Part1 CSV, e.g. result_part1/9_Yamaha_1_20241203193828.csv")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 4, help="number of worker processes")
+    parser.add_argument("--base-url", help=f"fetch diagrams, and the input's model pages, from this host "
+                                           f"instead, e.g. a local replay server (default: diagrams from "
+                                           f"{DEFAULT_BASE_URL})")
+    parser.add_argument("--key-file", default="key.csv")
+    parser.add_argument("--output", help="merged CSV (default: csv/<brand>_2_<timestamp>.csv); "
+                                         "pass an earlier run's file to resume it, or a .sqlite name "
+                                         "for all shards to write to")
+    parser.add_argument("--per-host", type=int, default=4, help="max in-flight requests per host, per shard")
+    parser.add_argument("--window", type=int, default=16, help="model rows in flight, per shard")
+    parser.add_argument("--start", type=int, default=1, help="first input row number to crawl")
+    parser.add_argument("--stop", type=int, help="input row number to stop before")
+    parser.add_argument("--full-diagrams", action="store_true",
+                        help="write every part of a matched diagram, not only the parts key.csv lists")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    csv_file = args.output or default_output_file(args.input_file)
+    if is_parquet(csv_file):
+        parser.error("sharded runs write a CSV or a .sqlite database, not Parquet")
+    ranges = shard_ranges(args.input_file, args.shards, start=args.start, stop=args.stop)
+    shared = is_sqlite(csv_file)
+    jobs = []
+    for index, (start, stop) in enumerate(ranges):
+        output = shard_file(csv_file, index, len(ranges))
+        # Each shard process dumps its own metrics, next to the requested files.
+        metrics = tuple(shard_file(name, index, len(ranges)) if name else None
+                        for name in (args.metrics_json, args.metrics_prom)) + (args.metrics_interval,)
+        jobs.append((args.input_file, csv_file if shared else output, output + ".journal", output + ".deadletter",
+                     args.base_url, args.key_file, args.per_host, args.window, start, stop, args.full_diagrams,
+                     args.cache_ttl, metrics))
+
+    print(f"started! {len(jobs)} shards: " + ", ".join(f"{start}-{stop - 1}" for start, stop in ranges))
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=len(jobs) or 1) as executor:
+        shard_files = list(executor.map(_crawl_shard, jobs))
+    elapsed = time.monotonic() - started
+    failed = merge_stores([job[3] for job in jobs], csv_file + ".deadletter")
+    if failed:
+        print(f"{failed} failed URLs deferred to {csv_file}.deadletter; "
+              f"run crawl_async.py --output {csv_file} --retry-failed to fetch them again")
+    if shared:
+        print(f"ended! {len(jobs)} shards upserted into {csv_file} in {elapsed:.0f}s")
+        return
+    written, dropped = merge_outputs(shard_files, csv_file)
+    print(f"ended! merged {written} rows into {csv_file} ({dropped} duplicates dropped) in {elapsed:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
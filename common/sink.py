@@ -0,0 +1,190 @@
+"""
+Long-lived, buffered CSV writer for the scrapers' output.
+
+save_to_csv used to open the file, build a csv.writer, write one row and
+close the file again for every part row. A CsvSink keeps the file open,
+collects rows in memory and writes them `buffer_rows` at a time. Rows
+that have waited `flush_interval` seconds are written anyway, by the next
+write or by a background thread if the crawl has stalled. It fsyncs at most
+every `fsync_interval` seconds. Every open sink is flushed when the process
+exits normally, on Ctrl+C, or on SIGTERM.
+
+SIGTERM only raises SystemExit, so the sinks are flushed by the atexit hook
+like on a normal exit. If the signal lands while the main thread is in the
+middle of a flush, the exit waits until that flush is done, so no buffer is
+written twice and no row is cut in half.
+"""
+import atexit
+import csv
+import os
+import signal
+import sys
+import threading
+import time
+
+DEFAULT_BUFFER_ROWS = int(os.environ.get("SCRAPER_CSV_BUFFER", "500"))
+DEFAULT_FLUSH_INTERVAL = float(os.environ.get("SCRAPER_CSV_FLUSH", "10"))
+DEFAULT_FSYNC_INTERVAL = float(os.environ.get("SCRAPER_CSV_FSYNC", "30"))
+FLUSH_TICK = 1.0  # how often the background thread looks for rows left waiting
+
+
+class CsvSink:
+    """
+    Append QUOTE_ALL rows to one CSV file through an in-memory row buffer.
+    """
+
+    def __init__(self, file_name, buffer_rows=DEFAULT_BUFFER_ROWS, fsync_interval=DEFAULT_FSYNC_INTERVAL,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.file_name = file_name
+        self.buffer_rows = buffer_rows
+        self.fsync_interval = fsync_interval
+        self.flush_interval = flush_interval
+        self._file = open(file_name, mode="a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file, quoting=csv.QUOTE_ALL)
+        self._buffer = []
+        self._last_flush = self._last_fsync = time.monotonic()
+        self._lock = threading.RLock()
+        _register(self)
+
+    def write(self, row):
+        with self._lock:
+            self._buffer.append(row)
+            if self._due():
+                self.flush()
+
+    def write_rows(self, rows):
+        with self._lock:
+            self._buffer.extend(rows)
+            if self._due():
+                self.flush()
+
+    def _due(self):
+        return (len(self._buffer) >= self.buffer_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def flush_if_due(self):
+        with self._lock:
+            if self._buffer and self._due():
+                self.flush()
+
+    def flush(self, fsync=False):
+        """
+        Write the buffered rows to the file; fsync if asked to or if the
+        fsync interval has passed.
+        """
+        _writing.depth = getattr(_writing, "depth", 0) + 1
+        try:
+            with self._lock:
+                if self._file.closed:
+                    return
+                if self._buffer:
+                    self._writer.writerows(self._buffer)
+                    self._buffer.clear()
+                self._file.flush()
+                self._last_flush = time.monotonic()
+                if fsync or time.monotonic() - self._last_fsync >= self.fsync_interval:
+                    os.fsync(self._file.fileno())
+                    self._last_fsync = time.monotonic()
+        finally:
+            _writing.depth -= 1
+        if not _writing.depth:
+            _exit_if_signalled()
+
+    def tell(self):
+        with self._lock:
+            return self._file.tell()
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self.flush(fsync=True)
+            self._file.close()
+        _unregister(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_open_sinks = {}
+_registry_lock = threading.RLock()
+_signal_handler_installed = False
+_flush_thread = None
+_writing = threading.local()  # depth of the flushes this thread is inside
+_deferred_signal = None
+
+
+def _register(sink):
+    global _signal_handler_installed, _flush_thread
+    with _registry_lock:
+        _open_sinks[id(sink)] = sink
+        if not _signal_handler_installed and threading.current_thread() is threading.main_thread():
+            if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+                signal.signal(signal.SIGTERM, _on_sigterm)
+            _signal_handler_installed = True
+        if _flush_thread is None or not _flush_thread.is_alive():  # not carried over by fork()
+            _flush_thread = threading.Thread(target=_flush_waiting, name="csv-sink-flush", daemon=True)
+            _flush_thread.start()
+
+
+def _flush_waiting():
+    while True:
+        time.sleep(FLUSH_TICK)
+        with _registry_lock:
+            sinks = list(_open_sinks.values())
+        for sink in sinks:
+            sink.flush_if_due()
+
+
+def _unregister(sink):
+    with _registry_lock:
+        _open_sinks.pop(id(sink), None)
+
+
+def close_all():
+    """
+    Flush and close every open sink.
+    """
+    with _registry_lock:
+        sinks = list(_open_sinks.values())
+    for sink in sinks:
+        sink.close()
+
+
+def _exit_if_signalled():
+    global _deferred_signal
+    if _deferred_signal is not None and threading.current_thread() is threading.main_thread():
+        signum, _deferred_signal = _deferred_signal, None
+        sys.exit(128 + signum)
+
+
+def _on_sigterm(signum, frame):
+    global _deferred_signal
+    if getattr(_writing, "depth", 0):
+        # Mid-flush: let it finish, flush() exits afterwards.
+        _deferred_signal = signum
+        return
+    sys.exit(128 + signum)
+
+
+atexit.register(close_all)
+
+_sinks_by_name = {}
+
+
+def csv_sink(file_name):
+    """
+    Return the shared sink for `file_name`, opening it on first use. This is
+    what the per-brand scripts' save_to_csv() writes through.
+    """
+    with _registry_lock:
+        sink = _sinks_by_name.get(file_name)
+        if sink is None or sink._file.closed:
+            sink = _sinks_by_name[file_name] = CsvSink(file_name)
+        return sink
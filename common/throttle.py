@@ -0,0 +1,118 @@
+"""
+Adaptive per-host concurrency (AIMD) for the shared fetch layer.
+
+Each host starts at a small number of concurrent requests. Every `limit`
+healthy responses raise the limit by one; a timeout, dropped connection,
+429 or 5xx halves it (at most once per `cooldown` seconds, so one burst of
+errors counts as one signal). The fetch layer blocks in acquire() until the
+host has a free slot.
+"""
+import threading
+import time
+from collections import deque
+
+import requests
+
+CONGESTION_ERRORS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
+
+def is_congestion_status(status_code):
+    """
+    Return True for responses that mean the site wants us to slow down.
+    """
+    return status_code == 429 or status_code >= 500
+
+
+class _HostState:
+    def __init__(self, limit):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.healthy_streak = 0
+        self.last_cut = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.recent = deque(maxlen=100)
+
+
+class AimdController:
+    """
+    Additive-increase / multiplicative-decrease limit on in-flight requests per host.
+    """
+
+    def __init__(self, initial=2, minimum=1, maximum=16, decrease=0.5, cooldown=2.0):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(min(self.initial, self.maximum))
+        return state
+
+    def acquire(self, host):
+        """
+        Block until `host` has fewer requests in flight than its current limit.
+        """
+        with self._condition:
+            state = self._state(host)
+            while state.in_flight >= int(state.limit):
+                self._condition.wait()
+            state.in_flight += 1
+
+    def release(self, host, congested):
+        """
+        Return a slot and feed the outcome of the request back into the limit.
+        """
+        with self._condition:
+            state = self._state(host)
+            state.in_flight -= 1
+            state.requests += 1
+            state.recent.append(congested)
+            if congested:
+                state.errors += 1
+                state.healthy_streak = 0
+                now = time.monotonic()
+                if now - state.last_cut >= self.cooldown:
+                    state.last_cut = now
+                    state.limit = max(self.minimum, state.limit * self.decrease)
+            else:
+                state.healthy_streak += 1
+                if state.healthy_streak >= int(state.limit):
+                    state.healthy_streak = 0
+                    state.limit = min(self.maximum, state.limit + 1)
+            self._condition.notify_all()
+
+    def snapshot(self):
+        """
+        Return {host: {"limit", "in_flight", "requests", "errors", "error_rate"}}.
+        error_rate covers the last 100 requests.
+        """
+        with self._condition:
+            return {
+                host: {
+                    "limit": int(state.limit),
+                    "in_flight": state.in_flight,
+                    "requests": state.requests,
+                    "errors": state.errors,
+                    "error_rate": sum(state.recent) / len(state.recent) if state.recent else 0.0,
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+def format_snapshot(controller):
+    """
+    Format the controller state as one line per host.
+    """
+    lines = []
+    for host, state in sorted(controller.snapshot().items()):
+        lines.append(
+            f"{host}: limit {state['limit']}, {state['in_flight']} in flight, "
+            f"{state['errors']}/{state['requests']} congested, recent error rate {state['error_rate']:.0%}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "bench", "fixtures")
+sys.path.insert(0, ROOT)
+
+
+def fixture_page(name):
+    with open(os.path.join(FIXTURES, name), mode="rb") as file:
+        return file.read()
+
+
+class FakePool:
+    """
+    Stands in for the SessionPool: serves `pages` by URL (`default` for any
+    other URL, 404 if there is none) with `status`, and records every request.
+    """
+
+    def __init__(self, pages=None, default=None, status=200):
+        self.pages = pages or {}
+        self.default = default
+        self.status = status
+        self.requested = []
+
+    def get(self, url):
+        self.requested.append(url)
+        content = self.pages.get(url, self.default)
+        response = requests.Response()
+        response.url = url
+        response.status_code = self.status if content is not None else 404
+        response._content = content or b""
+        return response
@@ -0,0 +1,76 @@
+import requests
+
+from common.cache import ResponseCache
+
+URL = "http://x/page"
+
+
+class FakeSite:
+    """
+    Answers send(extra_headers) like a server with an optional ETag.
+    """
+
+    def __init__(self, etag=None, body=b"v1"):
+        self.etag = etag
+        self.body = body
+        self.sent = []
+
+    def send(self, headers):
+        self.sent.append(dict(headers))
+        response = requests.Response()
+        response.url = URL
+        if self.etag and headers.get("If-None-Match") == self.etag:
+            response.status_code = 304
+            return response
+        response.status_code = 200
+        response._content = self.body
+        if self.etag:
+            response.headers["ETag"] = self.etag
+        return response
+
+
+def test_page_with_etag_is_revalidated_and_served_from_disk(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    site = FakeSite(etag='"a"')
+    assert cache.fetch(URL, site.send).content == b"v1"
+    response = cache.fetch(URL, site.send)
+    assert response.content == b"v1" and response.from_cache
+    assert site.sent == [{}, {"If-None-Match": '"a"'}]
+    assert cache.stats() == {"hits": 0, "revalidated": 1, "misses": 1}
+
+
+def test_changed_page_replaces_the_cached_copy(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.fetch(URL, FakeSite(etag='"a"').send)
+    assert cache.fetch(URL, FakeSite(etag='"b"', body=b"v2").send).content == b"v2"
+    assert cache.load(URL)[1] == b"v2"
+
+
+def test_page_without_validators_is_fetched_again_without_a_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    site = FakeSite()
+    cache.fetch(URL, site.send)
+    site.body = b"v2"
+    assert cache.fetch(URL, site.send).content == b"v2"
+    assert len(site.sent) == 2 and cache.stats()["hits"] == 0
+
+
+def test_ttl_serves_a_page_without_validators_from_disk(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=3600)
+    site = FakeSite()
+    cache.fetch(URL, site.send)
+    site.body = b"v2"
+    assert cache.fetch(URL, site.send).content == b"v1"
+    assert len(site.sent) == 1 and cache.stats()["hits"] == 1
+
+
+def test_failed_responses_are_not_stored(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+
+    def not_found(headers):
+        response = requests.Response()
+        response.status_code = 404
+        return response
+
+    assert cache.fetch(URL, not_found).status_code == 404
+    assert cache.load(URL) == (None, None)
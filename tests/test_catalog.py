@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+
+import pytest
+from conftest import FakePool, fixture_page
+
+from common.catalog import (SITES, CatalogCrawler, parse_brand_page, parse_type_page, parse_year_page, select_sites,
+                            with_base_url)
+from common.retry import RetryPolicy
+
+KTM = SITES["ktm"]
+
+
+def _select(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sites", nargs="*")
+    parser.add_argument("--all", action="store_true")
+    parser.add_argument("--base-url")
+    return select_sites(parser, parser.parse_args(argv))
+
+
+def test_site_xpaths_read_the_brand_type_and_year_pages():
+    brand, types = parse_brand_page(KTM, fixture_page("part1_brand.html"))
+    assert brand is None and types[0] == ("Off-Road", "/oemparts/c/ktm/t/off-road")
+    years = parse_type_page(KTM, fixture_page("part1_type.html"))
+    assert years[0] == ("2025", "/oemparts/c/ktm/t/off-road/y/2025")
+    # The breadcrumbs fill in the labels; they win over the year link.
+    brand, type, year, models = parse_year_page(KTM, None, "2025", fixture_page("part1_year.html"))
+    assert (brand, type, year) == ("KTM", "Off-Road", "2022")
+    assert len(models) == 75 and models[0][0] == "2022 50 SX Engine"
+
+
+def test_base_url_override_keeps_each_site_href_convention():
+    can_am = with_base_url(SITES["can_am"], "http://127.0.0.1:8767/")
+    assert can_am.base_url == "http://127.0.0.1:8767/" and can_am.diagram_base_url == "http://127.0.0.1:8767"
+    ktm = with_base_url(KTM, "http://127.0.0.1:8767")
+    assert ktm.base_url == "http://127.0.0.1:8767" and ktm.diagram_base_url is None
+
+
+def test_sites_are_selected_by_name_or_all_at_once():
+    assert [site.name for site in _select(["ktm", "indian"])] == ["ktm", "indian"]
+    assert [site.name for site in _select(["--all"])] == sorted(SITES)
+    assert {site.base_url for site in _select(["--all", "--base-url", "http://h"])} == {"http://h", "http://h/"}
+    with pytest.raises(SystemExit):
+        _select(["ktm", "nope"])
+    with pytest.raises(SystemExit):
+        _select([])
+
+
+def test_crawl_follows_every_level_and_streams_rows_per_year_page():
+    site = with_base_url(KTM, "http://x")
+    pool = FakePool({
+        "http://x/oemparts/c/ktm/parts": fixture_page("part1_brand.html"),
+        "http://x/oemparts/c/ktm/t/off-road": fixture_page("part1_type.html"),
+        "http://x/oemparts/c/ktm/t/off-road/y/2025": fixture_page("part1_year.html"),
+        "http://x/oemparts/c/ktm/t/off-road/y/2024": fixture_page("part1_year.html"),
+    })
+    crawler = CatalogCrawler(per_host=2, workers=4, pool=pool, retry_policy=RetryPolicy(max_attempts=1))
+    written = []
+    asyncio.run(crawler.run([site], lambda site, rows: written.append(rows)))
+    # One brand page, 6 type pages and 31 year pages per type page served.
+    assert len(pool.requested) == len(set(pool.requested)) == 1 + 6 + 31
+    assert [len(rows) for rows in written] == [75, 75]
+    assert crawler.models_found == {"ktm": 150} and crawler.pages_done == 4  # pages fetched and parsed
+    assert written[0][0] == ["KTM", "Off-Road", "2022", "2022 50 SX Engine",
+                             "http://x/oemparts/l/ktm/c8eff3460b12ae6ead581e57/2022-50 SX-Engine"]
+
+
+def test_a_missing_brand_page_ends_the_crawl_of_that_site_only():
+    ktm, indian = with_base_url(KTM, "http://x"), with_base_url(SITES["indian"], "http://y")
+    pool = FakePool({"http://y/oemparts/c/indian/parts": fixture_page("part1_brand.html")})
+    crawler = CatalogCrawler(pool=pool, retry_policy=RetryPolicy(max_attempts=1))
+    asyncio.run(crawler.run([ktm, indian], lambda site, rows: None))
+    assert "http://x/oemparts/c/ktm/parts" in pool.requested
+    assert len([url for url in pool.requested if url.startswith("http://y/")]) == 1 + 6
+    assert crawler.models_found == {"ktm": 0, "indian": 0}
@@ -0,0 +1,45 @@
+import pytest
+
+from common.columnar import ParquetSink, parse_price
+from common.engine import crawl
+from common.parts import HEADER
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def _row(index, price="$1.50"):
+    return ["KTM", "Dirt", "2024", "250 SX", "CYLINDER", str(index), "Bolt", f"PN{index}", "http://x/d/1", price, ""]
+
+
+def test_prices_become_floats_or_none():
+    assert parse_price("1,234.50") == 1234.5 and parse_price("$3") == 3.0
+    assert parse_price("") is None and parse_price("call") is None
+
+
+def test_rows_are_written_in_row_groups_with_dictionary_labels(tmp_path):
+    path = str(tmp_path / "out.parquet")
+    with ParquetSink(path, row_group_rows=2) as sink:
+        sink.write_rows([_row(1), _row(2), _row(3)])
+        sink.write(_row(4, price=""))
+    assert sink.rows_written == 4
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column_names == HEADER
+    assert str(table.schema.field("Brand").type) == "dictionary<values=string, indices=int32, ordered=0>"
+    assert table.column("Price").to_pylist() == [1.5, 1.5, 1.5, None]
+    assert table.column("Part number").to_pylist() == ["PN1", "PN2", "PN3", "PN4"]
+
+
+def test_crawl_refuses_to_overwrite_a_parquet_output_or_its_dead_letters(tmp_path):
+    output = tmp_path / "out.parquet"
+    output.write_bytes(b"PAR1")
+    with pytest.raises(ValueError, match="already exists"):
+        crawl(str(tmp_path / "in.csv"), str(output), "http://x")
+    assert output.read_bytes() == b"PAR1"
+
+    output.unlink()
+    (tmp_path / "out.parquet.deadletter").write_text("")
+    with pytest.raises(ValueError, match="deadletter' already exists"):
+        crawl(str(tmp_path / "in.csv"), str(output), "http://x")
+    assert not output.exists()
@@ -0,0 +1,48 @@
+import sqlite3
+
+from common.database import SqliteSink, is_sqlite
+from common.parts import PartRow
+
+
+def _row(ref, part_number, price="1.00", model="250 SX"):
+    return ["KTM", "Dirt", "2024", model, "CYLINDER", ref, "Bolt", part_number, "http://x/d/1", price, ""]
+
+
+def _select(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT model, ref, part_number, price FROM part_rows "
+                                  "ORDER BY model, ref, part_number").fetchall()
+
+
+def test_rerun_rows_update_the_existing_ones(tmp_path):
+    path = str(tmp_path / "out.sqlite")
+    with SqliteSink(path, batch_rows=2) as sink:
+        sink.write(_row("1", "PN1"))
+        assert sink.tell() == 0  # buffered until the batch fills
+        sink.write_rows([_row("2", "PN2"), _row("1", "PN1", model="350 SX")])
+        assert sink.tell() == 3
+    with SqliteSink(path) as sink:
+        sink.write_rows([_row("1", "PN1", price="2.00"), _row("3", "PN3")])
+    assert _select(path) == [("250 SX", "1", "PN1", "2.00"), ("250 SX", "2", "PN2", "1.00"),
+                             ("250 SX", "3", "PN3", "1.00"), ("350 SX", "1", "PN1", "1.00")]
+
+
+def test_part_rows_and_both_part_numbers_of_an_sspn_are_stored(tmp_path):
+    path = str(tmp_path / "out.db")
+    assert is_sqlite(path) and not is_sqlite("out.csv")
+    dimensions = ("KTM", "Dirt", "2024", "250 SX", "CYLINDER", "http://x/d/1")
+    with SqliteSink(path) as sink:
+        sink.write(PartRow(dimensions, "1", "Bolt", "PN1", "1.00", "SS1"))
+        sink.write(PartRow(dimensions, "1", "Bolt", "SS1", "1.00", "PN1"))
+    assert _select(path) == [("250 SX", "1", "PN1", "1.00"), ("250 SX", "1", "SS1", "1.00")]
+
+
+def test_two_writers_share_one_database(tmp_path):
+    path = str(tmp_path / "out.sqlite")
+    first, second = SqliteSink(path), SqliteSink(path)
+    first.write(_row("1", "PN1"))
+    second.write(_row("2", "PN2"))
+    second.flush(fsync=True)
+    first.close()
+    second.close()
+    assert len(_select(path)) == 2
@@ -0,0 +1,106 @@
+import asyncio
+import glob
+
+import pytest
+from conftest import FakePool, fixture_page
+
+from common import engine
+from common.deadletter import DIAGRAM, MODEL, DeadLetterStore
+from common.engine import DiagramCrawler, retry_failed, retry_output_file
+from common.journal import RunJournal
+from common.retry import RetryPolicy
+from common.sink import CsvSink
+
+MODEL_ROW = ["KTM", "Dirt", "2024", "250 SX", "http://x/m/1.html"]
+DIAGRAM_URL = "http://x/oemparts/a/ktm/875c266dae681589beff6b07/cylinder-1"
+DIAGRAM_PAGE = fixture_page("babbitts_diagram.html")
+
+
+def _redrive(tmp_path, store, journal, pool):
+    crawler = DiagramCrawler("http://x", {}, full_diagrams=True, journal=journal, dead_letters=store, pool=pool,
+                             retry_policy=RetryPolicy(max_attempts=1))
+    written = []
+    with CsvSink(str(tmp_path / "out.csv")) as sink:
+        asyncio.run(crawler.redrive(store.pending(), written.extend, sink))
+    return crawler, written
+
+
+def test_store_keeps_one_entry_per_url_and_survives_reopening(tmp_path):
+    path = str(tmp_path / "out.csv.deadletter")
+    with DeadLetterStore(path) as store:
+        store.record(MODEL, 2, MODEL_ROW, MODEL_ROW[4], "timeout")
+        store.record(MODEL, 2, MODEL_ROW, MODEL_ROW[4], "status 503")
+        store.record(DIAGRAM, 3, MODEL_ROW, DIAGRAM_URL, "timeout", "CYLINDER 1")
+        store.discard(DIAGRAM, 3, DIAGRAM_URL)
+    with DeadLetterStore(path) as store:
+        [entry] = store.pending()
+        assert entry["kind"] == MODEL and entry["reason"] == "status 503"
+        assert store.failures(entry) == 2
+
+
+def test_redrive_recovers_a_failed_diagram(tmp_path):
+    store = DeadLetterStore(str(tmp_path / "out.csv.deadletter"))
+    store.record(DIAGRAM, 3, MODEL_ROW, DIAGRAM_URL, "timeout", "CYLINDER 1")
+    journal = RunJournal(str(tmp_path / "out.csv.journal"))
+    pool = FakePool(default=DIAGRAM_PAGE)
+    crawler, written = _redrive(tmp_path, store, journal, pool)
+    journal.close()
+    store.close()
+    assert pool.requested == [DIAGRAM_URL]
+    assert written and crawler.recovered == 1
+    assert len(store) == 0
+    assert journal.model_done(3) and journal.diagram_done(3, DIAGRAM_URL)
+
+
+def test_redrive_skips_entries_the_journal_already_has(tmp_path):
+    store = DeadLetterStore(str(tmp_path / "out.csv.deadletter"))
+    store.record(DIAGRAM, 3, MODEL_ROW, DIAGRAM_URL, "timeout", "CYLINDER 1")
+    journal = RunJournal(str(tmp_path / "out.csv.journal"))
+    with CsvSink(str(tmp_path / "out.csv")) as sink:
+        journal.commit(3, [DIAGRAM_URL], True, sink)
+    pool = FakePool(default=DIAGRAM_PAGE)
+    crawler, written = _redrive(tmp_path, store, journal, pool)
+    journal.close()
+    store.close()
+    assert pool.requested == [] and written == []
+    assert len(store) == 0
+
+
+def test_redrive_keeps_an_entry_that_fails_again(tmp_path):
+    store = DeadLetterStore(str(tmp_path / "out.csv.deadletter"))
+    store.record(DIAGRAM, 3, MODEL_ROW, DIAGRAM_URL, "timeout", "CYLINDER 1")
+    crawler, written = _redrive(tmp_path, store, None, FakePool(default=DIAGRAM_PAGE, status=404))
+    store.close()
+    [entry] = store.pending()
+    assert written == [] and crawler.recovered == 0
+    assert store.failures(entry) == 2 and entry["reason"] == "status 404"
+
+
+def test_each_parquet_retry_pass_keeps_its_own_file(tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    other_url = DIAGRAM_URL.replace("875c266dae681589beff6b07", "1ee57012853d452fe539a78b")
+    output = str(tmp_path / "out.parquet")
+    with DeadLetterStore(output + ".deadletter") as store:
+        store.record(DIAGRAM, 3, MODEL_ROW, DIAGRAM_URL, "timeout", "CYLINDER 1")
+        store.record(DIAGRAM, 4, MODEL_ROW, other_url, "timeout", "CYLINDER 1")
+    key_file = tmp_path / "key.csv"
+    key_file.write_text("KTM,CYLINDER 1,Engine\n", encoding="utf-8")
+    pool = FakePool({DIAGRAM_URL: DIAGRAM_PAGE})
+    monkeypatch.setattr(engine, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(engine, "get_pool", lambda: pool)
+
+    def retry_pass():
+        return retry_failed(output, "http://x", key_file=str(key_file), pace=0, full_diagrams=True,
+                            retry_policy=RetryPolicy(max_attempts=1))
+
+    assert retry_pass().recovered == 1
+    pool.pages[other_url] = DIAGRAM_PAGE
+    assert retry_pass().recovered == 1
+    files = sorted(glob.glob(str(tmp_path / "out.retry-*.parquet")))
+    assert len(files) == 2
+    rows = [pq.read_table(file_name).column("OEM diagram URL").to_pylist() for file_name in files]
+    assert {url for file_rows in rows for url in file_rows} == {DIAGRAM_URL, other_url}
+    assert all(len(set(file_rows)) == 1 for file_rows in rows)
+    with DeadLetterStore(output + ".deadletter") as store:
+        assert store.pending() == []
+    assert retry_output_file(str(tmp_path / "out.csv")) == str(tmp_path / "out.csv")
@@ -0,0 +1,65 @@
+import asyncio
+
+from conftest import FakePool, fixture_page
+
+from common.engine import DiagramCrawler
+from common.parts import assembly_key
+from common.retry import RetryPolicy
+
+ASSEMBLY = "875c266dae681589beff6b07"
+DIAGRAM_PAGE = fixture_page("babbitts_diagram.html")
+
+
+def _model_page(slug):
+    return (f'<html><body><div class="passemname"><a href="/oemparts/a/ktm/{ASSEMBLY}/{slug}">CYLINDER 1</a>'
+            f'</div></body></html>').encode("utf-8")
+
+
+def _crawler(pool):
+    return DiagramCrawler("http://x", {("KTM", "CYLINDER 1")}, full_diagrams=True, pool=pool,
+                          retry_policy=RetryPolicy(max_attempts=1))
+
+
+def test_assembly_key_ignores_the_model_specific_slug():
+    assert assembly_key(f"http://x/oemparts/a/ktm/{ASSEMBLY}/cylinder-1") == ASSEMBLY
+    assert assembly_key(f"http://x/oemparts/a/ktm/{ASSEMBLY}/cylinder-1-250-sx") == ASSEMBLY
+    assert assembly_key("http://x/other/page") == "http://x/other/page"
+
+
+def test_shared_assembly_is_fetched_once_for_every_model():
+    pool = FakePool({"http://x/m/1": _model_page("cylinder-1"), "http://x/m/2": _model_page("cylinder-1-sx")},
+                    default=DIAGRAM_PAGE)
+    crawler = _crawler(pool)
+
+    async def crawl():
+        try:
+            return await asyncio.gather(crawler.crawl_model(2, ["KTM", "Dirt", "2024", "250", "http://x/m/1"]),
+                                        crawler.crawl_model(3, ["KTM", "Dirt", "2024", "350", "http://x/m/2"]))
+        finally:
+            crawler.close()
+
+    (rows_1, done_1, complete_1), (rows_2, done_2, complete_2) = asyncio.run(crawl())
+    assert len([url for url in pool.requested if "/oemparts/" in url]) == 1
+    assert crawler.assemblies_parsed == 1 and crawler.diagrams_done == 2
+    assert complete_1 and complete_2 and len(rows_1) == len(rows_2) > 0
+    # Each model's rows keep its own labels and diagram URL.
+    assert {row[3] for row in rows_1} == {"250"} and {row[8] for row in rows_2} == {done_2[0]}
+
+
+def test_failed_assembly_is_tried_again_by_the_next_model():
+    pool = FakePool({"http://x/m/1": _model_page("cylinder-1")}, default=DIAGRAM_PAGE, status=503)
+    crawler = _crawler(pool)
+    model_row = ["KTM", "Dirt", "2024", "250", "http://x/m/1"]
+
+    async def crawl():
+        try:
+            first = await crawler.crawl_diagram(model_row, "CYLINDER 1", f"http://x/oemparts/a/ktm/{ASSEMBLY}/a")
+            pool.status = 200
+            second = await crawler.crawl_diagram(model_row, "CYLINDER 1", f"http://x/oemparts/a/ktm/{ASSEMBLY}/b")
+            return first, second
+        finally:
+            crawler.close()
+
+    first, second = asyncio.run(crawl())
+    assert first is None and second
+    assert len(pool.requested) == 2
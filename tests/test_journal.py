@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from common.journal import RunJournal
+from common.parts import HEADER
+from common.sink import CsvSink
+
+
+def _checkpoint(journal, sink, row_number, rows, diagram_urls, complete=True):
+    sink.write_rows(rows)
+    journal.commit(row_number, diagram_urls, complete, sink)
+
+
+def test_resume_skips_recorded_rows_and_cuts_back_the_output(tmp_path):
+    output = str(tmp_path / "out.csv")
+    journal = RunJournal(output + ".journal")
+    journal.restore_output(output)
+    with CsvSink(output) as sink:
+        sink.write(HEADER)
+        _checkpoint(journal, sink, 2, [["a"] * 11], ["http://x/d/1", "http://x/d/2"])
+        _checkpoint(journal, sink, 3, [["b"] * 11], ["http://x/d/3"], complete=False)
+        checkpoint = sink.tell()
+        sink.write_rows([["lost"] * 11])  # written after the last checkpoint
+    journal.close()
+    assert os.path.getsize(output) > checkpoint
+
+    journal = RunJournal(output + ".journal")
+    journal.restore_output(output)
+    journal.close()
+    assert os.path.getsize(output) == checkpoint == journal.offset
+    assert journal.model_done(2) and not journal.model_done(3)
+    assert journal.diagram_done(3, "http://x/d/3")
+    assert not journal.diagram_done(3, "http://x/d/4")
+    assert len(journal) == 1
+
+
+def test_truncated_journal_line_is_dropped(tmp_path):
+    output = str(tmp_path / "out.csv")
+    journal = RunJournal(output + ".journal")
+    with CsvSink(output) as sink:
+        _checkpoint(journal, sink, 2, [["a"] * 11], ["http://x/d/1"])
+        offset = journal.offset
+    journal.close()
+    with open(output + ".journal", mode="a", encoding="utf-8") as file:
+        file.write('{"row": 3, "diagr')
+
+    journal = RunJournal(output + ".journal")
+    journal.close()
+    assert journal.offset == offset
+    assert not journal.model_done(3)
+    with open(output + ".journal", mode="rb") as file:
+        assert file.read().endswith(b"}\n")
+
+
+def test_output_with_rows_but_no_journal_is_never_truncated(tmp_path):
+    output = str(tmp_path / "merged.csv")
+    with CsvSink(output) as sink:
+        sink.write(HEADER)
+        sink.write(["a"] * 11)
+    size = os.path.getsize(output)
+
+    journal = RunJournal(output + ".journal")
+    with pytest.raises(ValueError):
+        journal.restore_output(output)
+    journal.close()
+    assert os.path.getsize(output) == size
+    assert not os.path.exists(output + ".journal")
+
+
+def test_header_only_output_without_journal_starts_over(tmp_path):
+    output = str(tmp_path / "out.csv")
+    with CsvSink(output) as sink:
+        sink.write(HEADER)
+
+    journal = RunJournal(output + ".journal")
+    journal.restore_output(output)
+    journal.close()
+    assert os.path.getsize(output) == 0
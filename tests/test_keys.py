@@ -0,0 +1,79 @@
+import os
+
+from conftest import ROOT
+
+from common.keys import KeyIndex, build_index, load_key_index, normalize
+from common.parts import key_parts
+
+
+def _key_file(tmp_path, text):
+    path = tmp_path / "key.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_lookups_ignore_bom_case_and_whitespace(tmp_path):
+    key_file = _key_file(tmp_path, '﻿Arctic Cat,ENGINE  #2,Engine,Piston Ring\n'
+                                   'Arctic Cat,ENGINE  #2,Engine,"Gasket,  Head"\n'
+                                   'KTM,FRAME,Chassis\n'
+                                   'short,row\n')
+    index = KeyIndex(build_index(key_file))
+    assert ("arctic cat", "Engine #2") in index and ("KTM", "frame") in index
+    assert ("KTM", "ENGINE #2") not in index
+    assert index.has_part("Arctic Cat", " engine #2", "GASKET, HEAD")
+    assert index.descriptions("Arctic Cat", "ENGINE #2") == ["piston ring", "gasket, head"]
+    assert index.descriptions("KTM", "FRAME") == []
+    assert normalize("﻿  A\n  b ") == "a b"
+
+
+def test_index_is_rebuilt_only_when_key_csv_changes(tmp_path):
+    key_file = _key_file(tmp_path, "KTM,FRAME,Chassis,Bolt\n")
+    index = load_key_index(key_file)
+    assert os.path.exists(key_file + ".idx") and index.is_current(key_file)
+    index.close()
+    built = os.stat(key_file + ".idx").st_mtime_ns
+
+    index = load_key_index(key_file)
+    assert os.stat(key_file + ".idx").st_mtime_ns == built
+    index.close()
+
+    _key_file(tmp_path, "KTM,FRAME,Chassis,Bolt\nKTM,FORK,Chassis,Seal\n")
+    index = load_key_index(key_file)
+    assert ("KTM", "FORK") in index and index.is_current(key_file)
+    index.close()
+
+
+def test_a_corrupt_index_is_replaced(tmp_path):
+    key_file = _key_file(tmp_path, "KTM,FRAME,Chassis,Bolt\n")
+    with open(key_file + ".idx", mode="wb") as file:
+        file.write(b"garbage")
+    index = load_key_index(key_file)
+    assert ("KTM", "FRAME") in index
+    index.close()
+
+
+def test_key_rows_with_extra_text_still_match_the_page_description(tmp_path):
+    # Rows as they appear in Part2/key.csv.
+    with open(os.path.join(ROOT, "Part2", "key.csv"), mode="r", encoding="utf-8") as file:
+        text = file.read()
+    lynx = ('Lynx,01- Cylinder,140 - Sensor,"Knock Sensor\n                                                \n'
+            '                                                    \n'
+            '                                                    This part replaces 420664030."\n')
+    indian = ('Indian,"Electrical, Components 1 All Options",140 - Sensor,"SENSOR-GEAR\n'
+              '  POSITION,N-6,240 [FROM 6/28/21]"\n')
+    assert lynx in text and indian in text
+    index = KeyIndex(build_index(_key_file(tmp_path, lynx + indian)))
+
+    assert index.matches("Lynx", "01- Cylinder", "Knock Sensor")
+    assert index.matches("Lynx", "01- Cylinder", "Knock Sensor  This part replaces 420664030.")
+    assert index.has_part("Lynx", "01- Cylinder", "KNOCK SENSOR")
+    assert index.matches("Indian", "Electrical, Components 1 All Options", "SENSOR-GEAR POSITION,N-6,240")
+    assert not index.matches("Lynx", "01- Cylinder", "Piston")
+    assert not index.matches("Lynx", "01- Cylinder", "")
+    parts = [("1", "Knock Sensor", "PN1", "", ""), ("2", "Gasket", "PN2", "", "")]
+    assert key_parts(index, "lynx", "01- CYLINDER", parts) == parts[:1]
+
+
+def test_a_diagram_without_descriptions_keeps_every_part(tmp_path):
+    index = KeyIndex(build_index(_key_file(tmp_path, "KTM,FRAME,Chassis\n")))
+    assert index.matches("KTM", "FRAME", "anything") and index.matches("KTM", "FRAME", "")
@@ -0,0 +1,14 @@
+from common.match import Automaton
+
+
+def test_finds_any_pattern_including_overlapping_ones():
+    automaton = Automaton(["he", "she", "his", "hers"])
+    assert automaton.search("ushers") and automaton.search("ahis")
+    assert not automaton.search("hhsx")
+    # "abcd" fails part way through; "bc" must still be found via the failure link.
+    assert Automaton(["abcd", "bc"]).search("abce")
+
+
+def test_no_patterns_match_nothing_and_an_empty_pattern_matches_everything():
+    assert not Automaton([]).search("anything")
+    assert Automaton([""]).search("")
@@ -0,0 +1,52 @@
+import json
+
+from common.metrics import Histogram, Metrics, MetricsReporter, format_json, format_prometheus
+
+
+def _metrics():
+    metrics = Metrics()
+    metrics.inc("rows_total", 10, stage="part2")
+    metrics.inc("rows_total", 5, stage="part2")
+    metrics.inc("responses_total", host="x", status=200)
+    metrics.inc("responses_total", host="x", status=503)
+    metrics.observe("fetch_seconds", 0.2, host="x")
+    metrics.observe("fetch_seconds", 99, host="x")
+    return metrics
+
+
+def test_histogram_buckets_are_cumulative_and_end_with_inf():
+    histogram = Histogram((1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(1, 2), (5, 3), ("+Inf", 4)]
+    assert histogram.sum == 14.5 and histogram.count == 4
+
+
+def test_totals_sum_every_matching_label_set():
+    metrics = _metrics()
+    assert metrics.total("rows_total", stage="part2") == 15
+    assert metrics.total("responses_total", host="x") == 2
+    assert metrics.total("responses_total", status=503) == 1
+
+
+def test_prometheus_text_has_help_type_and_histogram_series():
+    lines = format_prometheus(_metrics()).splitlines()
+    assert "# TYPE scraper_fetch_seconds histogram" in lines
+    assert 'scraper_fetch_seconds_bucket{host="x",le="0.25"} 1' in lines
+    assert 'scraper_fetch_seconds_bucket{host="x",le="+Inf"} 2' in lines
+    assert 'scraper_fetch_seconds_count{host="x"} 2' in lines
+    assert 'scraper_responses_total{host="x",status="503"} 1' in lines
+    assert 'scraper_rows_total{stage="part2"} 15' in lines
+
+
+def test_reporter_writes_json_with_row_rates_and_prometheus_files(tmp_path):
+    metrics = _metrics()
+    json_file, prom_file = tmp_path / "m.json", tmp_path / "m.prom"
+    reporter = MetricsReporter(metrics, str(json_file), str(prom_file), interval=3600).start()
+    reporter.stop()
+    data = json.loads(json_file.read_text(encoding="utf-8"))
+    assert data["metrics"]["rows_total"] == [{"labels": {"stage": "part2"}, "value": 15}]
+    assert data["metrics"]["fetch_seconds"][0]["buckets"]["+Inf"] == 2
+    assert data["rows_per_second"]["part2"]["overall"] > 0
+    assert prom_file.read_text(encoding="utf-8").startswith("# HELP scraper_uptime_seconds")
+    assert format_json(Metrics())["metrics"] == {}
@@ -0,0 +1,83 @@
+from conftest import fixture_page
+
+from common.parts import (HEADER, PartRow, StringPool, parse_diagram_page, parse_diagram_page_full, part_rows,
+                          partlist_region, row_window)
+
+ROW = ('<form><div class="c0"><span> {ref} </span></div><div class="c1a"><span>PART {ref}</span></div>'
+       '<div class="c1b"><a><span>PN{ref}</span></a></div><div class="c2"><span>${ref}.00</span></div></form>')
+
+
+def _page(rows):
+    return f"<html><head><meta charset=utf-8></head><body><div id=parts>{rows}</div>" \
+           f"<div id=footer><form><input name=q></form></div></body></html>".encode("utf-8")
+
+
+def test_region_parse_matches_full_document_parse():
+    content = fixture_page("babbitts_diagram.html")
+    assert partlist_region(content) is not None
+    parts = parse_diagram_page(content)
+    assert parts and parts == parse_diagram_page_full(content)
+
+
+def test_region_keeps_every_form_of_the_last_partlistrow():
+    content = _page(f'<div class="partlistrow">{ROW.format(ref=1)}</div>'
+                    f'<div class="partlistrow">{ROW.format(ref=2)}{ROW.format(ref=3)}</div>')
+    region, encoding = partlist_region(content)
+    assert region.endswith(b"</form></div>") and b"footer" not in region
+    assert encoding == "utf-8"
+    parts = parse_diagram_page(content)
+    assert [part[0] for part in parts] == ["1", "2", "3"]
+    assert parts == parse_diagram_page_full(content)
+
+
+def test_unbalanced_region_falls_back_to_the_full_parse():
+    content = b'<html><body><div class="partlistrow">' + ROW.format(ref=1).encode("utf-8") + b"</body></html>"
+    assert partlist_region(content) is None
+    assert parse_diagram_page(content) == parse_diagram_page_full(content)
+
+
+def test_row_window_defaults_to_every_row_after_the_header():
+    assert row_window([]) == (2, None)
+    assert row_window(["--start", "5112", "--stop", "5234"]) == (5112, 5234)
+
+
+def test_incomplete_rows_follow_the_brand_rules():
+    rows = ('<form><div class="c0"><span>1</span></div><div class="c1a"><span>BOLT</span></div>'
+            '<div class="c1b"><a><span>PN1</span></a><a><span>SS1</span></a></div></form>'
+            '<form><div class="c0"><span>2</span></div><div class="c1a"><span>NUT</span></div></form>'
+            '<form><div class="c1a"><span>WASHER</span></div><div class="c1b"><a><span>PN3</span></a></div>'
+            '<div class="c2"><span>$3.00</span></div></form>')
+    content = _page(f'<div class="partlistrow">{rows}</div>')
+    assert parse_diagram_page(content) == [("1", "BOLT", "PN1", "", "SS1"), ("", "WASHER", "PN3", "3.00", "")]
+    assert parse_diagram_page(content, require_labels=True) == [("1", "BOLT", "PN1", "", "SS1")]
+    assert parse_diagram_page(content, require_labels=True, blank_part_numbers=True) == [
+        ("1", "BOLT", "PN1", "", "SS1"), ("2", "NUT", "", "", "")]
+
+
+def test_part_rows_repeat_an_sspn_part_under_both_numbers():
+    model_row = ["KTM", "Dirt", "2024", "250 SX", "http://x/m/1"]
+    rows = part_rows(model_row, "CYLINDER", "http://x/d/1", [("1", "Bolt", "PN1", "1.00", "SS1"),
+                                                             ("2", "Nut", "PN2", "", "")])
+    assert [list(row) for row in rows] == [
+        ["KTM", "Dirt", "2024", "250 SX", "CYLINDER", "1", "Bolt", "PN1", "http://x/d/1", "1.00", "SS1"],
+        ["KTM", "Dirt", "2024", "250 SX", "CYLINDER", "1", "Bolt", "SS1", "http://x/d/1", "1.00", "PN1"],
+        ["KTM", "Dirt", "2024", "250 SX", "CYLINDER", "2", "Nut", "PN2", "http://x/d/1", "", ""],
+    ]
+    row = rows[0]
+    assert len(row) == len(HEADER) and row[7] == row.part_number == "PN1"
+    assert row.model == "250 SX" and row.oem_diagram_url == "http://x/d/1"
+    assert row == row.as_list() and row.dimensions is rows[2].dimensions
+
+
+def test_string_pool_shares_values_from_the_first_call_on():
+    strings = StringPool()
+    assert not strings  # an empty pool must still be used
+    model_row = ["KTM", "Dirt", "2024", "250 SX", "http://x/m/1"]
+    parts = [("1", "".join(["Bo", "lt"]), "PN1", "1.00", "")]
+    first = part_rows(model_row, "CYLINDER", "http://x/d/1", parts, strings)
+    size = len(strings)
+    second = part_rows(list(model_row), "CYLINDER", "http://x/d/1", [("1", "".join(["Bo", "lt"]), "PN1", "1.00", "")],
+                       strings)
+    assert len(strings) == size
+    assert second[0].dimensions is first[0].dimensions
+    assert second[0].part_description is first[0].part_description
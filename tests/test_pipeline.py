@@ -0,0 +1,68 @@
+import asyncio
+
+from conftest import FakePool, fixture_page
+
+from common import pipeline
+from common.catalog import SITES, with_base_url
+from common.engine import DiagramCrawler
+from common.pipeline import FeedingCatalogCrawler, _run
+from common.retry import RetryPolicy
+
+DIAGRAM_PAGE = fixture_page("babbitts_diagram.html")
+MODEL_PAGE = (b'<html><body><div class="passemname"><a href="/oemparts/a/ktm/875c266dae681589beff6b07/cylinder-1">'
+              b'CYLINDER 1</a></div></body></html>')
+
+
+class SitePool(FakePool):
+    """
+    Serves the catalog fixtures, then one model page per model and the same diagram for all of them.
+    """
+
+    def get(self, url):
+        if "/oemparts/l/" in url:
+            self.pages[url] = MODEL_PAGE
+        elif "/oemparts/a/" in url:
+            self.pages[url] = DIAGRAM_PAGE
+        return super().get(url)
+
+
+class Collector:
+    def __init__(self):
+        self.rows = []
+
+    def write_rows(self, rows):
+        self.rows.extend(rows)
+
+    def flush(self):
+        pass
+
+
+def test_models_flow_to_the_diagram_crawl_with_their_part1_row_numbers():
+    site = with_base_url(SITES["ktm"], "http://x")
+    pool = SitePool({
+        "http://x/oemparts/c/ktm/parts": fixture_page("part1_brand.html"),
+        "http://x/oemparts/c/ktm/t/off-road": fixture_page("part1_type.html"),
+        "http://x/oemparts/c/ktm/t/off-road/y/2025": fixture_page("part1_year.html"),
+    })
+    policy = RetryPolicy(max_attempts=1)
+    feeder = FeedingCatalogCrawler({"ktm": asyncio.Queue(maxsize=2)}, pool=pool, retry_policy=policy)
+    crawler = DiagramCrawler("http://x", {("KTM", "CYLINDER 1")}, window=4, status_every=0, full_diagrams=True,
+                             pool=pool, retry_policy=policy)
+    part1, part2 = Collector(), Collector()
+    asyncio.run(_run(feeder, [site], {"ktm": part1}, {"ktm": crawler}, {"ktm": part2}))
+
+    assert len(part1.rows) == 75 and feeder.row_numbers == {"ktm": 76}
+    assert crawler.models_done == 75 and crawler.assemblies_parsed == 1
+    # Part2 rows come out in Part1 row order, whatever order the models finished in.
+    models = []
+    for row in part2.rows:
+        if not models or models[-1] != row[3]:
+            models.append(row[3])
+    assert models == [row[3] for row in part1.rows]
+
+
+def test_banner_names_the_sites_selected_with_all(monkeypatch, capsys):
+    monkeypatch.setattr(pipeline, "run_pipeline", lambda sites, **kwargs: ({}, None, {}))
+    pipeline.main(["--all"])
+    banner = capsys.readouterr().out.splitlines()[0]
+    assert banner == "started! " + ", ".join(sorted(SITES))
@@ -0,0 +1,107 @@
+import csv
+import os
+import sqlite3
+
+import pytest
+from conftest import FakePool
+
+from common import prices as prices_module
+from common.database import SqliteSink
+from common.engine import open_output
+from common.journal import RunJournal
+from common.prices import PriceRefresher, refresh_csv, refresh_parquet, refresh_prices, refresh_sqlite
+from common.retry import RetryPolicy
+
+DIAGRAM_A = "http://x/oemparts/a/ktm/875c266dae681589beff6b07/cylinder-1"
+DIAGRAM_A_OTHER_MODEL = "http://x/oemparts/a/ktm/875c266dae681589beff6b07/cylinder-1-sx"
+DIAGRAM_B = "http://x/oemparts/a/ktm/1ee57012853d452fe539a78b/frame"
+FORM = ('<form><div class="c0"><span>{ref}</span></div><div class="c1a"><span>Part</span></div>'
+        '<div class="c1b"><a><span>{part_number}</span></a>{sspn}</div><div class="c2"><span>${price}</span></div></form>')
+PAGE = ('<html><body><div class="partlistrow">'
+        + FORM.format(ref="1", part_number="PN1", sspn="", price="2.00")
+        + FORM.format(ref="2", part_number="PN2", sspn="<a><span>SS2</span></a>", price="5.00")
+        + "</div></body></html>").encode("utf-8")
+
+
+def _row(url, ref, part_number, price, model="250 SX"):
+    return ["KTM", "Dirt", "2024", model, "CYLINDER", ref, "Part", part_number, url, price, ""]
+
+
+ROWS = [_row(DIAGRAM_A, "1", "PN1", "1.00"), _row(DIAGRAM_A, "2", "SS2", "5.00"),
+        _row(DIAGRAM_A_OTHER_MODEL, "1", "PN1", "1.00", model="350 SX"), _row(DIAGRAM_A, "9", "PN9", "3.00"),
+        _row(DIAGRAM_B, "1", "PN1", "4.00")]
+
+
+def _refresher():
+    pool = FakePool({DIAGRAM_A: PAGE, DIAGRAM_A_OTHER_MODEL: PAGE})
+    return PriceRefresher(pool=pool, retry_policy=RetryPolicy(max_attempts=1)), pool
+
+
+def _check_counts(refresher, pool):
+    assert len([url for url in pool.requested if "875c266dae681589beff6b07" in url]) == 1
+    assert refresher.counts["changed"] == 2 and refresher.counts["unchanged"] == 1
+    assert refresher.counts["part not found"] == 1 and refresher.counts["diagram failed"] == 1
+
+
+def test_csv_prices_are_rewritten_and_the_journal_follows(tmp_path):
+    path = str(tmp_path / "out.csv")
+    journal = RunJournal(path + ".journal")
+    with open_output(path) as sink:
+        sink.write_rows(ROWS)
+        sink.flush()
+        journal.commit(2, [DIAGRAM_A, DIAGRAM_B], True, sink)
+    journal.close()
+
+    refresher, pool = _refresher()
+    refresh_csv(path, refresher)
+    _check_counts(refresher, pool)
+    with open(path, mode="r", newline="", encoding="utf-8") as file:
+        assert [row[9] for row in list(csv.reader(file))[1:]] == ["2.00", "5.00", "2.00", "3.00", "4.00"]
+    journal = RunJournal(path + ".journal")
+    assert journal.offset == os.path.getsize(path) and journal.model_done(2)
+    journal.close()
+
+
+def test_csv_with_rows_past_its_checkpoint_is_refused(tmp_path):
+    path = str(tmp_path / "out.csv")
+    journal = RunJournal(path + ".journal")
+    with open_output(path) as sink:
+        sink.flush()
+        journal.commit(2, [], True, sink)
+        sink.write_rows(ROWS)
+    journal.close()
+    with pytest.raises(ValueError, match="past its last checkpoint"):
+        refresh_csv(path, _refresher()[0])
+
+
+def test_sqlite_prices_are_updated_in_place(tmp_path):
+    path = str(tmp_path / "out.sqlite")
+    with SqliteSink(path) as sink:
+        sink.write_rows(ROWS)
+    refresher, pool = _refresher()
+    refresh_sqlite(path, refresher)
+    _check_counts(refresher, pool)
+    with sqlite3.connect(path) as connection:
+        prices = dict(connection.execute("SELECT model || ' ' || diagram_url || ' ' || part_number, price "
+                                         "FROM part_rows"))
+    assert prices[f"250 SX {DIAGRAM_A} PN1"] == "2.00" and prices[f"350 SX {DIAGRAM_A_OTHER_MODEL} PN1"] == "2.00"
+    assert prices[f"250 SX {DIAGRAM_A} PN9"] == "3.00" and prices[f"250 SX {DIAGRAM_B} PN1"] == "4.00"
+
+
+def test_parquet_gets_a_new_price_column(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "out.parquet")
+    with open_output(path) as sink:
+        sink.write_rows(ROWS)
+    refresher, pool = _refresher()
+    refresh_parquet(path, refresher)
+    _check_counts(refresher, pool)
+    assert pq.read_table(path).column("Price").to_pylist() == [2.0, 5.0, 2.0, 3.0, 4.0]
+
+
+def test_pages_are_never_served_from_the_response_cache(tmp_path, monkeypatch):
+    configured = {}
+    monkeypatch.setattr(prices_module, "configure", lambda **kwargs: configured.update(kwargs))
+    monkeypatch.setattr(prices_module, "refresh_csv", lambda *args: None)
+    refresh_prices(str(tmp_path / "out.csv"))
+    assert "cache" in configured and configured["cache"] is None
@@ -0,0 +1,94 @@
+import csv
+import os
+
+import pytest
+from conftest import FakePool
+
+from common import engine, refresh as refresh_module
+from common.catalog import SITES, with_base_url
+from common.refresh import delta_file, refresh, year_digest
+
+SITE = with_base_url(SITES["ktm"], "http://x")
+BRAND_URL = "http://x/oemparts/c/ktm/parts"
+
+
+def _brand_page():
+    return b'<html><body><ul class="partsubselect"><li><a href="/t/dirt">Dirt</a></li></ul></body></html>'
+
+
+def _type_page(years):
+    links = "".join(f'<li><a href="/t/dirt/y/{year}">{year}</a></li>' for year in years)
+    return f'<html><body><div class="halfc"><ul>{links}</ul></div></body></html>'.encode("utf-8")
+
+
+def _year_page(year, models):
+    crumbs = "".join(f"<li><a><span>{label}</span></a></li>" for label in ("Home", "KTM", "Dirt", year))
+    links = "".join(f'<li><a href="/m/{model}">{model}</a></li>' for model in models)
+    return (f'<html><body><div id="partsselectlist"><div><ul>{crumbs}</ul></div></div>'
+            f'<ul class="partsubselect columnlist columnlist_33">{links}</ul></body></html>').encode("utf-8")
+
+
+def _site(models_2024, models_2020=("M2",)):
+    return FakePool({
+        BRAND_URL: _brand_page(),
+        "http://x/t/dirt": _type_page([2024, 2020]),
+        "http://x/t/dirt/y/2024": _year_page("2024", models_2024),
+        "http://x/t/dirt/y/2020": _year_page("2020", models_2020),
+    })
+
+
+def _models(file_name):
+    with open(file_name, mode="r", newline="", encoding="utf-8") as file:
+        return sorted(row[3] for row in list(csv.reader(file))[1:])
+
+
+@pytest.fixture
+def use_pool(monkeypatch):
+    def use(pool):
+        monkeypatch.setattr(refresh_module, "configure", lambda **kwargs: None)
+        monkeypatch.setattr(engine, "get_pool", lambda: pool)
+        return pool
+    return use
+
+
+def test_delta_files_keep_the_part1_naming():
+    assert delta_file("csv/9_Yamaha_1_20240101000000.csv", "added") == "csv/9_Yamaha_added_1_20240101000000.csv"
+    assert delta_file("csv/1_arctic_cat_1.csv", "removed") == "csv/1_arctic_cat_removed_1.csv"
+    assert year_digest([("M1", "/m/M1")]) != year_digest([("M1", "/m/M1b")])
+
+
+def test_refresh_writes_added_and_removed_models(tmp_path, use_pool):
+    first, second, third = (str(tmp_path / name) for name in ("first", "second", "third"))
+    for directory in (first, second, third):
+        os.mkdir(directory)
+    use_pool(_site(["M1"]))
+    results, _, _ = refresh([SITE], output_dir=first)
+    snapshot, added, removed = results["ktm"]
+    assert _models(snapshot) == _models(added) == ["M1", "M2"] and _models(removed) == []
+    assert os.path.exists(snapshot + ".years.json")
+
+    use_pool(_site(["M1", "M3"]))
+    results, _, crawler = refresh([SITE], output_dir=second, previous_dir=first)
+    snapshot, added, removed = results["ktm"]
+    assert _models(snapshot) == ["M1", "M2", "M3"]
+    assert _models(added) == ["M3"] and _models(removed) == []
+    assert crawler.unchanged["ktm"] == 1  # 2020 lists the same links as before
+
+    pool = use_pool(_site(["M3"]))
+    results, _, crawler = refresh([SITE], output_dir=third, previous_dir=second, skip_years_before=2023)
+    snapshot, added, removed = results["ktm"]
+    assert "http://x/t/dirt/y/2020" not in pool.requested and crawler.skipped["ktm"] == 1
+    assert _models(snapshot) == ["M2", "M3"]
+    assert _models(added) == [] and _models(removed) == ["M1"]
+
+
+def test_a_failed_type_page_keeps_the_run_from_becoming_a_baseline(tmp_path, use_pool):
+    os.mkdir(tmp_path / "first")
+    os.mkdir(tmp_path / "second")
+    use_pool(_site(["M1"]))
+    refresh([SITE], output_dir=str(tmp_path / "first"))
+    pool = use_pool(_site(["M1"]))
+    del pool.pages["http://x/t/dirt"]
+    results, _, _ = refresh([SITE], output_dir=str(tmp_path / "second"), previous_dir=str(tmp_path / "first"))
+    snapshot, added, removed = results["ktm"]
+    assert "_incomplete_1_" in os.path.basename(snapshot) and removed is None
@@ -0,0 +1,57 @@
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+from common.retry import FetchFailed, RetryPolicy, retry_after
+
+
+def _response(status, headers=None, content=b""):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = content
+    response.url = "http://x/page"
+    return response
+
+
+def test_backoff_is_full_jitter_under_a_capped_ceiling():
+    policy = RetryPolicy(base_delay=2, max_delay=10, rng=random.Random(1))
+    for attempt, ceiling in ((1, 2), (2, 4), (3, 8), (4, 10), (9, 10)):
+        waits = [policy.backoff(attempt) for _ in range(200)]
+        assert all(0 <= wait <= ceiling for wait in waits)
+        assert max(waits) > ceiling * 0.8 and min(waits) < ceiling * 0.2
+
+
+def test_retry_after_seconds_and_http_date():
+    assert retry_after(_response(429, {"Retry-After": "7"})) == 7.0
+    now = datetime(2024, 12, 4, 10, 0, tzinfo=timezone.utc)
+    later = format_datetime(now + timedelta(seconds=30), usegmt=True)
+    assert retry_after(_response(503, {"Retry-After": later}), now=now) == 30.0
+    assert retry_after(_response(500, {"Retry-After": "7"})) is None
+    assert retry_after(_response(429, {"Retry-After": "soon"})) is None
+
+
+def test_delay_honours_retry_after_capped_plus_jitter():
+    policy = RetryPolicy(base_delay=1, max_delay=20, rng=random.Random(2))
+    error = requests.exceptions.HTTPError(response=_response(429, {"Retry-After": "5"}))
+    assert all(5 <= policy.delay(1, error) <= 6 for _ in range(50))
+    error = requests.exceptions.HTTPError(response=_response(429, {"Retry-After": "600"}))
+    assert all(20 <= policy.delay(1, error) <= 21 for _ in range(50))
+
+
+def test_fetch_waits_as_asked_then_returns_the_page():
+    responses = [_response(503, {"Retry-After": "3"}), _response(200, content=b"ok")]
+    slept = []
+    policy = RetryPolicy(base_delay=1, rng=random.Random(3))
+    assert policy.fetch("http://x/page", get=lambda url: responses.pop(0), sleep=slept.append) == b"ok"
+    assert len(slept) == 1 and 3 <= slept[0] <= 4
+
+
+def test_fetch_gives_up_on_permanent_errors_at_once():
+    slept = []
+    with pytest.raises(FetchFailed) as failed:
+        RetryPolicy().fetch("http://x/page", get=lambda url: _response(404), sleep=slept.append)
+    assert failed.value.permanent and failed.value.attempts == 1 and not slept
@@ -0,0 +1,53 @@
+import csv
+
+import pytest
+
+from common.parts import HEADER
+from common.shard import main, merge_outputs, shard_file, shard_ranges
+
+
+def _write(path, rows, header):
+    with open(path, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, quoting=csv.QUOTE_ALL)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def _row(model, diagram, ref, part_number="PN1"):
+    return ["KTM", "Dirt", "2024", model, "CYLINDER", ref, "Bolt", part_number, diagram, "$1.00", ""]
+
+
+def test_ranges_cover_every_row_once_in_even_windows(tmp_path):
+    models = [["KTM", "Dirt", "2024", f"M{index}", f"http://x/m/{index}"] for index in range(10)]
+    input_file = _write(tmp_path / "in.csv", models, ["Brand", "Type", "Year", "Model", "URL"])
+    ranges = shard_ranges(input_file, 3)
+    assert ranges == [(2, 6), (6, 9), (9, 12)]
+    assert shard_ranges(input_file, 50) == [(row, row + 1) for row in range(2, 12)]
+    assert shard_ranges(input_file, 2, start=5, stop=9) == [(5, 7), (7, 9)]
+
+
+def test_shard_files_are_named_after_the_output():
+    assert shard_file("csv/9_Yamaha_2.csv", 0, 4) == "csv/9_Yamaha_2.shard1of4.csv"
+
+
+def test_merge_drops_rows_another_shard_wrote_but_keeps_repeated_parts(tmp_path):
+    first = _write(tmp_path / "a.csv", [_row("M1", "http://x/d/1", "1"), _row("M1", "http://x/d/1", "1"),
+                                        _row("M1", "http://x/d/2", "2")], HEADER)
+    # The second shard wrote M1's first diagram again, e.g. after an overlapping rerun.
+    second = _write(tmp_path / "b.csv", [_row("M1", "http://x/d/1", "1"), _row("M2", "http://x/d/1", "1")], HEADER)
+    merged = str(tmp_path / "merged.csv")
+    assert merge_outputs([first, second], merged) == (4, 1)
+    with open(merged, mode="r", newline="", encoding="utf-8") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == HEADER
+    assert [(row[3], row[8]) for row in rows[1:]] == [("M1", "http://x/d/1"), ("M1", "http://x/d/1"),
+                                                        ("M1", "http://x/d/2"), ("M2", "http://x/d/1")]
+
+
+def test_parquet_output_is_refused_before_any_shard_starts(tmp_path, capsys):
+    input_file = _write(tmp_path / "in.csv", [["KTM", "Dirt", "2024", "M", "http://x/m"]],
+                        ["Brand", "Type", "Year", "Model", "URL"])
+    with pytest.raises(SystemExit):
+        main([input_file, "--output", str(tmp_path / "out.parquet")])
+    assert "not Parquet" in capsys.readouterr().err
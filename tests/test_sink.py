@@ -0,0 +1,87 @@
+import csv
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+from conftest import ROOT
+
+from common import sink as sink_module
+from common.sink import CsvSink
+
+
+def _rows(path):
+    with open(path, mode="r", newline="", encoding="utf-8") as file:
+        return list(csv.reader(file))
+
+
+def test_rows_are_buffered_until_the_buffer_fills(tmp_path):
+    path = str(tmp_path / "out.csv")
+    with CsvSink(path, buffer_rows=3, flush_interval=3600) as sink:
+        sink.write(["a"])
+        sink.write_rows([["b"]])
+        assert os.path.getsize(path) == 0
+        sink.write(["c"])
+        assert _rows(path) == [["a"], ["b"], ["c"]]
+        sink.write(["d"])
+    assert _rows(path) == [["a"], ["b"], ["c"], ["d"]]
+
+
+def test_rows_left_waiting_are_flushed_without_another_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(sink_module, "FLUSH_TICK", 0.05)
+    monkeypatch.setattr(sink_module, "_flush_thread", None)
+    path = str(tmp_path / "out.csv")
+    with CsvSink(path, buffer_rows=500, flush_interval=0.1) as sink:
+        sink.write(["a"])
+        deadline = time.monotonic() + 5
+        while os.path.getsize(path) == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert _rows(path) == [["a"]]
+
+
+def test_fsync_only_when_asked_or_after_the_interval(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(sink_module.os, "fsync", lambda fd: (synced.append(fd), real_fsync(fd)))
+    with CsvSink(str(tmp_path / "out.csv"), buffer_rows=1, fsync_interval=3600) as sink:
+        sink.write(["a"])
+        assert synced == []
+        sink.flush(fsync=True)
+        assert len(synced) == 1
+    assert len(synced) == 2  # close
+
+
+def test_sigterm_during_a_flush_exits_after_it_without_writing_twice(tmp_path, monkeypatch):
+    monkeypatch.setattr(sink_module, "_deferred_signal", None)
+    path = str(tmp_path / "out.csv")
+    sink = CsvSink(path, buffer_rows=500)
+    sink.write_rows([["a"], ["b"]])
+    writer = sink._writer
+
+    class InterruptedWriter:
+        def writerows(self, rows):
+            writer.writerow(rows[0])
+            sink_module._on_sigterm(signal.SIGTERM, None)  # as if delivered between two rows
+            writer.writerows(rows[1:])
+
+    sink._writer = InterruptedWriter()
+    with pytest.raises(SystemExit) as exit_info:
+        sink.flush()
+    assert exit_info.value.code == 128 + signal.SIGTERM
+    sink.close()
+    assert _rows(path) == [["a"], ["b"]]
+
+
+def test_sigterm_flushes_buffered_rows_through_atexit(tmp_path):
+    path = str(tmp_path / "out.csv")
+    script = ("import os, signal, sys\n"
+              f"sys.path.insert(0, {ROOT!r})\n"
+              "from common.sink import CsvSink\n"
+              f"sink = CsvSink({path!r}, buffer_rows=500, flush_interval=3600)\n"
+              "sink.write_rows([['a'], ['b']])\n"
+              "os.kill(os.getpid(), signal.SIGTERM)\n")
+    result = subprocess.run([sys.executable, "-c", script], timeout=30)
+    assert result.returncode == 128 + signal.SIGTERM
+    assert _rows(path) == [["a"], ["b"]]
@@ -0,0 +1,59 @@
+import threading
+
+from common.throttle import AimdController, is_congestion_status
+
+
+def _run(controller, host, outcomes):
+    for congested in outcomes:
+        controller.acquire(host)
+        controller.release(host, congested)
+
+
+def test_limit_grows_by_one_per_limit_healthy_responses():
+    controller = AimdController(initial=2, maximum=5)
+    _run(controller, "a", [False] * 2)
+    assert controller.snapshot()["a"]["limit"] == 3
+    _run(controller, "a", [False] * 3)
+    assert controller.snapshot()["a"]["limit"] == 4
+    _run(controller, "a", [False] * 100)
+    assert controller.snapshot()["a"]["limit"] == 5
+
+
+def test_congestion_halves_the_limit_once_per_cooldown():
+    controller = AimdController(initial=8, maximum=8, cooldown=60)
+    _run(controller, "a", [True, True, True])
+    state = controller.snapshot()["a"]
+    assert state["limit"] == 4
+    assert state["errors"] == 3 and state["requests"] == 3 and state["error_rate"] == 1.0
+
+
+def test_limit_never_drops_below_the_minimum():
+    controller = AimdController(initial=2, minimum=1, cooldown=0)
+    _run(controller, "a", [True] * 5)
+    assert controller.snapshot()["a"]["limit"] == 1
+
+
+def test_hosts_are_limited_independently():
+    controller = AimdController(initial=4, cooldown=0)
+    _run(controller, "a", [True])
+    assert controller.snapshot()["a"]["limit"] == 2
+    _run(controller, "b", [False])
+    assert controller.snapshot()["b"]["limit"] == 4
+
+
+def test_acquire_blocks_at_the_limit_until_a_slot_is_released():
+    controller = AimdController(initial=1, maximum=1)
+    controller.acquire("a")
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: (controller.acquire("a"), acquired.set()))
+    waiter.start()
+    assert not acquired.wait(0.1)
+    controller.release("a", False)
+    assert acquired.wait(1)
+    waiter.join()
+    assert controller.snapshot()["a"]["in_flight"] == 1
+
+
+def test_congestion_statuses():
+    assert is_congestion_status(429) and is_congestion_status(503)
+    assert not is_congestion_status(404) and not is_congestion_status(200)